@@ -58,9 +58,9 @@ class Arrival(commands.Cog):
             if not rows:
                 logger.error(f"Nie udało się pobrać powodu blokady dla użytkownika {member} ({member.id})")
                 return
-            reason = rows[1]
-            end_at = rows[2]
-            added_at = rows[3]
+            reason = rows.reason
+            end_at = rows.end_at
+            added_at = rows.added_at
             time_left = "Nieskończony"
             if end_at:
                 end_date = datetime.fromisoformat(end_at)
@@ -82,19 +82,15 @@ class Arrival(commands.Cog):
                     embed.add_field(name="Zaproszony przez", value=used_invite.inviter.mention if used_invite and used_invite.inviter else "Nieznany", inline=False)
                     await log_channel.send(embed=embed)
             
-            await member.send(f"Nie możesz dołączyć do FOG, znajdujesz się na blackliście.\nPowód: {reason}.\nDodany: {added_at}.\nKoniec blokady: {end_at if end_at else 'Nieskończony'}.\nPozostały czas (dni): {time_left}.")
+            await self.bot.dm_outbox.deliver(member.id, f"Nie możesz dołączyć do FOG, znajdujesz się na blackliście.\nPowód: {reason}.\nDodany: {added_at}.\nKoniec blokady: {end_at if end_at else 'Nieskończony'}.\nPozostały czas (dni): {time_left}.")
             await member.kick(reason=f"Użytkownik znajduje się na blacklist. Powód: {reason}")
             return
         
         # Welcome message via DM
-        try:
-            # TODO: Update welcome message content
-            dm_channel = await member.create_dm()
-            welcome_message = self.bot.messages.get("welcome_message", "Witaj na serwerze FOG, {mention}!")
-            welcome_message = welcome_message.format(mention=member.mention, name=member.name, id=member.id, guild=member.guild.name, display_name=member.display_name)
-            await dm_channel.send(welcome_message)
-        except Exception as e:
-            logger.error(f"Nie udało się wysłać wiadomości powitalnej do {member} ({member.id}): {e}")
+        # TODO: Update welcome message content
+        welcome_message = self.bot.messages.get("welcome_message", "Witaj na serwerze FOG, {mention}!")
+        welcome_message = welcome_message.format(mention=member.mention, name=member.name, id=member.id, guild=member.guild.name, display_name=member.display_name)
+        await self.bot.dm_outbox.send(member.id, welcome_message)
         
         # Add user in database
         await Users.add_user(self.bot.db, member.id, member.name)
@@ -3,15 +3,59 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from db.models import Attendance, Slots, Missions, Squads
+from utils.leaderboard import Leaderboard, LeaderboardPages
 import logging
 
 logger = logging.getLogger("fogbot")
 debug = os.getenv("DEBUG") == "True"
+PAGE_SIZE = 10
 
 class AttendanceCog(commands.Cog):
     """Attendance related commands and listeners."""
     def __init__(self, bot:commands.Bot):
         self.bot = bot
+        # Top 100 by attended missions, positions past it come from the database
+        self.leaderboard = Leaderboard(size=100)
+
+    async def _ensure_leaderboard(self) -> None:
+        if self.leaderboard.loaded:
+            return
+        rows = await Attendance.get_leaderboard(self.bot.db, self.leaderboard.size)
+        self.leaderboard.load([(int(user_id), all_time_missions, last_mission_date) for user_id, last_mission_date, all_time_missions in rows])
+
+    # Attendance is recorded for a few dozen users at a time, re-read only them
+    @commands.Cog.listener("on_attendance")
+    @commands.Cog.listener("on_attendance_updated")
+    async def _update_leaderboard(self, user_ids: list[int]):
+        if not hasattr(self.bot, "db") or self.bot.db is None or not self.leaderboard.loaded:
+            return
+        for user_id in user_ids:
+            row = await Attendance.get_by_user(self.bot.db, user_id)
+            if row is not None:
+                self.leaderboard.update(int(row.user_id), row.all_time_missions, row.last_mission_date)
+
+    async def _render_leaderboard(self, page: int) -> tuple[discord.Embed, bool]:
+        await self._ensure_leaderboard()
+        offset = (page - 1) * PAGE_SIZE
+        entries = self.leaderboard.page(offset, PAGE_SIZE + 1)
+        if entries is None:
+            rows = await Attendance.get_leaderboard(self.bot.db, PAGE_SIZE + 1, offset)
+            entries = [(int(user_id), all_time_missions, last_mission_date) for user_id, last_mission_date, all_time_missions in rows]
+
+        embed = discord.Embed(
+            title="Ranking obecności w misjach",
+            color=discord.Color.green()
+        )
+        guild = self.bot.get_guild(self.bot.guild_id)
+        description_lines = []
+        for rank, (user_id, all_time_missions, last_mission_date) in enumerate(entries[:PAGE_SIZE], start=offset + 1):
+            user = guild.get_member(user_id) if guild else None
+            username = user.name if user else f"Użytkownik {user_id}"
+            description_lines.append(f"**#{rank}** - {username}: {all_time_missions} misji (ostatnia: {last_mission_date if last_mission_date else 'Brak danych'})")
+        embed.description = "\n".join(description_lines) or "Brak danych o obecności użytkowników."
+        embed.set_footer(text=f"Strona {page}")
+        # One extra entry was fetched to know whether there is a next page
+        return embed, len(entries) > PAGE_SIZE
 
     
     # /misja_obecnosc
@@ -27,14 +71,14 @@ class AttendanceCog(commands.Cog):
     async def misja_obecnosc(self, interaction: discord.Interaction, nieobecni: str | None = None):
         if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
             return
-        rows = await Missions.get_channel(self.bot.db, interaction.channel.id)
+        rows = await self.bot.mission_channels.get(interaction.channel.id)
         if not rows: # Validation of mission existence
             await interaction.response.send_message("Ta komenda może być użyta tylko w kanale misji.", ephemeral=True)
             return
-        mission_id = rows[0]
-        mission_name = rows[1]
-        mission_date = rows[5].split(" ")[0]
-        creator_user_id = rows[4]
+        mission_id = rows.id
+        mission_name = rows.name
+        mission_date = rows.date.split(" ")[0]
+        creator_user_id = rows.creator_user_id
         
         if creator_user_id != interaction.user.id and not interaction.user.guild_permissions.administrator: # Validation of permissions
             await interaction.response.send_message("Tylko twórca misji może anulować misję.", ephemeral=True)
@@ -48,7 +92,7 @@ class AttendanceCog(commands.Cog):
             await interaction.response.send_message("Brak zapisanych drużyn na tę misję.", ephemeral=True)
             return
         for row in rows:
-            squad_map[row[0]] = row[2] # message_id: name
+            squad_map[row.message_id] = row.name
             
         slots_map = {} # message_id: [(name, user_id)]
         rows = await Slots.get_by_mission(self.bot.db, mission_id)
@@ -58,9 +102,9 @@ class AttendanceCog(commands.Cog):
         for row in rows:
             if debug:
                 logger.debug(f"Slot row: {row}")
-            if row[0] not in slots_map:
-                slots_map[row[0]] = []
-            slots_map[row[0]].append((row[2], row[3])) # (name, user_id)
+            if row.message_id not in slots_map:
+                slots_map[row.message_id] = []
+            slots_map[row.message_id].append((row.name, row.user_id))
             
         if debug:
             logger.debug(f"Slots map for mission {mission_name} ({mission_date}): {slots_map}")
@@ -69,10 +113,14 @@ class AttendanceCog(commands.Cog):
             for label, user in users:
                 if user and str(user) not in absent_users:
                     present_users.append(int(user))
+        async with self.bot.db.transaction():
+            if present_users:
+                if debug:
+                    logger.debug(f"Recording attendance for mission {mission_name} ({mission_date}): Present users: {present_users}, Absent users: {absent_users}")
+                await Attendance.add_mass_attendance(self.bot.db, present_users, mission_date)
+            # Finished missions are archived by MissionsCog once their attendance is recorded
+            await Missions.set_attendance_recorded(self.bot.db, mission_id)
         if present_users:
-            if debug:
-                logger.debug(f"Recording attendance for mission {mission_name} ({mission_date}): Present users: {present_users}, Absent users: {absent_users}")
-            await Attendance.add_mass_attendance(self.bot.db, present_users, mission_date)
             self.bot.dispatch("attendance", present_users)
         
         
@@ -115,8 +163,8 @@ class AttendanceCog(commands.Cog):
         if not attendance_record:
             await interaction.response.send_message("Brak danych o obecności tego użytkownika.", ephemeral=True)
             return
-        last_mission_date = attendance_record[1]
-        all_time_missions = attendance_record[2]
+        last_mission_date = attendance_record.last_mission_date
+        all_time_missions = attendance_record.all_time_missions
         
         user = interaction.guild.get_member(user_id)
         username = user.name if user else f"Użytkownik {user_id}"
@@ -138,25 +186,18 @@ class AttendanceCog(commands.Cog):
         extras={"category": "Obecność"},
     )
     @app_commands.guild_only()
-    @app_commands.describe(limit="Liczba użytkowników do wyświetlenia w rankingu (domyślnie 10).")
-    async def obecnosc_ranking(self, interaction: discord.Interaction, limit: int = 10):
+    @app_commands.describe(strona="Strona rankingu (po 10 użytkowników, domyślnie 1).")
+    async def obecnosc_ranking(self, interaction: discord.Interaction, strona: app_commands.Range[int, 1] = 1):
         if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
             return
-        leaderboard = await Attendance.get_leaderboard(self.bot.db, limit)
-        if not leaderboard:
+        await self._ensure_leaderboard()
+        if strona == 1 and self.leaderboard.page(0, 1) == []:
             await interaction.response.send_message("Brak danych o obecności użytkowników.", ephemeral=True)
             return
-        embed = discord.Embed(
-            title="Ranking obecności w misjach",
-            color=discord.Color.green()
-        )
-        description_lines = []
-        for rank, (user_id, last_mission_date, all_time_missions) in enumerate(leaderboard, start=1):
-            user = interaction.guild.get_member(user_id)
-            username = user.name if user else f"Użytkownik {user_id}"
-            description_lines.append(f"**#{rank}** - {username}: {all_time_missions} misji (ostatnia: {last_mission_date if last_mission_date else 'Brak danych'})")
-        embed.description = "\n".join(description_lines)
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed, has_next = await self._render_leaderboard(strona)
+        view = LeaderboardPages(self._render_leaderboard, interaction.user.id, strona)
+        view.set_buttons(has_next)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 async def setup(bot:commands.Bot):
     await bot.add_cog(AttendanceCog(bot))
\ No newline at end of file
@@ -8,7 +8,11 @@ class Help(commands.Cog):
     """Help command to display available commands."""
     def __init__(self, bot:commands.Bot):
         self.bot = bot
-        
+        # (permissions relevant to commands, embed) cached per command tree version
+        self._cache_version: int | None = None
+        self._permissions_mask = 0
+        self._embeds: dict[int, discord.Embed] = {}
+
     def _category_for(self, command: app_commands.Command) -> str:
         # Try to get category from command extras
         if getattr(command, "extras", None):
@@ -23,46 +27,67 @@ class Help(commands.Cog):
         return "Inne"
 
     # TODO: Test if works
-    def _user_can_see(self, interaction: discord.Interaction, command: app_commands.Command) -> bool:
+    def _user_can_see(self, permissions: discord.Permissions, command: app_commands.Command) -> bool:
         dp: discord.Permissions | None = getattr(command, "default_permissions", None)
         if dp is None:
             return True
 
-        user_perms = interaction.user.guild_permissions
-        return dp.is_subset(user_perms)
+        return dp.is_subset(permissions)
 
+    def _commands(self) -> list[app_commands.Command]:
+        guild = discord.Object(id=self.bot.guild_id)
+        return [cmd for cmd in self.bot.tree.walk_commands(guild=guild) if isinstance(cmd, app_commands.Command)]
 
-    @app_commands.command(
-        name="help",
-        description="Pokazuje listę dostępnych komend",
-    )
-    async def help(self, interaction: discord.Interaction):
-        embed = discord.Embed(title="Dostępne komendy", color=discord.Color.blue())
+    # Users whose permissions only differ in bits no command requires see the same help,
+    # so the embed is cached per permissions masked to those bits
+    def _profile_key(self, permissions: discord.Permissions) -> int:
+        version = getattr(self.bot.tree, "version", None)
+        if version is None or version != self._cache_version:
+            self._cache_version = version
+            self._embeds.clear()
+            self._permissions_mask = 0
+            for cmd in self._commands():
+                dp = getattr(cmd, "default_permissions", None)
+                if dp is not None:
+                    self._permissions_mask |= dp.value
+        return permissions.value & self._permissions_mask
 
-        guild = discord.Object(id=self.bot.guild_id)
+    def _build_embed(self, permissions: discord.Permissions) -> discord.Embed:
+        embed = discord.Embed(title="Dostępne komendy", color=discord.Color.blue())
         grouped: dict[str, list[app_commands.Command]] = defaultdict(list)
 
-        for cmd in self.bot.tree.walk_commands(guild=guild):
-            if not isinstance(cmd, app_commands.Command):
-                continue
-            if not self._user_can_see(interaction, cmd):
+        for cmd in self._commands():
+            if not self._user_can_see(permissions, cmd):
                 continue
 
             grouped[self._category_for(cmd)].append(cmd)
 
         if not grouped:
             embed.description = "Brak dostępnych komend."
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
+            return embed
 
         for category in sorted(grouped.keys(), key=str.lower):
             cmds = sorted(grouped[category], key=lambda c: c.qualified_name.lower())
             lines = [f"`/{c.qualified_name}` — {c.description or '—'}" for c in cmds]
             embed.add_field(name=category, value="\n".join(lines), inline=False)
-        
+
         embed.description = "Aby uzyskać więcej informacji skorzystaj z dokumentacji klikając [tutaj](https://docs.google.com/document/d/1WYjFjQWeEHbatsnRmbGqsi6jPRKrT3yajF-v5BlGVEw/edit?usp=sharing)"
+        return embed
+
+
+    @app_commands.command(
+        name="help",
+        description="Pokazuje listę dostępnych komend",
+    )
+    async def help(self, interaction: discord.Interaction):
+        permissions = interaction.user.guild_permissions if isinstance(interaction.user, discord.Member) else interaction.permissions
+        key = self._profile_key(permissions)
+        embed = self._embeds.get(key)
+        if embed is None:
+            # Built from the masked permissions so it's valid for everyone with the same key
+            embed = self._embeds[key] = self._build_embed(discord.Permissions(key))
 
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
 async def setup(bot:commands.Bot):
-    await bot.add_cog(Help(bot))
\ No newline at end of file
+    await bot.add_cog(Help(bot))
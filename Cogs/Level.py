@@ -4,7 +4,10 @@ from discord import app_commands
 from db.models import Users
 import logging
 import random
+import time
 from discord.ext import tasks
+from utils.metrics import XP_FLUSH_SECONDS, XP_FLUSH_USERS
+from utils.leaderboard import Leaderboard, LeaderboardPages
 
 logger = logging.getLogger("fogbot")
 
@@ -12,6 +15,7 @@ MAXEXP = 55100
 MAXLVL = 100
 MAXEXPGAIN = 25
 MINEXPGAIN = 10
+PAGE_SIZE = 10
 
 class Level(commands.Cog):
     """User leveling system."""
@@ -19,6 +23,8 @@ class Level(commands.Cog):
         self.bot = bot
         self.users_experience_cache = {}
         self.cooldown_cache = {}
+        # Top 100 by experience including unflushed experience, positions past it come from the database
+        self.leaderboard = Leaderboard(size=100)
         
     _calculate_experience = staticmethod(lambda level: int(5 * (level ** 2) + (50 * level) + 100))
     _calculate_level = staticmethod(lambda experience: int((-50 + (20 * experience + 500)** 0.5) / 10))
@@ -29,7 +35,7 @@ class Level(commands.Cog):
             logger.debug(f"Experience for user {user_id} fetched from cache.")
             return self.users_experience_cache[user_id]
         user = await Users.get_user(self.bot.db, user_id)
-        exp = user[3] if user is not None else 0
+        exp = user.experience if user is not None else 0
         self.users_experience_cache[user_id] = exp
         logger.debug(f"Experience for user {user_id} fetched from database.")
         return exp
@@ -37,14 +43,7 @@ class Level(commands.Cog):
 
     async def _user_level_up(self, user_id: int, level: int) -> None:
         logger.info(f"User {user_id} leveled up to {level}!")
-        await Users.update_level(self.bot.db, user_id, level)
-        
-        try:
-            user = self.bot.get_user(user_id) or await self.bot.fetch_user(user_id)
-            if user is not None:
-                await user.send(f"Gratulacje, awansowałeś na poziom **{level}**! 🎉")
-        except (discord.Forbidden, discord.HTTPException, discord.NotFound) as e:
-            logger.warning(f"Could not DM user {user_id} about level up: {e}")
+        await self.bot.dm_outbox.send(user_id, f"Gratulacje, awansowałeś na poziom **{level}**! 🎉", dedup_key=f"level:{user_id}:{level}")
 
     # Periodically flush cached experience to the database
     @tasks.loop(minutes=1)
@@ -60,23 +59,37 @@ class Level(commands.Cog):
             last_flushed = {}
             setattr(self, "_last_flushed_exp", last_flushed)
 
-        for user_id, exp in list(self.users_experience_cache.items()):
-            prev_exp = last_flushed.get(user_id)
+        started = time.perf_counter()
+        # All updates are committed at once, cache state and DMs only follow a successful commit
+        written: dict[int, int] = {}
+        level_ups: list[tuple[int, int]] = []
+        async with self.bot.db.transaction():
+            for user_id, exp in list(self.users_experience_cache.items()):
+                prev_exp = last_flushed.get(user_id)
+
+                if prev_exp is None:
+                    user = await Users.get_user(self.bot.db, user_id)
+                    prev_exp = user.experience if user is not None else 0
+
+                if exp == prev_exp:
+                    continue
 
-            if prev_exp is None:
-                user = await Users.get_user(self.bot.db, user_id)
-                prev_exp = user[3] if user is not None else 0
+                await Users.update_experience(self.bot.db, user_id, exp)
 
-            if exp == prev_exp:
-                continue
+                if self._check_level_up(prev_exp, exp):
+                    new_level = min(self._calculate_level(exp), MAXLVL)
+                    await Users.update_level(self.bot.db, user_id, new_level)
+                    level_ups.append((user_id, new_level))
 
-            await Users.update_experience(self.bot.db, user_id, exp)
+                written[user_id] = exp
 
-            if self._check_level_up(prev_exp, exp):
-                new_level = min(self._calculate_level(exp), MAXLVL)
-                await self._user_level_up(user_id, new_level)
+        last_flushed.update(written)
+        flushed = len(written)
+        for user_id, level in level_ups:
+            await self._user_level_up(user_id, level)
 
-            last_flushed[user_id] = exp
+        XP_FLUSH_SECONDS.observe(time.perf_counter() - started)
+        XP_FLUSH_USERS.observe(flushed)
 
     @_flush_experience_cache.before_loop
     async def _before_flush_experience_cache(self) -> None:
@@ -109,6 +122,43 @@ class Level(commands.Cog):
         gained_exp = random.randint(MINEXPGAIN, MAXEXPGAIN)
         new_exp = min(current_exp + gained_exp, MAXEXP)
         self.users_experience_cache[user_id] = new_exp
+        self.leaderboard.update(user_id, new_exp, message.author.name)
+
+    async def _ensure_leaderboard(self) -> None:
+        if self.leaderboard.loaded:
+            return
+        rows = await Users.get_leaderboard(self.bot.db, self.leaderboard.size)
+        self.leaderboard.load([(int(uid), experience, username) for uid, username, _, experience in rows])
+        # Experience not flushed yet is newer than the database
+        for uid, experience in self.users_experience_cache.items():
+            user = self.bot.get_user(uid)
+            self.leaderboard.update(uid, experience, user.name if user else f"Użytkownik {uid}")
+
+    async def _leaderboard_page(self, page: int) -> list[tuple[int, int, str]]:
+        await self._ensure_leaderboard()
+        offset = (page - 1) * PAGE_SIZE
+        entries = self.leaderboard.page(offset, PAGE_SIZE + 1)
+        if entries is None:
+            rows = await Users.get_leaderboard(self.bot.db, PAGE_SIZE + 1, offset)
+            entries = [(int(uid), experience, username) for uid, username, _, experience in rows]
+        return entries
+
+    async def _render_leaderboard(self, page: int) -> tuple[discord.Embed, bool]:
+        entries = await self._leaderboard_page(page)
+        embed = discord.Embed(
+            title="Ranking poziomów użytkowników",
+            color=discord.Color.green()
+        )
+        start = (page - 1) * PAGE_SIZE + 1
+        for rank, (_, experience, username) in enumerate(entries[:PAGE_SIZE], start=start):
+            embed.add_field(
+                name=f"#{rank} - {username}",
+                value=f"Poziom: {min(self._calculate_level(experience), MAXLVL)}, Doświadczenie: {experience} XP",
+                inline=False
+            )
+        embed.set_footer(text=f"Strona {page}")
+        # One extra entry was fetched to know whether there is a next page
+        return embed, len(entries) > PAGE_SIZE
         
     # /level
     @app_commands.command(
@@ -123,12 +173,10 @@ class Level(commands.Cog):
         next_level = current_level + 1
         exp_for_next_level = self._calculate_experience(next_level)
         exp_needed = exp_for_next_level - current_exp
-        leaderboard = await Users.get_leaderboard(self.bot.db)
-        rank = 1
-        for idx, (uid, _, _, _) in enumerate(leaderboard, start=1):
-            if uid == user_id:
-                rank = idx
-                break
+        await self._ensure_leaderboard()
+        rank = self.leaderboard.rank(user_id)
+        if rank is None:
+            rank = await Users.count_above(self.bot.db, current_exp) + 1
 
         embed = discord.Embed(
             title=f"Poziom użytkownika {uzytkownik.name if uzytkownik else interaction.user.name}",
@@ -150,20 +198,12 @@ class Level(commands.Cog):
         description="Pokaż ranking poziomów użytkowników.",
         extras={"category": "Poziomy"}
     )
-    @app_commands.describe(limit="Liczba użytkowników do wyświetlenia w rankingu (domyślnie 10).")
-    async def leaderboard(self, interaction: discord.Interaction, limit: int = 10):
-        leaderboard = await Users.get_leaderboard(self.bot.db, limit)
-        embed = discord.Embed(
-            title="Ranking poziomów użytkowników",
-            color=discord.Color.green()
-        )
-        for rank, (_, username, level, experience) in enumerate(leaderboard, start=1):
-            embed.add_field(
-                name=f"#{rank} - {username}",
-                value=f"Poziom: {level}, Doświadczenie: {experience} XP",
-                inline=False
-            )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+    @app_commands.describe(strona="Strona rankingu (po 10 użytkowników, domyślnie 1).")
+    async def leaderboard(self, interaction: discord.Interaction, strona: app_commands.Range[int, 1] = 1):
+        embed, has_next = await self._render_leaderboard(strona)
+        view = LeaderboardPages(self._render_leaderboard, interaction.user.id, strona)
+        view.set_buttons(has_next)
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 async def setup(bot:commands.Bot):
     await bot.add_cog(Level(bot))
\ No newline at end of file
@@ -1,8 +1,11 @@
 import os
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-from db.models import Missions, Slots, Squads
+from db.models import Missions, MissionsArchive, Slots, Squads
+from db.records import record_class
+from utils.bulk import DELETE_MESSAGE
+from utils.tracing import span, traced
 import logging
 import asyncio
 import datetime
@@ -13,6 +16,13 @@ import datetime
 logger = logging.getLogger("fogbot")
 debug = os.getenv("DEBUG") == "True"
 
+# Missions with recorded attendance are archived this many days after their date
+ARCHIVE_AFTER_DAYS = 3
+
+# Same class Slots.get returns rows as, for slots built in memory
+SlotRecord = record_class(("id", "name", "user_id"))
+
+
 def _message_content(slots_dict: dict[int, tuple[int, str, int | None]], squad: str) -> str:
     header = f"📋 Zapisz się do drużyny **{squad}**:"
     lines = [header]
@@ -40,35 +50,55 @@ def _message_content(slots_dict: dict[int, tuple[int, str, int | None]], squad:
 
 
 
-class SlotSelect(discord.ui.Select):
+class SlotSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"mission_select_(?P<message_id>\d+)"):
     # {slot_id: (slot_id, slot, user)}
-    def __init__(self, slots: dict[int, tuple[int, str, int | None]], squad: str, mission_id: int, custom_id: str | None = None):
+    def __init__(self, slots: dict[int, tuple[int, str, int | None]], squad: str | None, mission_id: int | None, message_id: int):
         self.logger = logger
 
-        options = [discord.SelectOption(label=val[1], value=str(key)) for key, val in slots.items() if val[2] is None]
+        options = [discord.SelectOption(label=val.name, value=str(key)) for key, val in slots.items() if val.user_id is None]
         params = {
             "placeholder": "Wybierz slot",
             "options": options,
+            "custom_id": f"mission_select_{message_id}",
         }
         if not options:
             params["options"] = [discord.SelectOption(label="Brak wolnych slotów", value="no_slots")]
             params["disabled"] = True
-        if custom_id is not None:
-            params["custom_id"] = custom_id
-        super().__init__(**params)
+        super().__init__(discord.ui.Select(**params))
 
         self.slots = slots
-        self.custom_id_ = custom_id  # custom_id_ written that way to avoid conflict with parent custom_id property
         self.squad = squad
         self.mission_id = mission_id
+        self.message_id = message_id
+
+    # Built when a slot is picked, from the squad and slots of the message in the database
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        message_id = int(match["message_id"])
+        squad_row = await Squads.get(interaction.client.db, message_id)
+        if squad_row is None:
+            # Cancelled or archived mission, the message can still be in the channel
+            return cls(slots={}, squad=None, mission_id=None, message_id=message_id)
+        slot_rows = await Slots.get(interaction.client.db, message_id)
+        return cls(
+            slots={r.id: r for r in slot_rows},
+            squad=squad_row.name,
+            mission_id=squad_row.mission_id,
+            message_id=message_id,
+        )
 
+    @traced("SlotSelect.callback")
     async def callback(self, interaction: discord.Interaction):
+        if self.mission_id is None:
+            await interaction.response.send_message("Zapisy na tę misję są już zamknięte.", ephemeral=True)
+            return
+
         # We will edit potentially MANY messages => don't use interaction.response.edit_message
         await interaction.response.defer(ephemeral=True)
 
-        selected_value = int(self.values[0])
-        selected_option = next((option for option in self.options if option.value == str(selected_value)), None)
-        selected_label = selected_option.label if selected_option else str(selected_value)
+        selected_value = int(self.item.values[0])
+        selected_slot = self.slots.get(selected_value)
+        selected_label = selected_slot.name if selected_slot else str(selected_value)
         user_id = interaction.user.id
 
         cog = interaction.client.get_cog("MissionsCog")
@@ -77,8 +107,8 @@ class SlotSelect(discord.ui.Select):
         lock = cog._get_mission_lock(self.mission_id) if cog is not None else None
 
         async def do_signup():
-            # Re-check against current in-memory snapshot (cheap); DB is the real source of truth.
-            if selected_value in self.slots and self.slots[selected_value][2] is not None:
+            # Re-check against the slots read when the interaction arrived; DB is the real source of truth.
+            if selected_slot is not None and selected_slot.user_id is not None:
                 await interaction.followup.send("Ten slot jest już zajęty, wybierz inny.", ephemeral=True)
                 return
 
@@ -94,23 +124,23 @@ class SlotSelect(discord.ui.Select):
             try:
                 prev_rows = await Slots.get_by_mission_and_user(interaction.client.db, self.mission_id, user_id)
                 if prev_rows:
-                    # expected shape used elsewhere in file: rows[1] is message_id
-                    prev_message_id = int(prev_rows[1])
+                    prev_message_id = int(prev_rows.message_id)
             except Exception as e:
                 self.logger.exception("Error while checking previous slot assignment", exc_info=e)
 
             # Move user: remove previous (if any), then assign new
             try:
-                if prev_message_id is not None:
-                    # Clears the user from whatever slot they currently have in this mission
-                    await Slots.remove_user_from_slot(interaction.client.db, self.mission_id, user_id)
-
-                await Slots.assign_user_to_slot(
-                    interaction.client.db,
-                    interaction.message.id,
-                    selected_value,
-                    user_id,
-                )
+                async with interaction.client.db.transaction():
+                    if prev_message_id is not None:
+                        # Clears the user from whatever slot they currently have in this mission
+                        await Slots.remove_user_from_slot(interaction.client.db, self.mission_id, user_id)
+
+                    await Slots.assign_user_to_slot(
+                        interaction.client.db,
+                        interaction.message.id,
+                        selected_value,
+                        user_id,
+                    )
             except Exception as e:
                 self.logger.exception("Error while assigning user to slot", exc_info=e)
                 await interaction.followup.send("Wystąpił błąd podczas zapisywania na slot.", ephemeral=True)
@@ -119,28 +149,30 @@ class SlotSelect(discord.ui.Select):
             # Rebuild only affected messages: current + previous (if different)
             if cog is not None and self.mission_id:
                 try:
-                    await cog._rebuild_signup_message(
-                        channel=interaction.channel,
-                        message_id=interaction.message.id,
-                        mission_id=self.mission_id,
-                    )
-                    if prev_message_id is not None and prev_message_id != interaction.message.id:
+                    with span("rebuild signup message"):
                         await cog._rebuild_signup_message(
                             channel=interaction.channel,
-                            message_id=prev_message_id,
+                            message_id=interaction.message.id,
                             mission_id=self.mission_id,
                         )
+                    if prev_message_id is not None and prev_message_id != interaction.message.id:
+                        with span("rebuild previous signup message"):
+                            await cog._rebuild_signup_message(
+                                channel=interaction.channel,
+                                message_id=prev_message_id,
+                                mission_id=self.mission_id,
+                            )
                 except Exception as e:
                     logger.exception("Error while rebuilding affected signup messages", exc_info=e)
             else:
                 # Fallback: rebuild only the current message
                 try:
                     slot_rows = await Slots.get(interaction.client.db, interaction.message.id)
-                    slots_dict = {int(r[0]): (int(r[0]), r[1], r[2]) for r in slot_rows}
+                    slots_dict = {r.id: r for r in slot_rows}
 
                     view = discord.ui.View(timeout=None)
-                    view.add_item(SlotSelect(slots=slots_dict, custom_id=self.custom_id_, squad=self.squad, mission_id=self.mission_id))
-                    view.add_item(SignOutButton(custom_id=f"signout_button_{interaction.message.id}"))
+                    view.add_item(SlotSelect(slots=slots_dict, squad=self.squad, mission_id=self.mission_id, message_id=self.message_id))
+                    view.add_item(SignOutButton(message_id=self.message_id))
                     await interaction.message.edit(content=_message_content(slots_dict=slots_dict, squad=self.squad), view=view)
                 except Exception as e:
                     self.logger.exception("Error while rebuilding current signup message (fallback)", exc_info=e)
@@ -157,32 +189,37 @@ class SlotSelect(discord.ui.Select):
             await do_signup()
 
 
-class SignOutButton(discord.ui.Button):
-    def __init__(self, custom_id: str | None = None):
-        params = {
-            "label": "Wypisz się",
-            "style": discord.ButtonStyle.danger,
-        }
-        if custom_id is not None:
-            params["custom_id"] = custom_id
-        super().__init__(**params)
+class SignOutButton(discord.ui.DynamicItem[discord.ui.Button], template=r"signout_button_(?P<message_id>\d+)"):
+    def __init__(self, message_id: int):
+        super().__init__(
+            discord.ui.Button(
+                label="Wypisz się",
+                style=discord.ButtonStyle.danger,
+                custom_id=f"signout_button_{message_id}",
+            )
+        )
+        self.message_id = message_id
 
-        self.custom_id_ = custom_id  # custom_id_ written that way to avoid conflict with parent custom_id property
+    # The callback finds the user's slot itself, the message id is enough to build the button
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(message_id=int(match["message_id"]))
 
+    @traced("SignOutButton.callback")
     async def callback(self, interaction: discord.Interaction):
-        rows = await Missions.get_channel(interaction.client.db, interaction.channel.id)
+        rows = await interaction.client.mission_channels.get(interaction.channel.id)
         if not rows: # Validation of mission existence
             await interaction.response.send_message("Ta komenda może być użyta tylko w kanale misji.", ephemeral=True)
             return
-        mission_id = rows[0] if rows else None
-        mission_name = rows[1] if rows else None
-        creator_user_id = rows[4] if rows else None
+        mission_id = rows.id if rows else None
+        mission_name = rows.name if rows else None
+        creator_user_id = rows.creator_user_id if rows else None
         
         rows = await Slots.get_by_mission_and_user(interaction.client.db, mission_id, interaction.user.id)
         if not rows:
             await interaction.response.send_message(f"Nie jesteś zapisany na misję {mission_name}.", ephemeral=True)
             return
-        message_id = rows[1]
+        message_id = rows.message_id
         
         # Remove the user from slot and rebuild the view
         await Slots.remove_user_from_slot(interaction.client.db, mission_id, interaction.user.id)
@@ -210,7 +247,6 @@ class MissionsCog(commands.Cog):
         self.bot = bot
         self.logger = logger
         self._mission_locks: dict[int, asyncio.Lock] = {}
-        self._registered_persistent_views: set[int] = set()  # message_ids
         self._scheduled_tasks: set[asyncio.Task] = set()
 
     def _get_mission_lock(self, mission_id: int) -> asyncio.Lock:
@@ -229,68 +265,25 @@ class MissionsCog(commands.Cog):
         if not squad_rows:
             self.logger.warning(f"Cannot rebuild signup message {message_id}: no squad found")
             return
-        squad_name = squad_rows[2]
+        squad_name = squad_rows.name
 
         slot_rows = await Slots.get(self.bot.db, message_id)
-        slots_dict = {int(r[0]): (int(r[0]), r[1], r[2]) for r in slot_rows}
+        slots_dict = {r.id: r for r in slot_rows}
 
         view = discord.ui.View(timeout=None)
         view.add_item(
             SlotSelect(
                 slots=slots_dict,
-                custom_id=f"mission_select_{message_id}",
                 squad=squad_name,
                 mission_id=mission_id,
+                message_id=message_id,
             )
         )
-        view.add_item(SignOutButton(custom_id=f"signout_button_{message_id}"))
+        view.add_item(SignOutButton(message_id=message_id))
 
+        # Only dynamic items, so the edit doesn't keep the view in the bot's view store
         await msg.edit(content=_message_content(slots_dict=slots_dict, squad=squad_name), view=view)
 
-        # IMPORTANT: don't call bot.add_view() here.
-        # Persistent views should be registered once (on startup restore or right after creation).
-
-    async def _restore_missions_views(self):
-        """Restore persistent mission signup views from the database on bot startup."""
-        try:
-            if not hasattr(self.bot, "db") or self.bot.db is None:
-                return
-            logger.info("Restoring mission views from database...")
-            rows = await Slots.list(self.bot.db)
-            missions_map = {}
-            for row in rows:
-                message_id = row[0]
-                slot_id = row[1]
-                slot = row[2]
-                user = row[3]
-                if message_id not in missions_map:
-                    missions_map[message_id] = {}
-                missions_map[message_id][int(slot_id)] = (int(slot_id), slot, user)
-
-            if debug:
-                logger.debug(missions_map)
-
-            for message_id, data in missions_map.items():
-                rows = await Squads.get(self.bot.db, message_id)
-                squad_name = rows[2]
-                mission_id = rows[1]
-                view = discord.ui.View(timeout=None)
-                view.add_item(
-                    SlotSelect(
-                        slots=data,
-                        custom_id=f"mission_select_{message_id}",
-                        squad=squad_name,
-                        mission_id=mission_id,
-                    )
-                )
-                view.add_item(SignOutButton(custom_id=f"signout_button_{message_id}"))
-                self.bot.add_view(view, message_id=message_id)
-                self._registered_persistent_views.add(int(message_id))
-        except Exception as e:
-            logger.exception("Error while restoring mission views", exc_info=e)
-            pass
-        
-    
     async def _sleep_until(self, when: datetime.datetime) -> None:
         """Sleep until `when`."""
         delay = (when - datetime.datetime.now()).total_seconds()
@@ -313,12 +306,13 @@ class MissionsCog(commands.Cog):
             if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
                 return
             logger.info("Restoring mission reminders from database...")
-            rows = await Missions.list(self.bot.db)
-            for row in rows:
-                mission_name = row[1]
-                channel_id = row[2]
-                date_str = row[3]
-                ping_role_id = row[6]
+            # Fills the mission channel cache too, later lookups don't query the database
+            await self.bot.mission_channels.load()
+            for row in self.bot.mission_channels.records():
+                mission_name = row.name
+                channel_id = row.channel_id
+                date_str = row.date
+                ping_role_id = row.ping_role_id
                 
                 date = datetime.datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
                 reminder_time = date - datetime.timedelta(hours=1)
@@ -336,10 +330,56 @@ class MissionsCog(commands.Cog):
         channel = self.bot.get_channel(channel_id) or await self.bot.fetch_channel(channel_id)
         await channel.send(f"🚩 <@&{ping_role_id}> Zapraszam do zapisów na misję **{mission_name}** która odbędzie się {when:%Y-%m-%d}. Szczegóły znajdziecie powyżej!")
 
-    async def cog_load(self):
-        await self._restore_missions_views()
+    # Called by the bot after all cogs are loaded
+    async def cog_restore(self):
         await self._restore_missions_reminders()
 
+    # Signup components of every message are dispatched by custom_id and built when used,
+    # nothing is restored at startup
+    async def cog_load(self) -> None:
+        self.bot.add_dynamic_items(SlotSelect, SignOutButton)
+        self._archive_finished_missions.start()
+
+    async def cog_unload(self) -> None:
+        self._archive_finished_missions.cancel()
+        self.bot.remove_dynamic_items(SlotSelect, SignOutButton)
+
+    async def _archive_missions(self, days: int, require_attendance: bool = True) -> int:
+        """Moves missions older than `days` into missions_archive, their signup messages stop taking signups
+
+        Returns:
+            int: Number of archived missions
+        """
+        before = (datetime.datetime.now() - datetime.timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        rows = await Missions.list_finished(self.bot.db, before, require_attendance)
+        if not rows:
+            return 0
+        mission_ids = [row.id for row in rows]
+        signup_messages = await MissionsArchive.archive(self.bot.db, mission_ids)
+        for row in rows:
+            self.bot.mission_channels.forget(int(row.channel_id))
+
+        # Signup messages stay in the channel, without squad rows their components answer that signups are closed
+        for mission_id in mission_ids:
+            self._mission_locks.pop(mission_id, None)
+
+        logger.info(f"Archived {len(mission_ids)} finished missions ({signup_messages} signup messages)")
+        return len(mission_ids)
+
+    # Keeps missions, squads and slots limited to missions that aren't finished yet
+    @tasks.loop(hours=6)
+    async def _archive_finished_missions(self) -> None:
+        if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
+            return
+        try:
+            await self._archive_missions(ARCHIVE_AFTER_DAYS)
+        except Exception as e:
+            logger.exception("Error while archiving finished missions", exc_info=e)
+
+    @_archive_finished_missions.before_loop
+    async def _before_archive_finished_missions(self) -> None:
+        await self.bot.wait_until_ready()
+
 
 
 
@@ -379,7 +419,7 @@ class MissionsCog(commands.Cog):
             await interaction.response.send_message("Nie masz uprawnień do tworzenia misji.", ephemeral=True)
             return
         
-        rows = await Missions.get_channel(self.bot.db, interaction.channel.id)
+        rows = await self.bot.mission_channels.get(interaction.channel.id)
         if rows: # Validation of existing mission in channel
             await interaction.response.send_message("W tym kanale już istnieje misja.", ephemeral=True)
             return
@@ -410,6 +450,7 @@ class MissionsCog(commands.Cog):
             creator_user_id=interaction.user.id,
             date=data,
         )
+        await self.bot.mission_channels.refresh(interaction.channel.id)
         logger.info(f"User {interaction.user} ({interaction.user.id}) created mission {nazwa} in channel {interaction.channel.id}")
         await interaction.response.send_message(f"Utworzono instancję misji o nazwie {nazwa} w tym kanale. Ten kanał służy teraz jako kanał misji."
                                                 "\nZa godzinę zostanie wysłane powiadomienie o jej stworzeniu.", ephemeral=True)
@@ -424,34 +465,59 @@ class MissionsCog(commands.Cog):
     async def misja_anuluj(self, interaction: discord.Interaction):
         if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
             return
-        rows = await Missions.get_channel(self.bot.db, interaction.channel.id)
+        rows = await self.bot.mission_channels.get(interaction.channel.id)
         if not rows: # Validation of mission existence
             await interaction.response.send_message("Ta komenda może być użyta tylko w kanale misji.", ephemeral=True)
             return
-        mission_id = rows[0]
-        creator_user_id = rows[4]
+        mission_id = rows.id
+        creator_user_id = rows.creator_user_id
         
         if creator_user_id != interaction.user.id and not interaction.user.guild_permissions.administrator: # Validation of permissions
             await interaction.response.send_message("Tylko twórca misji może anulować misję.", ephemeral=True)
             return
         
-        # Cleanup views and messages
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        
+        # Cleanup views and messages (partial messages, no need to fetch them before deleting)
         rows = await Squads.get_by_mission(self.bot.db, mission_id)
-        for row in rows:
-            message_id = row[0]
+        messages = [interaction.channel.get_partial_message(row.message_id) for row in rows]
+        
+        async def delete(message: discord.PartialMessage):
             try:
-                msg = await interaction.channel.fetch_message(message_id)
-                await msg.delete()
+                await message.delete()
             except discord.NotFound:
                 pass
-            except discord.Forbidden:
-                pass
+        
+        await self.bot.bulk.run(f"misja_anuluj {mission_id}", messages, delete, DELETE_MESSAGE)
         
         # Delete mission from DB (cascades to squads and slots)
         await Missions.delete(self.bot.db, mission_id)
+        self.bot.mission_channels.forget(interaction.channel.id)
         logger.info(f"User {interaction.user} ({interaction.user.id}) canceled mission {mission_id} in channel {interaction.channel.id}")
-        await interaction.response.send_message("Misja i wszystkie powiązane dane zostały usunięte.", ephemeral=True)
+        await interaction.followup.send("Misja i wszystkie powiązane dane zostały usunięte.", ephemeral=True)
         
+    # /misje_archiwizuj
+    @app_commands.command(
+        name="misje_archiwizuj",
+        description="Przenosi zakończone misje do archiwum.",
+        extras={"category": "Administracja"},
+    )
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(
+        dni="Archiwizuj misje starsze niż tyle dni",
+        bez_obecnosci="Archiwizuj także misje bez wprowadzonej obecności",
+    )
+    async def misje_archiwizuj(self, interaction: discord.Interaction, dni: app_commands.Range[int, 0, 365] = ARCHIVE_AFTER_DAYS, bez_obecnosci: bool = False):
+        if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        archived = await self._archive_missions(dni, require_attendance=not bez_obecnosci)
+        total = await MissionsArchive.count(self.bot.db)
+        logger.info(f"User {interaction.user} ({interaction.user.id}) archived {archived} missions older than {dni} days")
+        await interaction.followup.send(f"Zarchiwizowano misje: {archived}. Misje w archiwum: {total}.", ephemeral=True)
+
     # /misja_edytuj
     @app_commands.command(
         name="misja_edytuj",
@@ -471,12 +537,12 @@ class MissionsCog(commands.Cog):
         if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
             return
         
-        rows = await Missions.get_channel(self.bot.db, interaction.channel.id)
+        rows = await self.bot.mission_channels.get(interaction.channel.id)
         if not rows: # Validation of mission existence
             await interaction.response.send_message("Ta komenda może być użyta tylko w kanale misji.", ephemeral=True)
             return
-        mission_id = rows[0]
-        creator_user_id = rows[4]
+        mission_id = rows.id
+        creator_user_id = rows.creator_user_id
         
         if creator_user_id != interaction.user.id and not interaction.user.guild_permissions.administrator: # Validation of permissions
             await interaction.response.send_message("Tylko twórca misji może edytować misję.", ephemeral=True)
@@ -484,6 +550,7 @@ class MissionsCog(commands.Cog):
         
         # Update mission in DB
         await Missions.update(self.bot.db, mission_id=mission_id, name=nazwa, date=data)
+        await self.bot.mission_channels.refresh(interaction.channel.id)
         logger.info(f"User {interaction.user} ({interaction.user.id}) edited mission {mission_id} in channel {interaction.channel.id}")
         await interaction.response.send_message("Misja została zaktualizowana.", ephemeral=True)
     
@@ -512,12 +579,12 @@ class MissionsCog(commands.Cog):
         
         if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
             return
-        rows = await Missions.get_channel(self.bot.db, interaction.channel.id)
+        rows = await self.bot.mission_channels.get(interaction.channel.id)
         if not rows: # Validation of mission existence
             await interaction.response.send_message("Ta komenda może być użyta tylko w kanale misji.", ephemeral=True)
             return
-        mission_id = rows[0]
-        creator_user_id = rows[4]
+        mission_id = rows.id
+        creator_user_id = rows.creator_user_id
         
         
         if creator_user_id != interaction.user.id and not interaction.user.guild_permissions.administrator: # Validation of permissions
@@ -527,29 +594,17 @@ class MissionsCog(commands.Cog):
         
         # Construct slots dict for SlotSelect
         max_id = await Slots.max_id(self.bot.db)
-        slots_dict = {i: (i, slot, None) for i, slot in enumerate(slots, start=max_id[0] + 1 if max_id[0] else 0)}
-        
-        view = discord.ui.View()
-        select = SlotSelect(slots=slots_dict, squad=druzyna, mission_id=mission_id)
-        view.add_item(select)
+        slots_dict = {i: SlotRecord(i, slot, None) for i, slot in enumerate(slots, start=max_id[0] + 1 if max_id[0] else 0)}
         
-        await interaction.response.send_message(content=_message_content(slots_dict=slots_dict, squad=druzyna), view=view)
+        await interaction.response.send_message(content=_message_content(slots_dict=slots_dict, squad=druzyna))
         message = await interaction.original_response()
 
-        # make the view persistent using the message id as part of the custom_id
-        persistent_view = discord.ui.View(timeout=None)
-        persistent_view.add_item(SlotSelect(slots_dict, custom_id=f"mission_select_{message.id}", squad=druzyna, mission_id=mission_id))
-        persistent_view.add_item(SignOutButton(custom_id=f"signout_button_{message.id}"))
-        await message.edit(view=persistent_view)
-
-        # Register persistent view once for this message
-        if message.id not in self._registered_persistent_views:
-            self.bot.add_view(persistent_view, message_id=message.id)
-            self._registered_persistent_views.add(message.id)
-
         logger.info(f"User {interaction.user} ({interaction.user.id}) created signup message for mission {mission_id} in channel {interaction.channel.id}")
         await Squads.create(self.bot.db, mission_id, message.id, druzyna)
         await Slots.create(self.bot.db, mission_id, message.id, slots)
+
+        # Components carry the message id in their custom_id, added once the squad and slots they're built from exist
+        await self._rebuild_signup_message(channel=interaction.channel, message_id=message.id, mission_id=mission_id)
         
     # # /zapisy_edytuj
     # @app_commands.command(
@@ -614,12 +669,12 @@ class MissionsCog(commands.Cog):
         if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
             return
         
-        rows = await Missions.get_channel(self.bot.db, interaction.channel.id)
+        rows = await self.bot.mission_channels.get(interaction.channel.id)
         if not rows: # Validation of mission existence
             await interaction.response.send_message("Ta komenda może być użyta tylko w kanale misji.", ephemeral=True)
             return
-        mission_id = rows[0]
-        creator_user_id = rows[4]
+        mission_id = rows.id
+        creator_user_id = rows.creator_user_id
         
         if creator_user_id != interaction.user.id and not interaction.user.guild_permissions.administrator: # Validation of permissions
             await interaction.response.send_message("Tylko twórca misji może usuwać wiadomości do zapisów.", ephemeral=True)
@@ -630,7 +685,7 @@ class MissionsCog(commands.Cog):
             if not rows:
                 await interaction.response.send_message(f"Nie znaleziono drużyny o podanej nazwie {druzyna}.", ephemeral=True)
                 return
-            message_id = rows[0]
+            message_id = rows.message_id
         
         # Delete signup message from channel
         try:
@@ -665,13 +720,13 @@ class MissionsCog(commands.Cog):
         if not hasattr(self.bot, "db") or self.bot.db is None: # Validation of db access
             return
         
-        rows = await Missions.get_channel(self.bot.db, interaction.channel.id)
+        rows = await self.bot.mission_channels.get(interaction.channel.id)
         if not rows: # Validation of mission existence
             await interaction.response.send_message("Ta komenda może być użyta tylko w kanale misji.", ephemeral=True)
             return
-        mission_id = rows[0] if rows else None
-        mission_name = rows[1] if rows else None
-        creator_user_id = rows[4] if rows else None
+        mission_id = rows.id if rows else None
+        mission_name = rows.name if rows else None
+        creator_user_id = rows.creator_user_id if rows else None
         
         # Only admins or the mission creator can remove someone else.
         is_self_remove = (uzytkownik == interaction.user)
@@ -693,7 +748,7 @@ class MissionsCog(commands.Cog):
         if not rows:
             await interaction.response.send_message(f"Użytkownik {uzytkownik.mention} nie jest zapisany na misję {mission_name}.", ephemeral=True)
             return
-        message_id = rows[1]
+        message_id = rows.message_id
         
         # Remove the user from slot and rebuild the view
         await Slots.remove_user_from_slot(self.bot.db, mission_id, uzytkownik.id)
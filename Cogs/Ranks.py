@@ -2,7 +2,9 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from db.models import Users, Ranks, Attendance
+from utils.bulk import ADD_ROLE, REMOVE_ROLE
 import logging
+import asyncio
 
 logger = logging.getLogger("fogbot")
 
@@ -17,54 +19,57 @@ class RanksCog(commands.Cog):
         if not hasattr(self.bot, "db") or self.bot.db is None:
             logger.warning("Database connection is not available.")
             return
+        guild = self.bot.get_guild(self.bot.guild_id)
+        # Role changes are collected and applied together once all promotions are known
+        role_changes = []
         for user_id in user_ids:
             rows = await Users.get_user(self.bot.db, user_id)
             if rows is None:
                 logger.warning(f"User with id {user_id} not found.")
                 continue
-            rank_id = rows[4]
+            rank_id = rows.rank_id
             
             rows = await Attendance.get_by_user(self.bot.db, user_id)
-            all_time_missions = rows[2]
+            all_time_missions = rows.all_time_missions
             
             rows = await Ranks.get(self.bot.db, rank_id)
             if rows is None:
                 logger.warning(f"Rank with id {rank_id} not found.")
                 continue
-            current_rank_id = rows[0]
-            required_missions = rows[3]
+            current_rank_role_id = rows.role_id
+            required_missions = rows.required_missions
             
             rows = await Ranks.get_next_rank(self.bot.db, required_missions)
             if rows is None:
                 logger.warning(f"Next rank with required missions {required_missions} not found.")
                 continue
-            next_rank_id = rows[0]
-            next_rank_name = rows[1]
-            next_rank_role_id = rows[2]
-            next_rank_required = rows[3]
+            next_rank_id = rows.id
+            next_rank_name = rows.name
+            next_rank_role_id = rows.role_id
+            next_rank_required = rows.required_missions
             
             if all_time_missions >= next_rank_required:
                 await Users.update_rank(self.bot.db, user_id, next_rank_id)
-                guild = self.bot.get_guild(self.bot.guild_id)
                 if guild is None:
                     continue
                 member = guild.get_member(user_id)
                 if member is None:
                     continue
-                if current_rank_id is not None:
-                    role = guild.get_role(current_rank_id)
-                    if role is not None:
-                        await member.remove_roles(role)
-                if next_rank_role_id is not None:
-                    role = guild.get_role(next_rank_role_id)
-                    if role is not None:
-                        await member.add_roles(role)
+                old_role = guild.get_role(current_rank_role_id) if current_rank_role_id is not None else None
+                new_role = guild.get_role(next_rank_role_id) if next_rank_role_id is not None else None
+                role_changes.append((member, old_role, new_role))
                         
-                try:
-                    await member.send(f"Gratulacje! Awansowałeś na rangę **{next_rank_name}**!")
-                    logger.info(f"User with id {user_id} promoted to rank {next_rank_name}.")
-                except Exception:
-                    logger.warning(f"Failed to send DM to user with id {user_id}.")
+                await self.bot.dm_outbox.send(user_id, f"Gratulacje! Awansowałeś na rangę **{next_rank_name}**!", dedup_key=f"rank:{user_id}:{next_rank_id}")
+                logger.info(f"User with id {user_id} promoted to rank {next_rank_name}.")
+
+        if role_changes:
+            # Removing and adding a role are separate routes with their own rate limit buckets
+            removals = [(member, old_role) for member, old_role, _ in role_changes if old_role is not None]
+            additions = [(member, new_role) for member, _, new_role in role_changes if new_role is not None]
+            await asyncio.gather(
+                self.bot.bulk.run("rank promotions (old roles)", removals, lambda change: change[0].remove_roles(change[1]), REMOVE_ROLE),
+                self.bot.bulk.run("rank promotions (new roles)", additions, lambda change: change[0].add_roles(change[1]), ADD_ROLE),
+            )
 
 
 async def setup(bot:commands.Bot):
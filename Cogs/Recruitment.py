@@ -54,7 +54,7 @@ class Recruitment(commands.Cog):
         recruitment_message = self.bot.messages.get("recruitment_message", "Gratulacje! Zostałeś zrekrutowany i otrzymałeś rolę Rekrut stając się pełnoprawnym członkiem grupy FOG!")
         recruitment_message = recruitment_message.format(mention=uzytkownik.mention, name=uzytkownik.name, id=uzytkownik.id, guild=uzytkownik.guild.name, display_name=uzytkownik.display_name)
         
-        await uzytkownik.send(recruitment_message)
+        await self.bot.dm_outbox.send(uzytkownik.id, recruitment_message)
         
         await interaction.response.send_message(f"Użytkownik {uzytkownik.mention} został zrekrutowany i otrzymał rolę Rekrut.", ephemeral=True)
         
@@ -67,10 +67,7 @@ class Security(commands.Cog):
             except discord.Forbidden:
                 continue
 
-            try:
-                await after.send(f"Rola {role.name} jest tylko dostępna dla członków grupy.")
-            except discord.Forbidden:
-                pass
+            await self.bot.dm_outbox.send(after.id, f"Rola {role.name} jest tylko dostępna dla członków grupy.", dedup_key=f"security:{after.id}:{role.id}")
         self.deleting_roles = False
 
 async def setup(bot:commands.Bot):
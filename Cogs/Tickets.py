@@ -9,7 +9,10 @@ from discord.ext import commands
 from discord import app_commands
 
 from ticket import core
+from utils.graph import run_graph
+from utils.tracing import traced
 from ticket.ui import (
+    DYNAMIC_ITEMS,
     TicketCreateButtonView,
     TicketCreateSelectView,
     TicketOpenView,
@@ -27,12 +30,27 @@ class TicketsCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self._registered_create_views: set[int] = set()  # message_ids
-        self._registered_ticket_views: set[int] = set()  # channel_ids
+        self._dynamic_items = DYNAMIC_ITEMS + core.get_type_dynamic_items()
 
-    async def cog_load(self):
-        await self._restore_ticket_create_messages()
-        await self._restore_ticket_views()
+    # Components of create messages and ticket channels are dispatched by custom_id and built
+    # when used, nothing is restored at startup
+    async def cog_load(self) -> None:
+        self.bot.add_dynamic_items(*self._dynamic_items)
+        self.bot.config.subscribe("ticket_system", self._rebuild_ticket_categories)
+
+    async def cog_unload(self) -> None:
+        self.bot.config.unsubscribe("ticket_system", self._rebuild_ticket_categories)
+        self.bot.remove_dynamic_items(*self._dynamic_items)
+
+    # Category lookups use an index of ticket_system, rebuilt whenever the section changes
+    def _rebuild_ticket_categories(self, section: str = "ticket_system") -> None:
+        core.METADATA.rebuild_categories(self.bot.ticket_system)
+
+    # Called by the bot after all cogs are loaded
+    async def cog_restore(self):
+        self._rebuild_ticket_categories()
+        if hasattr(self.bot, "db") and self.bot.db is not None:
+            await core.METADATA.load_types(self.bot.db)
 
     def _is_ticket_admin(self, user: discord.Member, channel: discord.TextChannel) -> bool:
         if user.guild_permissions.administrator:
@@ -44,58 +62,6 @@ class TicketsCog(commands.Cog):
         perms = channel.permissions_for(user)
         return perms.manage_messages
 
-    async def _restore_ticket_create_messages(self):
-        try:
-            if not hasattr(self.bot, "db") or self.bot.db is None:
-                return
-            logger.info("Restoring ticket create messages from database...")
-            rows = await core.list_ticket_create_messages(self.bot.db)
-            for row in rows:
-                channel_id, message_id, payload = row
-                if message_id is None:
-                    continue
-                message_id = int(message_id)
-                if message_id in self._registered_create_views:
-                    continue
-
-                mode, categories = core.parse_categories_payload(payload or "")
-                if not categories:
-                    continue
-
-                if mode == "button" and len(categories) == 1:
-                    view = TicketCreateButtonView(
-                        category_name=categories[0],
-                        custom_id=f"ticket_create_button_{message_id}",
-                    )
-                else:
-                    view = TicketCreateSelectView(
-                        categories=categories,
-                        custom_id=f"ticket_create_select_{message_id}",
-                    )
-
-                self.bot.add_view(view, message_id=message_id)
-                self._registered_create_views.add(message_id)
-        except Exception as e:
-            logger.exception("Error while restoring ticket create views", exc_info=e)
-
-    async def _restore_ticket_views(self):
-        try:
-            if not hasattr(self.bot, "db") or self.bot.db is None:
-                return
-            logger.info("Restoring ticket views from database...")
-            rows = await core.list_tickets(self.bot.db)
-            for row in rows:
-                channel_id, status, type_id, user_id, title = row
-                channel_id = int(channel_id)
-                if channel_id in self._registered_ticket_views:
-                    continue
-                status_value = int(status) if status is not None else 1
-                view = TicketOpenView(channel_id=channel_id) if status_value == 1 else TicketClosedView(channel_id=channel_id)
-                self.bot.add_view(view)
-                self._registered_ticket_views.add(channel_id)
-        except Exception as e:
-            logger.exception("Error while restoring ticket views", exc_info=e)
-
     async def _start_ticket_creation(self, interaction: discord.Interaction, category_name: str):
         category = core.get_category_from_config(self.bot, category_name)
         if not category:
@@ -134,32 +100,26 @@ class TicketsCog(commands.Cog):
             await interaction.response.send_message("Wystąpił błąd konfiguracji typów ticketów.", ephemeral=True)
             return
 
+        handler = core.get_type_handler(category.type_name)
+        ticket_manager_ids = []
+        if hasattr(handler, "get_ticket_managers_ids"):
+            ticket_manager_ids = handler.get_ticket_managers_ids(self.bot)
+            if inspect.isawaitable(ticket_manager_ids):
+                ticket_manager_ids = await ticket_manager_ids
+
         try:
             channel = await core.create_ticket_channel(
                 guild=interaction.guild,
                 user=interaction.user,
                 title=title,
                 category_id=category.category_id,
+                ticket_manager_ids=ticket_manager_ids,
             )
         except Exception as e:
             logger.exception("Error while creating ticket channel", exc_info=e)
             await interaction.response.send_message("Nie udało się utworzyć kanału ticketu.", ephemeral=True)
             return
 
-        try:
-            await core.create_ticket_record(
-                self.bot.db,
-                channel_id=channel.id,
-                user_id=interaction.user.id,
-                type_id=type_id,
-                title=title,
-            )
-        except Exception as e:
-            logger.exception("Error while creating ticket record", exc_info=e)
-            await interaction.response.send_message("Nie udało się zapisać ticketu w bazie.", ephemeral=True)
-            return
-
-        handler = core.get_type_handler(category.type_name)
         view = TicketOpenView(channel_id=channel.id)
         if hasattr(handler, "customize_open_view"):
             await handler.customize_open_view(
@@ -170,40 +130,43 @@ class TicketsCog(commands.Cog):
                 category=category,
                 title=title,
             )
-        await channel.send(content=handler.get_open_message(interaction.user, title, self.bot), view=view)
-        
-        if hasattr(handler, "get_ticket_managers_ids"):
-            ticket_manager_ids = handler.get_ticket_managers_ids(self.bot)
-            if inspect.isawaitable(ticket_manager_ids):
-                ticket_manager_ids = await ticket_manager_ids
-            await core.set_permissions_for_ticket_managers(
-                channel=channel,
-                guild=interaction.guild,
-                ticket_manager_ids=ticket_manager_ids,
-            )
+        async def on_created():
+            if hasattr(handler, "on_ticket_created"):
+                await handler.on_ticket_created(
+                    bot=self.bot,
+                    interaction=interaction,
+                    channel=channel,
+                    category=category,
+                    title=title,
+                )
 
-        if hasattr(handler, "on_ticket_created"):
-            await handler.on_ticket_created(
-                bot=self.bot,
-                interaction=interaction,
-                channel=channel,
-                category=category,
+        # Everything after the record only needs the channel, the steps run concurrently
+        nodes = {
+            "record": ((), lambda: core.create_ticket_record(
+                self.bot.db,
+                channel_id=channel.id,
+                user_id=interaction.user.id,
+                type_id=type_id,
                 title=title,
-            )
-
-        if channel.id not in self._registered_ticket_views:
-            self.bot.add_view(view)
-            self._registered_ticket_views.add(channel.id)
-
-        await interaction.response.send_message(
-            f"Ticket został utworzony: {channel.mention}",
-            ephemeral=True,
-        )
+            )),
+            "open_message": (("record",), lambda: channel.send(content=handler.get_open_message(interaction.user, title, self.bot), view=view)),
+            "created_hook": (("record",), on_created),
+            "response": (("record",), lambda: interaction.response.send_message(f"Ticket został utworzony: {channel.mention}", ephemeral=True)),
+        }
+        results = await run_graph(nodes)
+        for name, result in results.items():
+            if result.error is not None:
+                logger.error(f"Error in ticket creation step '{name}' for channel {channel.id}", exc_info=result.error)
+
+        if results["record"].error is not None:
+            await interaction.response.send_message("Nie udało się zapisać ticketu w bazie.", ephemeral=True)
+            return
 
         logger.info(
             f"User {interaction.user} ({interaction.user.id}) created ticket in channel {channel.id} (type {category.type_name})"
         )
 
+    @traced("TicketsCog._handle_ticket_close")
     async def _handle_ticket_close(self, interaction: discord.Interaction, channel_id: int):
         if not hasattr(self.bot, "db") or self.bot.db is None:
             await interaction.response.send_message("Brak dostępu do bazy danych.", ephemeral=True)
@@ -216,33 +179,15 @@ class TicketsCog(commands.Cog):
             await interaction.followup.send("Nie znaleziono ticketu.", ephemeral=True)
             return
 
-        status = int(ticket_row[4])
+        status = int(ticket_row.status)
         if status == 0:
             await interaction.followup.send("Ten ticket jest już zamknięty.", ephemeral=True)
             return
 
-        await core.update_ticket_status(self.bot.db, channel_id, 0)
-
-        try:
-            await core.set_ticket_user_send_permission(
-                interaction.channel,
-                user_id=int(ticket_row[2]) if ticket_row[2] is not None else 0,
-                can_send=False,
-            )
-        except Exception as e:
-            logger.exception("Error while updating ticket permissions on close", exc_info=e)
-
-        view = TicketClosedView(channel_id=channel_id)
-        await interaction.message.edit(view=view)
-
-        type_name = await core.get_ticket_type_name(self.bot.db, int(ticket_row[5])) if ticket_row[5] is not None else None
-        handler = core.get_type_handler(type_name or "custom")
-        await interaction.channel.send(handler.get_closed_message())
-
-        await interaction.followup.send("Ticket został zamknięty.", ephemeral=True)
-
-        logger.info(f"Ticket in channel {channel_id} closed by {interaction.user} ({interaction.user.id})")
+        if await self._set_ticket_status(interaction, channel_id, ticket_row, status=0):
+            logger.info(f"Ticket in channel {channel_id} closed by {interaction.user} ({interaction.user.id})")
 
+    @traced("TicketsCog._handle_ticket_reopen")
     async def _handle_ticket_reopen(self, interaction: discord.Interaction, channel_id: int):
         if not hasattr(self.bot, "db") or self.bot.db is None:
             await interaction.response.send_message("Brak dostępu do bazy danych.", ephemeral=True)
@@ -255,32 +200,50 @@ class TicketsCog(commands.Cog):
             await interaction.followup.send("Nie znaleziono ticketu.", ephemeral=True)
             return
 
-        status = int(ticket_row[4])
+        status = int(ticket_row.status)
         if status == 1:
             await interaction.followup.send("Ten ticket jest już otwarty.", ephemeral=True)
             return
 
-        await core.update_ticket_status(self.bot.db, channel_id, 1)
-
-        try:
-            await core.set_ticket_user_send_permission(
-                interaction.channel,
-                user_id=int(ticket_row[2]) if ticket_row[2] is not None else 0,
-                can_send=True,
-            )
-        except Exception as e:
-            logger.exception("Error while updating ticket permissions on reopen", exc_info=e)
+        if await self._set_ticket_status(interaction, channel_id, ticket_row, status=1):
+            logger.info(f"Ticket in channel {channel_id} reopened by {interaction.user} ({interaction.user.id})")
 
-        view = TicketOpenView(channel_id=channel_id)
-        await interaction.message.edit(view=view)
+    async def _set_ticket_status(self, interaction: discord.Interaction, channel_id: int, ticket_row, status: int) -> bool:
+        """Closes (0) or reopens (1) a ticket, the Discord calls after the status update run concurrently
 
-        type_name = await core.get_ticket_type_name(self.bot.db, int(ticket_row[5])) if ticket_row[5] is not None else None
+        Returns:
+            bool: Whether the status was saved
+        """
+        is_open = status == 1
+        type_name = await core.get_ticket_type_name(self.bot.db, int(ticket_row.type_id)) if ticket_row.type_id is not None else None
         handler = core.get_type_handler(type_name or "custom")
-        await interaction.channel.send(handler.get_reopened_message())
-
-        await interaction.followup.send("Ticket został ponownie otwarty.", ephemeral=True)
+        view = TicketOpenView(channel_id=channel_id) if is_open else TicketClosedView(channel_id=channel_id)
+        action = "reopen" if is_open else "close"
 
-        logger.info(f"Ticket in channel {channel_id} reopened by {interaction.user} ({interaction.user.id})")
+        nodes = {
+            "status": ((), lambda: core.update_ticket_status(self.bot.db, channel_id, status)),
+            "permissions": (("status",), lambda: core.set_ticket_user_send_permission(
+                interaction.channel,
+                user_id=int(ticket_row.user_id) if ticket_row.user_id is not None else 0,
+                can_send=is_open,
+            )),
+            "view": (("status",), lambda: interaction.message.edit(view=view)),
+            "message": (("status",), lambda: interaction.channel.send(
+                handler.get_reopened_message() if is_open else handler.get_closed_message()
+            )),
+            "followup": (("status",), lambda: interaction.followup.send(
+                "Ticket został ponownie otwarty." if is_open else "Ticket został zamknięty.", ephemeral=True
+            )),
+        }
+        results = await run_graph(nodes)
+        for name, result in results.items():
+            if result.error is not None:
+                logger.error(f"Error in ticket {action} step '{name}' for channel {channel_id}", exc_info=result.error)
+
+        if results["status"].error is not None:
+            await interaction.followup.send("Nie udało się zmienić statusu ticketu.", ephemeral=True)
+            return False
+        return True
 
     async def _handle_ticket_transcript(self, interaction: discord.Interaction, channel_id: int):
         if not self._is_ticket_admin(interaction.user, interaction.channel):
@@ -374,8 +337,8 @@ class TicketsCog(commands.Cog):
         if not hasattr(self.bot, "db") or self.bot.db is None:
             return
 
-        # Check if this message is a registered ticket create message
-        if message.id not in self._registered_create_views:
+        # Ticket create messages are sent by the bot, other messages can't have a record
+        if self.bot.user is None or message.author.id != self.bot.user.id:
             return
 
         try:
@@ -383,8 +346,6 @@ class TicketsCog(commands.Cog):
         except Exception as e:
             logger.exception("Error while deleting ticket create message record", exc_info=e)
 
-        self._registered_create_views.discard(message.id)
-
 
 
 
@@ -416,18 +377,12 @@ class TicketsCog(commands.Cog):
         await interaction.response.send_message(content)
         message = await interaction.original_response()
 
-        view = TicketCreateButtonView(
-            category_name=category.name,
-            custom_id=f"ticket_create_button_{message.id}",
-        )
-        await message.edit(view=view)
-
+        # Saved first, the button reads its category from the record when clicked
         payload = core.serialize_categories_payload("button", [category.name])
         await core.save_ticket_create_message(self.bot.db, interaction.channel.id, message.id, payload)
 
-        if message.id not in self._registered_create_views:
-            self.bot.add_view(view, message_id=message.id)
-            self._registered_create_views.add(message.id)
+        view = TicketCreateButtonView(category_name=category.name, message_id=message.id)
+        await message.edit(view=view)
 
         logger.info(f"Ticket create button message created by {interaction.user} ({interaction.user.id})")
 
@@ -469,19 +424,12 @@ class TicketsCog(commands.Cog):
         await interaction.response.send_message(content)
         message = await interaction.original_response()
 
-        view = TicketCreateSelectView(
-            categories=categories,
-            custom_id=f"ticket_create_select_{message.id}",
-        )
+        view = TicketCreateSelectView(categories=categories, message_id=message.id)
         await message.edit(view=view)
 
         payload = core.serialize_categories_payload("select", categories)
         await core.save_ticket_create_message(self.bot.db, interaction.channel.id, message.id, payload)
 
-        if message.id not in self._registered_create_views:
-            self.bot.add_view(view, message_id=message.id)
-            self._registered_create_views.add(message.id)
-
         logger.info(f"Ticket create select message created by {interaction.user} ({interaction.user.id})")
         
         
@@ -5,6 +5,8 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from db.models import Trainings, TrainingSigned
+from utils.tracing import span, traced
+from utils.bulk import ADD_ROLE
 import logging
 import asyncio
 import datetime
@@ -25,15 +27,22 @@ def _training_message_content(training_name: str, date_str: str | None, user_ids
     return "\n".join(lines)
 
 
-class TrainingToggleButton(discord.ui.Button):
+class TrainingToggleButton(discord.ui.DynamicItem[discord.ui.Button], template=r"training_toggle_(?P<training_id>\d+)"):
     def __init__(self, training_id: int):
         super().__init__(
-            label="Zapisz / Wypisz",
-            style=discord.ButtonStyle.primary,
-            custom_id=f"training_toggle_{training_id}",
+            discord.ui.Button(
+                label="Zapisz / Wypisz",
+                style=discord.ButtonStyle.primary,
+                custom_id=f"training_toggle_{training_id}",
+            )
         )
         self.training_id = training_id
 
+    # Built when the button is clicked, the training id is all the state it needs
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(training_id=int(match["training_id"]))
+
     async def callback(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("TrainingsCog")
         if cog is None:
@@ -54,7 +63,13 @@ class TrainingsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self._training_locks: dict[int, asyncio.Lock] = {}
-        self._registered_persistent_views: set[int] = set()  # message_ids
+
+    # Signup buttons of every training message are dispatched by custom_id, nothing is restored at startup
+    async def cog_load(self) -> None:
+        self.bot.add_dynamic_items(TrainingToggleButton)
+
+    async def cog_unload(self) -> None:
+        self.bot.remove_dynamic_items(TrainingToggleButton)
 
     def _get_training_lock(self, training_id: int) -> asyncio.Lock:
         lock = self._training_locks.get(training_id)
@@ -63,29 +78,6 @@ class TrainingsCog(commands.Cog):
             self._training_locks[training_id] = lock
         return lock
 
-    async def cog_load(self):
-        await self._restore_training_views()
-
-    async def _restore_training_views(self):
-        try:
-            if not hasattr(self.bot, "db") or self.bot.db is None:
-                return
-            logger.info("Restoring training signup views from database...")
-            rows = await Trainings.list(self.bot.db)
-            for row in rows:
-                training_id = int(row[0])
-                message_id = row[3]
-                if message_id is None:
-                    continue
-                message_id = int(message_id)
-                if message_id in self._registered_persistent_views:
-                    continue
-                view = TrainingSignupView(training_id=training_id)
-                self.bot.add_view(view, message_id=message_id)
-                self._registered_persistent_views.add(message_id)
-        except Exception as e:
-            logger.exception("Error while restoring training views", exc_info=e)
-
     async def _rebuild_training_message(self, channel: discord.abc.Messageable, message_id: int, training_id: int):
         msg = channel.get_partial_message(message_id)
 
@@ -94,15 +86,16 @@ class TrainingsCog(commands.Cog):
             logger.warning(f"Cannot rebuild training message {message_id}: training {training_id} not found")
             return
 
-        training_name = training_row[1]
-        training_date = training_row[6]
+        training_name = training_row.name
+        training_date = training_row.date
 
         signed_rows = await TrainingSigned.list_by_training(self.bot.db, training_id)
-        user_ids = [int(r[2]) for r in signed_rows if r[2] is not None]
+        user_ids = [int(r.user_id) for r in signed_rows if r.user_id is not None]
 
         view = TrainingSignupView(training_id=training_id)
         await msg.edit(content=_training_message_content(training_name, training_date, user_ids), view=view)
 
+    @traced("TrainingsCog._handle_toggle")
     async def _handle_toggle(self, interaction: discord.Interaction, training_id: int):
         if not hasattr(self.bot, "db") or self.bot.db is None:
             await interaction.response.send_message("Brak dostępu do bazy danych.", ephemeral=True)
@@ -127,11 +120,12 @@ class TrainingsCog(commands.Cog):
                 return
 
             try:
-                await self._rebuild_training_message(
-                    channel=interaction.channel,
-                    message_id=interaction.message.id,
-                    training_id=training_id,
-                )
+                with span("rebuild training message"):
+                    await self._rebuild_training_message(
+                        channel=interaction.channel,
+                        message_id=interaction.message.id,
+                        training_id=training_id,
+                    )
             except Exception as e:
                 logger.exception("Error while rebuilding training message", exc_info=e)
 
@@ -197,10 +191,6 @@ class TrainingsCog(commands.Cog):
 
         await Trainings.set_message_id(self.bot.db, training_id=training_id, message_id=message.id)
 
-        if message.id not in self._registered_persistent_views:
-            self.bot.add_view(view, message_id=message.id)
-            self._registered_persistent_views.add(int(message.id))
-
         logger.info(
             f"User {interaction.user} ({interaction.user.id}) created training {training_id} ({nazwa}) in channel {interaction.channel.id}"
         )
@@ -222,9 +212,9 @@ class TrainingsCog(commands.Cog):
             await interaction.response.send_message("W tym kanale nie ma szkolenia.", ephemeral=True)
             return
 
-        training_id = int(rows[0])
-        creator_user_id = rows[5]
-        message_id = rows[3]
+        training_id = int(rows.id)
+        creator_user_id = rows.creator_user_id
+        message_id = rows.message_id
 
         if creator_user_id != interaction.user.id and not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("Tylko twórca szkolenia może je anulować.", ephemeral=True)
@@ -264,10 +254,10 @@ class TrainingsCog(commands.Cog):
             await interaction.response.send_message("W tym kanale nie ma szkolenia.", ephemeral=True)
             return
 
-        training_id = int(rows[0])
-        training_name = rows[1]
-        training_date = rows[6]
-        creator_user_id = rows[5]
+        training_id = int(rows.id)
+        training_name = rows.name
+        training_date = rows.date
+        creator_user_id = rows.creator_user_id
 
         if creator_user_id != interaction.user.id and not interaction.user.guild_permissions.administrator:
             await interaction.response.send_message("Tylko twórca szkolenia może zatwierdzać obecność.", ephemeral=True)
@@ -280,17 +270,18 @@ class TrainingsCog(commands.Cog):
             await interaction.response.send_message("Brak zapisanych użytkowników na to szkolenie.", ephemeral=True)
             return
 
-        present_users = [int(r[2]) for r in rows if str(r[2]) not in absent_users]
-        for user_id in present_users:
-            member = interaction.guild.get_member(user_id)
-            if member:
-                try:
-                    await member.add_roles(rola, reason=f"Obecność na szkoleniu {training_name}")
-                except Exception as e:
-                    logger.warning(f"Nie udało się nadać rolę użytkownikowi {user_id}: {e}")
-                    continue
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        present_users = [int(r.user_id) for r in rows if str(r.user_id) not in absent_users]
+        present_members = [member for member in (interaction.guild.get_member(user_id) for user_id in present_users) if member]
+        result = await self.bot.bulk.run(
+            f"szkolenie_obecnosc {training_id}",
+            present_members,
+            lambda member: member.add_roles(rola, reason=f"Obecność na szkoleniu {training_name}"),
+            ADD_ROLE,
+        )
 
-        all_user_ids = [int(r[2]) for r in rows if r[2] is not None]
+        all_user_ids = [int(r.user_id) for r in rows if r.user_id is not None]
 
         lines = [f"📌 Obecność na szkoleniu **{training_name}** {training_date}".strip()]
         for uid in all_user_ids:
@@ -302,7 +293,7 @@ class TrainingsCog(commands.Cog):
         channel = self.bot.get_channel(self.bot.channels["attendance_channel_id"])
         await channel.send(message_content)
 
-        await interaction.response.send_message("Obecność została zapisana, a rola nadana obecnym uczestnikom.", ephemeral=True)
+        await interaction.followup.send(f"Obecność została zapisana, a rola nadana obecnym uczestnikom. {result.summary()}", ephemeral=True)
         logger.info(f"Attendance for training {training_name} ({training_date}) recorded by {interaction.user.name}.")
 
 
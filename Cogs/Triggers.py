@@ -2,16 +2,54 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from os import getenv
+from typing import NamedTuple
 import logging
 
 logger = logging.getLogger("fogbot")
 debug = getenv("DEBUG", "False") == "True"
 
+
+class TriggerMatcher(NamedTuple):
+    keyword: str
+    case_sensitive: bool
+    whole_word: bool
+    cooldown_seconds: int
+    response: str
+
+
 class Triggers(commands.Cog):
     """Custom actions triggered by key words in messages."""
     def __init__(self, bot:commands.Bot):
         self.bot = bot
         self.last_triggered_times = {} 
+        self.matchers: list[TriggerMatcher] = []
+        self._rebuild_matchers()
+
+    async def cog_load(self) -> None:
+        self.bot.config.subscribe("message_triggers", self._rebuild_matchers)
+
+    async def cog_unload(self) -> None:
+        self.bot.config.unsubscribe("message_triggers", self._rebuild_matchers)
+
+    # Precompute enabled triggers, called again whenever message_triggers change
+    def _rebuild_matchers(self, section: str = "message_triggers") -> None:
+        matchers = []
+        for trigger in self.bot.message_triggers:
+            if not trigger.get("enabled", False): # Skip if trigger is not enabled
+                continue
+            case_sensitive = bool(trigger.get("case_sensitive", False))
+            keyword = trigger.get("keyword", "") if case_sensitive else trigger.get("keyword", "").lower()
+            if keyword == "": # Skip if keyword is empty
+                continue
+            matchers.append(TriggerMatcher(
+                keyword=keyword,
+                case_sensitive=case_sensitive,
+                whole_word=bool(trigger.get("whole_word", False)),
+                cooldown_seconds=trigger.get("cooldown_seconds", 0),
+                response=trigger.get("response", ""),
+            ))
+        self.matchers = matchers
+        logger.debug(f"Rebuilt trigger matchers: {len(matchers)} enabled of {len(self.bot.message_triggers)}")
     
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
@@ -44,76 +82,41 @@ class Triggers(commands.Cog):
         #     await message.channel.send("https://tenor.com/view/fish-sleeping-gif-7324897647942850226")
         
         
+        if not self.matchers:
+            return
+        
         if debug:
             logger.debug(f"Message content: {message.content}")
-            logger.debug(f"Available triggers: {self.bot.message_triggers}")
-            logger.debug(f"last_triggered_times: {self.last_triggered_times}")
-        
-        if not self.bot.message_triggers:
-            return
+            logger.debug(f"Enabled triggers: {len(self.matchers)}, last_triggered_times: {len(self.last_triggered_times)}")
 
-        for trigger in self.bot.message_triggers: # Iterate through each trigger
-            if not trigger.get("enabled", False): # Skip if trigger is not enabled
-                if debug:
-                    logger.debug(f"Trigger '{trigger.get('keyword', '')}' is not enabled, skipping.")
-                continue
-            
-            if trigger.get("case_sensitive", False): # Check case sensitivity
-                if debug:
-                    logger.debug(f"Trigger '{trigger.get('keyword', '')}' is case sensitive.")
-                keyword = trigger.get("keyword", "")
+        # Content variants are prepared once per message and shared by all triggers
+        contents = {True: message.content, False: None}
+        words = {}
+        for matcher in self.matchers:
+            content_to_check = contents[matcher.case_sensitive]
+            if content_to_check is None:
+                content_to_check = contents[False] = message.content.lower()
+
+            if matcher.whole_word: # Check the word based on whole word match setting
+                if matcher.case_sensitive not in words:
+                    words[matcher.case_sensitive] = set(content_to_check.split())
+                matched = matcher.keyword in words[matcher.case_sensitive]
             else:
-                keyword = trigger.get("keyword", "").lower()
-            
-            if keyword == "": # Skip if keyword is empty
-                if debug:
-                    logger.debug("Trigger keyword is empty, skipping.")
+                matched = matcher.keyword in content_to_check
+            if not matched:
                 continue
-            
-            # if len(trigger.get("channels", [])) > 0 and message.channel.id not in trigger.get("channels", []): # Check channel restrictions
-            #     if debug:
-            #         logger.debug(f"Trigger '{keyword}' is not allowed in this channel, skipping.")
-            #     continue
-            
-            # if len(trigger.get("roles", [])) > 0: # Check role restrictions
-            #     if debug:
-            #         logger.debug(f"Trigger '{keyword}' has role restrictions, checking user roles.")
-            #     has_role = False
-            #     for role in message.author.roles:
-            #         if role.id in trigger.get("roles", []):
-            #             has_role = True
-            #             break
-            #     if not has_role:
-            #         continue
-            
-            content_to_check = message.content if trigger.get("case_sensitive", False) else message.content.lower() # Prepare content for checking based on case sensitivity
-            if debug:
-                logger.debug(f"Content to check for trigger '{keyword}': {content_to_check}")
-            matched = False
-            if trigger.get("whole_word", False): # Check the word based on whole word match setting
-                if debug:
-                    logger.debug(f"Trigger '{keyword}' requires whole word match.")
-                words = content_to_check.split()
-                if keyword in words:
-                    matched = True
-            else:
-                if content_to_check.find(keyword) != -1:
-                    matched = True
-                    
-            if matched:
-                cooldown_seconds = trigger.get("cooldown_seconds", 0)
-                if cooldown_seconds > 0: # Check cooldown
-                    last_triggered_time = self.last_triggered_times.get(keyword, 0)
-                    current_time = discord.utils.utcnow().timestamp()
-                    if current_time - last_triggered_time < cooldown_seconds:
-                        if debug:
-                            logger.debug(f"Trigger '{keyword}' is on cooldown, skipping.")
-                        continue
-                    self.last_triggered_times[keyword] = current_time
-                    
-                response = trigger.get("response", "")
-                if response != "":
-                    await message.channel.send(response)
+
+            if matcher.cooldown_seconds > 0: # Check cooldown
+                last_triggered_time = self.last_triggered_times.get(matcher.keyword, 0)
+                current_time = discord.utils.utcnow().timestamp()
+                if current_time - last_triggered_time < matcher.cooldown_seconds:
+                    if debug:
+                        logger.debug(f"Trigger '{matcher.keyword}' is on cooldown, skipping.")
+                    continue
+                self.last_triggered_times[matcher.keyword] = current_time
+
+            if matcher.response != "":
+                await message.channel.send(matcher.response)
                 
 
 async def setup(bot:commands.Bot):
@@ -2,16 +2,34 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 from datetime import datetime
+from typing import Literal
+import asyncio
+import cProfile
+import io
+import marshal
+import pstats
+import tracemalloc
 from db.models import Attendance, Users, Ranks
+from db.instrumentation import STATS as DB_STATS
+from utils.bulk import ADD_ROLE
 import logging
 
 logger = logging.getLogger("fogbot")
 
 
+# Check for commands reserved for the bot owner (owner_id in configuration.json)
+def is_owner():
+    async def predicate(interaction: discord.Interaction) -> bool:
+        return await interaction.client.is_owner(interaction.user)
+    return app_commands.check(predicate)
+
+
 class Utilities(commands.Cog):
     """Utility commands for the bot."""
     def __init__(self, bot:commands.Bot):
         self.bot = bot
+        self._profiling = False
+        self._memory_snapshot: tracemalloc.Snapshot | None = None
 
 
     # =========== Information section ===========
@@ -44,6 +62,132 @@ class Utilities(commands.Cog):
         uptime_str = str(uptime).split(".")[0]  # drop microseconds
         embed.add_field(name="Czas działania", value=uptime_str, inline=False)
         await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    # /profile_cpu
+    @app_commands.command(
+        name="profile_cpu",
+        description="Profiluj działanie bota przez podaną liczbę sekund (cProfile)",
+        extras={"category": "Administracja"},
+    )
+    @app_commands.describe(
+        sekundy="Czas profilowania w sekundach",
+        sortowanie="cumulative - łączny czas z wywołaniami, tottime - czas własny funkcji",
+        ilosc="Liczba funkcji w raporcie",
+    )
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @is_owner()
+    async def profile_cpu(
+        self,
+        interaction: discord.Interaction,
+        sekundy: app_commands.Range[int, 1, 300] = 30,
+        sortowanie: Literal["cumulative", "tottime"] = "cumulative",
+        ilosc: app_commands.Range[int, 10, 200] = 50,
+    ):
+        if self._profiling:
+            await interaction.response.send_message("Profilowanie jest już w toku.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        # Everything on the event loop runs in this thread, so the profile covers all handlers
+        self._profiling = True
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            await asyncio.sleep(sekundy)
+        except ValueError as e:
+            # Another profiler (e.g. the one of --profile-startup) is active
+            await interaction.followup.send(f"Nie udało się uruchomić profilera: {e}", ephemeral=True)
+            return
+        finally:
+            profiler.disable()
+            self._profiling = False
+
+        report = io.StringIO()
+        pstats.Stats(profiler, stream=report).sort_stats(sortowanie).print_stats(ilosc)
+        # Same format as Profile.dump_stats (which only writes to a path), opens in pstats / snakeviz
+        profiler.create_stats()
+        files = [
+            discord.File(io.BytesIO(report.getvalue().encode("utf-8")), filename="profile.txt"),
+            discord.File(io.BytesIO(marshal.dumps(profiler.stats)), filename="profile.prof"),
+        ]
+        logger.info(f"CPU profile of {sekundy} s taken by {interaction.user}")
+        await interaction.followup.send(f"Profil z {sekundy} s (sortowanie: {sortowanie}).", files=files, ephemeral=True)
+
+    @staticmethod
+    def _take_memory_snapshot() -> tracemalloc.Snapshot:
+        snapshot = tracemalloc.take_snapshot()
+        # Skip tracemalloc itself and linecache filled by formatting the previous reports
+        return snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "*/linecache.py"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+
+    # /profile_memory
+    @app_commands.command(
+        name="profile_memory",
+        description="Śledź alokacje pamięci bota (tracemalloc)",
+        extras={"category": "Administracja"},
+    )
+    @app_commands.describe(
+        akcja="start - włącz śledzenie, snapshot - zapisz stan i pokaż największe alokacje, diff - porównaj z zapisanym stanem, stop - wyłącz",
+        ilosc="Liczba pozycji w raporcie",
+    )
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @is_owner()
+    async def profile_memory(
+        self,
+        interaction: discord.Interaction,
+        akcja: Literal["start", "snapshot", "diff", "stop"],
+        ilosc: app_commands.Range[int, 10, 200] = 25,
+    ):
+        if akcja == "start":
+            if tracemalloc.is_tracing():
+                await interaction.response.send_message("Śledzenie pamięci jest już włączone.", ephemeral=True)
+                return
+            tracemalloc.start(10)
+            self._memory_snapshot = None
+            logger.info(f"tracemalloc started by {interaction.user}")
+            await interaction.response.send_message("Włączono śledzenie pamięci, użyj `snapshot` aby zapisać stan.", ephemeral=True)
+            return
+
+        if akcja == "stop":
+            tracemalloc.stop()
+            self._memory_snapshot = None
+            logger.info(f"tracemalloc stopped by {interaction.user}")
+            await interaction.response.send_message("Wyłączono śledzenie pamięci.", ephemeral=True)
+            return
+
+        if not tracemalloc.is_tracing():
+            await interaction.response.send_message("Śledzenie pamięci jest wyłączone, użyj najpierw `start`.", ephemeral=True)
+            return
+        if akcja == "diff" and self._memory_snapshot is None:
+            await interaction.response.send_message("Brak zapisanego stanu, użyj najpierw `snapshot`.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+
+        # Taking, filtering and comparing snapshots walks every traced block, keep it off the event loop
+        snapshot = await asyncio.to_thread(self._take_memory_snapshot)
+        current, peak = tracemalloc.get_traced_memory()
+        header = f"Śledzona pamięć: {current / 1024 / 1024:.1f} MiB (szczyt {peak / 1024 / 1024:.1f} MiB)"
+
+        if akcja == "snapshot":
+            stats = await asyncio.to_thread(snapshot.statistics, "lineno")
+            self._memory_snapshot = snapshot
+            lines = [f"{stat.size / 1024:>10.1f} KiB {stat.count:>8} {stat.traceback}" for stat in stats[:ilosc]]
+            title = "Największe alokacje (zapisano jako stan do porównania)"
+        else:
+            stats = await asyncio.to_thread(snapshot.compare_to, self._memory_snapshot, "lineno")
+            lines = [f"{stat.size_diff / 1024:>+10.1f} KiB {stat.count_diff:>+8} {stat.traceback}" for stat in stats[:ilosc]]
+            title = "Zmiany od zapisanego stanu"
+
+        # Full tracebacks of the biggest entries for finding who allocates
+        details = "\n\n".join("\n".join(stat.traceback.format()) for stat in stats[:10])
+        report = f"{header}\n{title}\n\n" + "\n".join(lines) + "\n\n" + details
+        file = discord.File(io.BytesIO(report.encode("utf-8")), filename=f"memory_{akcja}.txt")
+        await interaction.followup.send(f"{header}\n```\n" + "\n".join(lines[:10])[:1700] + "\n```", file=file, ephemeral=True)
     
     
     
@@ -52,23 +196,63 @@ class Utilities(commands.Cog):
     # /clear
     @app_commands.command(
         name="clear",
-        description="Usuń określoną liczbę wiadomości z kanału",
+        description="Usuń wiadomości z kanału",
     )
     @app_commands.describe(
-        liczba="Liczba wiadomości do usunięcia (maksymalnie 100)"
+        liczba="Maksymalna liczba wiadomości do usunięcia",
+        autor="Usuń tylko wiadomości tego użytkownika",
+        przed="Usuń tylko wiadomości starsze niż podana wiadomość (ID) lub data (YYYY-MM-DD HH:MM:SS)",
+        po="Usuń tylko wiadomości nowsze niż podana wiadomość (ID) lub data (YYYY-MM-DD HH:MM:SS)",
+        zawiera="Usuń tylko wiadomości zawierające ten tekst (bez rozróżniania wielkości liter)",
     )
     @app_commands.guild_only()
     @app_commands.default_permissions(administrator=True)
     @app_commands.checks.has_permissions(administrator=True)
-    async def clear(self, interaction: discord.Interaction, liczba: int):
-        if liczba < 1 or liczba > 100:
-            await interaction.response.send_message("Liczba musi być pomiędzy 1 a 100.", ephemeral=True)
+    async def clear(
+        self,
+        interaction: discord.Interaction,
+        liczba: app_commands.Range[int, 1, 10000],
+        autor: discord.User = None,
+        przed: str = None,
+        po: str = None,
+        zawiera: str = None,
+    ):
+        try:
+            before = self._parse_history_point(przed)
+            after = self._parse_history_point(po)
+        except ValueError:
+            await interaction.response.send_message("Niepoprawny punkt w historii. Podaj ID wiadomości lub datę w formacie YYYY-MM-DD HH:MM:SS.", ephemeral=True)
             return
-        
+
         await interaction.response.defer(ephemeral=True, thinking=True)
 
-        deleted = await interaction.channel.purge(limit=liczba)
-        await interaction.followup.send(f"Usunięto {len(deleted)} wiadomości.", ephemeral=True)
+        needle = zawiera.casefold() if zawiera else None
+        def check(message: discord.Message) -> bool:
+            if autor is not None and message.author.id != autor.id:
+                return False
+            if needle is not None and needle not in message.content.casefold():
+                return False
+            return True
+
+        async def progress(deleted: int, scanned: int):
+            await interaction.edit_original_response(content=f"Usuwanie wiadomości: usunięto {deleted}, przejrzano {scanned}...")
+
+        result = await self.bot.bulk.purge(interaction.channel, liczba, check, before=before, after=after, progress=progress)
+        logger.info(f"User {interaction.user} ({interaction.user.id}) deleted {result.succeeded} messages in channel {interaction.channel.id}")
+        text = f"Usunięto {result.succeeded} wiadomości."
+        if result.failed:
+            text += f" Nie udało się usunąć: {len(result.failed)}."
+        await interaction.followup.send(text, ephemeral=True)
+
+    # Message ID or local date and time for /clear
+    @staticmethod
+    def _parse_history_point(value: str | None) -> discord.Object | datetime | None:
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return discord.Object(id=int(value))
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
         
     #/change_user_missions
     @app_commands.command(
@@ -93,6 +277,7 @@ class Utilities(commands.Cog):
                 break
         
         await Attendance.update_all_time_missions(self.bot.db, user.id, liczba)
+        self.bot.dispatch("attendance_updated", [user.id])
         await interaction.response.send_message(f"Ilość misji użytkownika została zmieniona na {liczba}.", ephemeral=True)
         
     #/assign_categories_roles
@@ -116,17 +301,21 @@ class Utilities(commands.Cog):
             await interaction.followup.send("Nie można znaleźć serwera.", ephemeral=True)
             return
         
-        members = [member for member in guild.members if not member.bot]
-        for member in members:
-            for role_id in categories_roles_ids:
-                role = guild.get_role(role_id)
-                if role and role not in member.roles:
-                    try:
-                        await member.add_roles(role)
-                    except Exception as e:
-                        logger.error(f"Nie udało się przypisać rolę {role.name} użytkownikowi {member.name}: {e}")
+        roles = [role for role in (guild.get_role(role_id) for role_id in categories_roles_ids) if role]
+        assignments = [(member, role) for member in guild.members if not member.bot for role in roles if role not in member.roles]
+        
+        async def progress(done: int, total: int):
+            await interaction.edit_original_response(content=f"Przypisywanie ról kategorii: {done}/{total}...")
+        
+        result = await self.bot.bulk.run(
+            "assign_categories_roles",
+            assignments,
+            lambda assignment: assignment[0].add_roles(assignment[1]),
+            ADD_ROLE,
+            progress,
+        )
         
-        await interaction.followup.send("Role kategorii zostały przypisane wszystkim użytkownikom.", ephemeral=True)
+        await interaction.followup.send(f"Role kategorii zostały przypisane wszystkim użytkownikom. {result.summary()}", ephemeral=True)
         
     #/send_message
     @app_commands.command(
@@ -151,6 +340,120 @@ class Utilities(commands.Cog):
     
     
     
+    #/config_reload
+    @app_commands.command(
+        name="config_reload",
+        description="Wczytaj ponownie plik konfiguracyjny",
+        extras={"category": "Administracja"},
+    )
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def config_reload(self, interaction: discord.Interaction):
+        try:
+            changed = await self.bot.config.reload()
+        except Exception as e:
+            logger.exception("Error while reloading configuration", exc_info=e)
+            await interaction.response.send_message("Nie udało się wczytać konfiguracji.", ephemeral=True)
+            return
+
+        if not changed:
+            await interaction.response.send_message("Konfiguracja nie uległa zmianie.", ephemeral=True)
+            return
+        await interaction.response.send_message(f"Wczytano zmienione sekcje: {', '.join(changed)}.", ephemeral=True)
+
+    # /db_stats
+    @app_commands.command(
+        name="db_stats",
+        description="Wyświetl czasy zapytań do bazy danych",
+        extras={"category": "Administracja"},
+    )
+    @app_commands.describe(reset="Wyzeruj statystyki po wyświetleniu")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_stats(self, interaction: discord.Interaction, reset: bool = False):
+        top = DB_STATS.top(15)
+        if not top:
+            await interaction.response.send_message("Brak zarejestrowanych zapytań.", ephemeral=True)
+            return
+
+        # Times in milliseconds, percentiles over the last calls of each method
+        lines = [f"{'metoda':<34}{'n':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'max':>8}{'suma':>9}"]
+        for method, stats in top:
+            lines.append(
+                f"{method[:33]:<34}{stats.count:>7}"
+                f"{stats.percentile(0.5) * 1000:>8.1f}{stats.percentile(0.95) * 1000:>8.1f}"
+                f"{stats.percentile(0.99) * 1000:>8.1f}{stats.max * 1000:>8.1f}{stats.total * 1000:>9.0f}"
+            )
+        if reset:
+            DB_STATS.reset()
+
+        await interaction.response.send_message("```\n" + "\n".join(lines) + "\n```", ephemeral=True)
+
+    # /db_backup
+    @app_commands.command(
+        name="db_backup",
+        description="Wykonaj kopię zapasową bazy danych",
+        extras={"category": "Administracja"},
+    )
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def db_backup(self, interaction: discord.Interaction):
+        backups = self.bot.backups
+        waiting = " (czeka na trwającą kopię)" if backups.running else ""
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            path = await backups.snapshot()
+        except Exception as e:
+            logger.exception("Manual database backup failed", exc_info=e)
+            await interaction.followup.send("Nie udało się wykonać kopii zapasowej.", ephemeral=True)
+            return
+
+        logger.info(f"Database backup {path.name} requested by {interaction.user}")
+        await interaction.followup.send(
+            f"Zapisano kopię zapasową `{path.name}` ({path.stat().st_size / 1024:.0f} KiB){waiting}. "
+            f"Przechowywane kopie: {len(backups.snapshots())}/{backups.keep}.",
+            ephemeral=True,
+        )
+
+    # /loop_lag
+    @app_commands.command(
+        name="loop_lag",
+        description="Wyświetl ostatnie blokady pętli zdarzeń bota",
+        extras={"category": "Administracja"},
+    )
+    @app_commands.describe(ilosc="Liczba ostatnich zdarzeń do wyświetlenia")
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def loop_lag(self, interaction: discord.Interaction, ilosc: app_commands.Range[int, 1, 50] = 10):
+        watchdog = getattr(self.bot, "watchdog", None)
+        if watchdog is None:
+            await interaction.response.send_message("Watchdog pętli zdarzeń jest wyłączony.", ephemeral=True)
+            return
+        events = list(watchdog.events)[-ilosc:]
+        if not events:
+            await interaction.response.send_message("Brak zarejestrowanych blokad.", ephemeral=True)
+            return
+
+        lines = []
+        for event in reversed(events):
+            location = event.stack[-1].strip().splitlines()[0] if event.stack else "brak stosu"
+            lines.append(f"{event.timestamp:%Y-%m-%d %H:%M:%S} | {event.lag * 1000:.0f} ms | {event.task or 'nieznane'}\n    {location}")
+
+        # Full stacks go into an attachment, they don't fit in a message
+        report = "\n\n".join(
+            f"{event.timestamp.isoformat()} {event.lag * 1000:.0f} ms {event.task or ''}\n" + "".join(event.stack)
+            for event in reversed(events)
+        )
+        file = discord.File(io.BytesIO(report.encode("utf-8")), filename="loop_lag.txt")
+        await interaction.response.send_message("```\n" + "\n".join(lines)[:1900] + "\n```", file=file, ephemeral=True)
+
+    
+    
+    
     # =========== Permissions section ===========
     # /permissions_list
     @app_commands.command(
@@ -234,6 +537,7 @@ class Utilities(commands.Cog):
                 return
             self.bot.permissions[kategoria].append(role_id)
 
+        await self.bot.config.commit("permissions")
         await interaction.response.send_message("Uprawnienia zostały zaktualizowane.", ephemeral=True)
         
     # /permissions_remove
@@ -277,6 +581,7 @@ class Utilities(commands.Cog):
                 return
             self.bot.permissions[kategoria].remove(role_id)
 
+        await self.bot.config.commit("permissions")
         await interaction.response.send_message("Uprawnienia zostały zaktualizowane.", ephemeral=True)
         
         
@@ -334,6 +639,7 @@ class Utilities(commands.Cog):
             return
 
         self.bot.channels[kategoria] = kanal.id
+        await self.bot.config.commit("channels")
         await interaction.response.send_message(f"Kanał dla kategorii '{kategoria}' został ustawiony na {kanal.mention}.", ephemeral=True)
         
     # /channels_remove
@@ -358,6 +664,7 @@ class Utilities(commands.Cog):
             return
 
         self.bot.channels[kategoria] = None
+        await self.bot.config.commit("channels")
         await interaction.response.send_message(f"Kanał dla kategorii '{kategoria}' został usunięty.", ephemeral=True)
     
     
@@ -418,6 +725,7 @@ class Utilities(commands.Cog):
         categories = self.bot.ticket_system.get("ticket_categories", [])
         categories.append({"name": name, "description": description, "type": "custom", "category_id": category.id, "prompt_title": prompt_title})
         self.bot.ticket_system["ticket_categories"] = categories
+        await self.bot.config.commit("ticket_system")
 
         await interaction.response.send_message(f"Kategoria ticketów '{name}' została dodana.", ephemeral=True)
     
@@ -454,6 +762,7 @@ class Utilities(commands.Cog):
             return
 
         self.bot.ticket_system["ticket_categories"] = categories
+        await self.bot.config.commit("ticket_system")
         await interaction.response.send_message(f"Kategoria ticketów '{name}' została usunięta.", ephemeral=True)
         
         
@@ -551,6 +860,7 @@ class Utilities(commands.Cog):
         }
 
         self.bot.message_triggers.append(new_trigger)
+        await self.bot.config.commit("message_triggers")
         await interaction.response.send_message(f"Nowa wiadomość wyzwalająca została dodana: {keyword}", ephemeral=True)
         
     # /triggers_edit
@@ -591,6 +901,7 @@ class Utilities(commands.Cog):
                     trigger["cooldown_seconds"] = new_cooldown_seconds
                 if new_description is not None:
                     trigger["description"] = new_description
+                await self.bot.config.commit("message_triggers")
 
                 await interaction.response.send_message(f"Wiadomość wyzwalająca '{keyword}' została zaktualizowana.", ephemeral=True)
                 return
@@ -618,6 +929,7 @@ class Utilities(commands.Cog):
         for trigger in self.bot.message_triggers:
             if trigger.get("keyword") == keyword:
                 self.bot.message_triggers.remove(trigger)
+                await self.bot.config.commit("message_triggers")
                 await interaction.response.send_message(f"Wiadomość wyzwalająca '{keyword}' została usunięta.", ephemeral=True)
                 return
 
@@ -0,0 +1,125 @@
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+logger = logging.getLogger("fogbot")
+
+
+class BackupManager:
+    """Compressed snapshots of the database taken with the SQLite online backup API.
+
+    The copy runs on its own connection in a worker thread, a few pages per step with a pause
+    between steps, so neither the event loop nor the bot's connection waits for it. Writes made
+    by the bot during a backup restart it, the result is always a consistent database.
+    Snapshots are gzipped into `directory` and only the newest `keep` are kept.
+    """
+
+    PREFIX = "bot-"
+    SUFFIX = ".db.gz"
+
+    def __init__(
+        self,
+        db_path: str,
+        directory: str = "backups",
+        interval_hours: float = 24,
+        keep: int = 7,
+        pages_per_step: int = 256,
+        step_sleep: float = 0.005,
+    ):
+        self.db_path = db_path
+        self.directory = Path(directory)
+        self.interval = interval_hours * 3600
+        self.keep = max(1, keep)
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def snapshots(self) -> list[Path]:
+        """Snapshots from the newest"""
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"{self.PREFIX}*{self.SUFFIX}"), reverse=True)
+
+    async def start(self) -> None:
+        """Starts the scheduled snapshots, disabled with interval 0"""
+        if self.interval > 0:
+            self._task = asyncio.create_task(self._schedule(), name="db-backup")
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def snapshot(self) -> Path:
+        """Takes a snapshot now, waits for one already running first
+
+        Returns:
+            Path: Compressed snapshot file
+        """
+        async with self._lock:
+            started = time.perf_counter()
+            path = await asyncio.to_thread(self._snapshot)
+            removed = await asyncio.to_thread(self._rotate)
+            logger.info(
+                f"Database backup {path.name} ({path.stat().st_size / 1024:.0f} KiB) taken in "
+                f"{time.perf_counter() - started:.1f} s, removed {removed} old backups"
+            )
+            return path
+
+    async def _schedule(self) -> None:
+        while True:
+            # Due one interval after the newest snapshot, so restarts don't skip or double them
+            snapshots = self.snapshots()
+            last = snapshots[0].stat().st_mtime if snapshots else 0
+            await asyncio.sleep(max(0, last + self.interval - time.time()))
+            try:
+                await self.snapshot()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception("Scheduled database backup failed", exc_info=e)
+                await asyncio.sleep(min(self.interval, 3600))
+
+    def _snapshot(self) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{self.PREFIX}{datetime.now():%Y%m%d-%H%M%S}"
+        copy = self.directory / f"{name}.db.partial"
+        target = self.directory / f"{name}{self.SUFFIX}"
+        compressed = target.with_name(target.name + ".partial")
+        try:
+            source = sqlite3.connect(self.db_path)
+            destination = sqlite3.connect(copy)
+            try:
+                source.backup(destination, pages=self.pages_per_step, sleep=self.step_sleep)
+            finally:
+                destination.close()
+                source.close()
+
+            with open(copy, "rb") as raw, gzip.open(compressed, "wb", compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1024 * 1024)
+            # Renamed only when complete, a crash leaves a .partial file and never a broken snapshot
+            os.replace(compressed, target)
+        finally:
+            copy.unlink(missing_ok=True)
+            compressed.unlink(missing_ok=True)
+        return target
+
+    def _rotate(self) -> int:
+        removed = 0
+        for path in self.snapshots()[self.keep:]:
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
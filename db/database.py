@@ -1,12 +1,27 @@
 import aiosqlite
 import asyncio
+import contextlib
+import logging
 from pathlib import Path
 from yoyo import get_backend, read_migrations
 
+from db import models
+from db.instrumentation import InstrumentedConnection
+from db.records import record_factory
+from db.statements import STATEMENTS
+
+
+logger = logging.getLogger("fogbot")
+
 class Database:
-    def __init__(self, path: str):
+    def __init__(self, path: str, slow_query_ms: float = 100):
         self.path = path
-        self.conn: aiosqlite.Connection | None = None
+        self.slow_query_ms = slow_query_ms
+        self.conn: InstrumentedConnection | None = None
+        # Open unit of work: the task owning it and how many transaction() scopes are nested
+        self._transaction_lock = asyncio.Lock()
+        self.transaction_owner: asyncio.Task | None = None
+        self._transaction_depth = 0
 
     async def _apply_migrations(self) -> None:
         db_path = Path(self.path).resolve()
@@ -23,8 +38,62 @@ class Database:
 
     async def connect(self):
         await self._apply_migrations()
-        self.conn = await aiosqlite.connect(self.path)
+        if not STATEMENTS.statements:
+            STATEMENTS.collect(models)
+        # Every model statement stays prepared, see db/statements.py
+        conn = await aiosqlite.connect(self.path, cached_statements=STATEMENTS.cache_size)
+        # Rows are named tuples (db/records.py), columns are read as row.column
+        conn.row_factory = record_factory
+        self.conn = InstrumentedConnection(conn, self)
         await self.conn.execute("PRAGMA foreign_keys = ON")
+
+    async def check_statements(self) -> None:
+        """Logs model statements that don't prepare or scan whole tables"""
+        problems = await STATEMENTS.check(self.path)
+        for problem in problems:
+            logger.warning(f"Query plan check: {problem}")
+        logger.info(f"Checked query plans of {len(STATEMENTS)} statements, {len(problems)} problems")
+
+    @contextlib.asynccontextmanager
+    async def transaction(self):
+        """Unit of work, statements inside are committed together when the outermost scope exits
+
+        Scopes nest across model helpers, each one is a savepoint, so an exception rolls back only
+        the scope it leaves. Model commits inside a scope are deferred to the outermost one, and
+        statements of other tasks wait until it's finished. Tasks started inside a scope are other
+        tasks too, awaiting their database calls from within the scope deadlocks.
+        """
+        task = asyncio.current_task()
+        if self.transaction_owner is not task:
+            await self._transaction_lock.acquire()
+            self.transaction_owner = task
+
+        depth = self._transaction_depth
+        savepoint = f"unit_of_work_{depth}"
+        self._transaction_depth += 1
+        try:
+            await self.conn.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield self
+            except BaseException:
+                await self.conn.execute(f"ROLLBACK TO {savepoint}")
+                await self.conn.execute(f"RELEASE {savepoint}")
+                raise
+            await self.conn.execute(f"RELEASE {savepoint}")
+            if depth == 0:
+                await self.conn.raw.commit()
+        finally:
+            self._transaction_depth = depth
+            if depth == 0:
+                self.transaction_owner = None
+                self._transaction_lock.release()
+
+    async def wait_for_transaction(self) -> None:
+        """Waits until a unit of work opened by another task is finished"""
+        while self.transaction_owner is not None and self.transaction_owner is not asyncio.current_task():
+            async with self._transaction_lock:
+                pass
+
     async def close(self):
         if self.conn:
             await self.conn.close()
\ No newline at end of file
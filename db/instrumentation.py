@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import inspect
+import logging
+import sqlite3
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from utils.metrics import DB_QUERY_SECONDS
+from utils.tracing import record_span
+
+
+logger = logging.getLogger("fogbot")
+
+WINDOW_SIZE = 500
+
+
+@dataclass
+class _Call:
+    method: str
+    statements: list[tuple[str, tuple, float]] = field(default_factory=list)
+
+
+@dataclass
+class MethodStats:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    statements: int = 0
+    window: deque = field(default_factory=lambda: deque(maxlen=WINDOW_SIZE))
+
+    def percentile(self, q: float) -> float:
+        if not self.window:
+            return 0.0
+        ordered = sorted(self.window)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+class QueryStats:
+    """Per model method timings with a rolling window for percentiles."""
+
+    def __init__(self):
+        self.methods: dict[str, MethodStats] = {}
+
+    def record(self, method: str, duration: float, statements: int = 1) -> None:
+        stats = self.methods.get(method)
+        if stats is None:
+            stats = self.methods[method] = MethodStats()
+        stats.count += 1
+        stats.total += duration
+        stats.max = max(stats.max, duration)
+        stats.statements += statements
+        stats.window.append(duration)
+
+    def top(self, limit: int = 15) -> list[tuple[str, MethodStats]]:
+        return sorted(self.methods.items(), key=lambda item: item[1].total, reverse=True)[:limit]
+
+    def reset(self) -> None:
+        self.methods.clear()
+
+
+STATS = QueryStats()
+
+_current_call: ContextVar[_Call | None] = ContextVar("db_current_call", default=None)
+_explain_tasks: set[asyncio.Task] = set()
+
+
+class InstrumentedConnection:
+    """aiosqlite connection proxy timing every statement and attributing it to the running model method."""
+
+    def __init__(self, conn, db):
+        self.raw = conn
+        self._db = db
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    async def execute(self, sql: str, parameters=None):
+        await self._db.wait_for_transaction()
+        started = time.perf_counter()
+        cursor = await self.raw.execute(sql, parameters)
+        duration = time.perf_counter() - started
+
+        call = _current_call.get()
+        if call is not None:
+            call.statements.append((sql, tuple(parameters or ()), duration))
+        else:
+            STATS.record("<direct>", duration)
+            if duration * 1000 >= self._db.slow_query_ms:
+                _schedule_slow_log(self._db.path, "<direct>", duration, [(sql, tuple(parameters or ()), duration)])
+        return cursor
+
+    async def executemany(self, sql: str, parameters):
+        await self._db.wait_for_transaction()
+        started = time.perf_counter()
+        cursor = await self.raw.executemany(sql, parameters)
+        duration = time.perf_counter() - started
+
+        # The parameter rows may be a consumed iterator, EXPLAIN gets NULLs for the plan
+        statement = (sql, (None,) * sql.count("?"), duration)
+        call = _current_call.get()
+        if call is not None:
+            call.statements.append(statement)
+        else:
+            STATS.record("<direct>", duration)
+            if duration * 1000 >= self._db.slow_query_ms:
+                _schedule_slow_log(self._db.path, "<direct>", duration, [statement])
+        return cursor
+
+    async def commit(self):
+        # Inside db.transaction() the outermost scope commits
+        if self._db.transaction_owner is not None and self._db.transaction_owner is asyncio.current_task():
+            return
+        await self._db.wait_for_transaction()
+        await self.raw.commit()
+
+
+def instrument(cls):
+    """Class decorator timing every async static method of a model as "<Class>.<method>"."""
+    for name, attr in list(vars(cls).items()):
+        if not isinstance(attr, staticmethod) or not inspect.iscoroutinefunction(attr.__func__):
+            continue
+        setattr(cls, name, staticmethod(_timed(f"{cls.__name__}.{name}", attr.__func__)))
+    return cls
+
+
+def _timed(method_name: str, func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        call = _Call(method_name)
+        token = _current_call.set(call)
+        started = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            duration = time.perf_counter() - started
+            _current_call.reset(token)
+            DB_QUERY_SECONDS.observe(duration, method=method_name)
+            record_span(method_name, "db", started, duration, statements=len(call.statements))
+            STATS.record(method_name, duration, len(call.statements))
+
+            db = args[0] if args else kwargs.get("db")
+            threshold = getattr(db, "slow_query_ms", None)
+            if threshold is not None and duration * 1000 >= threshold and db.conn is not None:
+                _schedule_slow_log(db.path, method_name, duration, call.statements)
+    return wrapper
+
+
+def _schedule_slow_log(path: str, method: str, duration: float, statements: list[tuple[str, tuple, float]]) -> None:
+    # Runs in the background so the slow caller isn't delayed further by EXPLAIN
+    task = asyncio.create_task(_log_slow(path, method, duration, statements))
+    _explain_tasks.add(task)
+    task.add_done_callback(_explain_tasks.discard)
+
+
+async def _log_slow(path: str, method: str, duration: float, statements: list[tuple[str, tuple, float]]) -> None:
+    # A separate connection, a cursor left open on the bot's one would break the savepoints of db.transaction()
+    lines = await asyncio.to_thread(_explain, path, statements)
+    logger.warning("\n".join([f"Slow query: {method} took {duration * 1000:.1f} ms ({len(statements)} statements)", *lines]))
+
+
+def _explain(path: str, statements: list[tuple[str, tuple, float]]) -> list[str]:
+    lines = []
+    conn = sqlite3.connect(path)
+    try:
+        for sql, parameters, statement_duration in statements:
+            lines.append(f"  {statement_duration * 1000:.1f} ms: {sql}")
+            if not sql.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "INSERT")):
+                continue
+            try:
+                for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall():
+                    lines.append(f"    plan: {row[-1]}")
+            except sqlite3.Error as e:
+                lines.append(f"    plan unavailable: {e}")
+    finally:
+        conn.close()
+    return lines
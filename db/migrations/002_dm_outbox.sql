@@ -0,0 +1,19 @@
+-- name: 002_dm_outbox
+-- depends: 001_init
+
+CREATE TABLE
+    IF NOT EXISTS dm_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        content TEXT NOT NULL,
+        dedup_key TEXT NOT NULL UNIQUE,
+        attempts INTEGER DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+
+CREATE TABLE
+    IF NOT EXISTS dm_undeliverable (
+        user_id INTEGER PRIMARY KEY UNIQUE,
+        reason TEXT,
+        marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
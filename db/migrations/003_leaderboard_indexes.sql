@@ -0,0 +1,6 @@
+-- name: 003_leaderboard_indexes
+-- depends: 002_dm_outbox
+
+CREATE INDEX IF NOT EXISTS idx_users_experience ON users (experience DESC, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_attendance_all_time_missions ON attendance (all_time_missions DESC, user_id);
@@ -0,0 +1,10 @@
+-- name: 004_lookup_indexes
+-- depends: 003_leaderboard_indexes
+
+CREATE INDEX IF NOT EXISTS idx_squads_mission ON squads (mission_id, name);
+
+CREATE INDEX IF NOT EXISTS idx_slots_message ON slots (message_id);
+
+CREATE INDEX IF NOT EXISTS idx_slots_mission_user ON slots (mission_id, user_id);
+
+CREATE INDEX IF NOT EXISTS idx_training_signed_training_user ON training_signed (training_id, user_id);
@@ -0,0 +1,24 @@
+-- name: 005_mission_archive
+-- depends: 004_lookup_indexes
+
+ALTER TABLE missions ADD COLUMN attendance_recorded_at TIMESTAMP DEFAULT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_missions_date ON missions (date);
+
+CREATE TABLE
+    IF NOT EXISTS missions_archive (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        channel_id INTEGER NOT NULL,
+        date DATE NOT NULL,
+        created_at TIMESTAMP,
+        creator_user_id INTEGER,
+        attendance_recorded_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        squads INTEGER NOT NULL DEFAULT 0,
+        slots INTEGER NOT NULL DEFAULT 0,
+        signed_up INTEGER NOT NULL DEFAULT 0,
+        roster TEXT NOT NULL DEFAULT '[]'
+    );
+
+CREATE INDEX IF NOT EXISTS idx_missions_archive_channel ON missions_archive (channel_id);
@@ -1,3 +1,9 @@
+import json
+
+from db.instrumentation import instrument
+
+
+@instrument
 class Users:
     """
     user_id: INTEGER PRIMARY KEY UNIQUE,
@@ -169,26 +175,43 @@ class Users:
         await db.conn.commit()
         
     @staticmethod
-    async def get_leaderboard(db, limit: int = 10):
+    async def get_leaderboard(db, limit: int = 10, offset: int = 0):
         """Gets the leaderboard of users by experience
 
         Args:
             db (_type_): Database to be used
             limit (int, optional): Number of users to return. Defaults to 10.
+            offset (int, optional): Number of best users to skip. Defaults to 0.
 
         Returns:
             fetchall: user_id, username, level, experience
         """
         cursor = await db.conn.execute(
             "SELECT user_id, username, level, experience FROM users "
-            "ORDER BY experience DESC LIMIT ?",
-            (limit,)
+            "ORDER BY experience DESC, user_id LIMIT ? OFFSET ?",
+            (limit, offset)
         )
         return await cursor.fetchall()
+    
+    @staticmethod
+    async def count_above(db, experience: int) -> int:
+        """Counts users with more experience, position in the leaderboard is this + 1
+
+        Args:
+            db (_type_): Database to be used
+            experience (int): Experience to compare with
+
+        Returns:
+            int: Number of users
+        """
+        cursor = await db.conn.execute("SELECT COUNT(*) FROM users WHERE experience > ?", (experience,))
+        row = await cursor.fetchone()
+        return row[0]
         
         
         
         
+@instrument
 class Blacklist:
     """
     user_id: INTEGER PRIMARY KEY UNIQUE, 
@@ -281,6 +304,7 @@ class Blacklist:
 
 
 
+@instrument
 class Attendance:
     """
     user_id: INTEGER PRIMARY KEY UNIQUE,
@@ -341,19 +365,20 @@ class Attendance:
         return await cursor.fetchone()
     
     @staticmethod
-    async def get_leaderboard(db, limit: int = 10):
+    async def get_leaderboard(db, limit: int = 10, offset: int = 0):
         """Gets the attendance leaderboard
 
         Args:
             db (_type_): Database to be used
             limit (int): Maximum number of records to return
+            offset (int, optional): Number of best records to skip. Defaults to 0.
 
         Returns:
             fetchall: user_id, last_mission_date, all_time_missions
         """
         cursor = await db.conn.execute(
-            "SELECT user_id, last_mission_date, all_time_missions FROM attendance ORDER BY all_time_missions DESC LIMIT ?",
-            (limit,)
+            "SELECT user_id, last_mission_date, all_time_missions FROM attendance ORDER BY all_time_missions DESC, user_id LIMIT ? OFFSET ?",
+            (limit, offset)
         )
         return await cursor.fetchall()
     
@@ -366,23 +391,24 @@ class Attendance:
             user_id (int): Discord user id
             missions (int): New all-time missions count
         """
-        await db.conn.execute(
-            "UPDATE attendance SET all_time_missions = ? WHERE user_id = ?",
-            (missions, user_id)
-        )
-        cursor = await db.conn.execute("SELECT changes()")
-        updated_rows = await cursor.fetchone()
-        if not updated_rows or updated_rows[0] == 0:
+        async with db.transaction():
             await db.conn.execute(
-            "INSERT INTO attendance (user_id, last_mission_date, all_time_missions) VALUES (?, NULL, ?) "
-            "ON CONFLICT(user_id) DO UPDATE SET all_time_missions = excluded.all_time_missions",
-            (user_id, missions)
+                "UPDATE attendance SET all_time_missions = ? WHERE user_id = ?",
+                (missions, user_id)
             )
-        await db.conn.commit()
+            cursor = await db.conn.execute("SELECT changes()")
+            updated_rows = await cursor.fetchone()
+            if not updated_rows or updated_rows[0] == 0:
+                await db.conn.execute(
+                "INSERT INTO attendance (user_id, last_mission_date, all_time_missions) VALUES (?, NULL, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET all_time_missions = excluded.all_time_missions",
+                (user_id, missions)
+                )
 
 
 
 
+@instrument
 class Ranks:
     """
     id: INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -458,6 +484,7 @@ class Ranks:
 
 
 
+@instrument
 class Missions:
     """
     id: INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -467,6 +494,7 @@ class Missions:
     created_at: TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     creator_user_id: INTEGER,
     ping_role_id: INTEGER,
+    attendance_recorded_at: TIMESTAMP DEFAULT NULL,
     FOREIGN KEY(creator_user_id) REFERENCES users(user_id) ON DELETE SET NULL
     """
     @staticmethod
@@ -563,10 +591,44 @@ class Missions:
             (name, date, mission_id)
         )
         await db.conn.commit()
+
+    @staticmethod
+    async def set_attendance_recorded(db, mission_id: int):
+        """Marks attendance of a mission as recorded
+
+        Args:
+            db (_type_): Database to be used
+            mission_id (int): Mission id
+        """
+        await db.conn.execute(
+            "UPDATE missions SET attendance_recorded_at = CURRENT_TIMESTAMP WHERE id = ?",
+            (mission_id,)
+        )
+        await db.conn.commit()
+
+    @staticmethod
+    async def list_finished(db, before: str, require_attendance: bool = True):
+        """Lists missions that took place before a date
+
+        Args:
+            db (_type_): Database to be used
+            before (str): Date in YYYY-MM-DD HH:MM:SS format
+            require_attendance (bool, optional): Only missions with recorded attendance. Defaults to True.
+
+        Returns:
+            fetchall: id, name, channel_id, date
+        """
+        cursor = await db.conn.execute(
+            "SELECT id, name, channel_id, date FROM missions "
+            "WHERE date < ? AND (attendance_recorded_at IS NOT NULL OR NOT ?) ORDER BY date",
+            (before, require_attendance)
+        )
+        return await cursor.fetchall()
     
     
     
     
+@instrument
 class Squads:
     """
     message_id: INTEGER NOT NULL PRIMARY KEY UNIQUE,
@@ -659,6 +721,7 @@ class Squads:
         
         
         
+@instrument
 class Slots:
     """
     id: INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -790,19 +853,19 @@ class Slots:
             slot_id (str): Slot id
             user_id (int): User id
         """
-        # Remove user from any previously assigned slot (across the whole mission)
-        await db.conn.execute(
-            "UPDATE slots SET user_id = NULL "
-            "WHERE mission_id = (SELECT mission_id FROM squads WHERE message_id = ?) "
-            "AND user_id = ?",
-            (message_id, user_id)
-        )
-        # Assign user to selected slot
-        await db.conn.execute(
-            "UPDATE slots SET user_id = ? WHERE message_id = ? AND id = ?",
-            (user_id, message_id, slot_id)
-        )
-        await db.conn.commit()
+        async with db.transaction():
+            # Remove user from any previously assigned slot (across the whole mission)
+            await db.conn.execute(
+                "UPDATE slots SET user_id = NULL "
+                "WHERE mission_id = (SELECT mission_id FROM squads WHERE message_id = ?) "
+                "AND user_id = ?",
+                (message_id, user_id)
+            )
+            # Assign user to selected slot
+            await db.conn.execute(
+                "UPDATE slots SET user_id = ? WHERE message_id = ? AND id = ?",
+                (user_id, message_id, slot_id)
+            )
     
     @staticmethod
     async def remove_user_from_slot(db, mission_id: int, user_id: int):
@@ -822,6 +885,79 @@ class Slots:
 
 
 
+@instrument
+class MissionsArchive:
+    """
+    id: INTEGER PRIMARY KEY,
+    name: TEXT NOT NULL,
+    channel_id: INTEGER NOT NULL,
+    date: DATE NOT NULL,
+    created_at: TIMESTAMP,
+    creator_user_id: INTEGER,
+    attendance_recorded_at: TIMESTAMP,
+    archived_at: TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    squads: INTEGER NOT NULL DEFAULT 0,
+    slots: INTEGER NOT NULL DEFAULT 0,
+    signed_up: INTEGER NOT NULL DEFAULT 0,
+    roster: TEXT NOT NULL DEFAULT '[]' (JSON array of [squad, slot, user_id])
+    """
+    @staticmethod
+    async def archive(db, mission_ids: list[int]):
+        """Moves missions into the archive as summary rows and deletes them with their squads and slots
+
+        Args:
+            db (_type_): Database to be used
+            mission_ids (list[int]): Mission ids
+
+        Returns:
+            int: Number of deleted squads (signup messages)
+        """
+        parameters = [(mission_id,) for mission_id in mission_ids]
+        async with db.transaction():
+            # The ids as one JSON array, a parameter per id could go over SQLite's variable limit
+            cursor = await db.conn.execute(
+                "SELECT COUNT(*) FROM squads WHERE mission_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(mission_ids),)
+            )
+            squads = (await cursor.fetchone())[0]
+            await db.conn.executemany(
+                "INSERT OR REPLACE INTO missions_archive "
+                "(id, name, channel_id, date, created_at, creator_user_id, attendance_recorded_at, squads, slots, signed_up, roster) "
+                "SELECT m.id, m.name, m.channel_id, m.date, m.created_at, m.creator_user_id, m.attendance_recorded_at, "
+                "(SELECT COUNT(*) FROM squads WHERE mission_id = m.id), "
+                "(SELECT COUNT(*) FROM slots WHERE mission_id = m.id), "
+                "(SELECT COUNT(user_id) FROM slots WHERE mission_id = m.id), "
+                "(SELECT json_group_array(json_array(squad, slot, user_id)) FROM "
+                "(SELECT sq.name AS squad, s.name AS slot, s.user_id FROM slots s "
+                "JOIN squads sq ON sq.message_id = s.message_id WHERE s.mission_id = m.id ORDER BY s.id)) "
+                "FROM missions m WHERE m.id = ?",
+                parameters
+            )
+            # Squads and slots are removed by ON DELETE CASCADE
+            await db.conn.executemany(
+                "DELETE FROM missions WHERE id = ?",
+                parameters
+            )
+        return squads
+
+    @staticmethod
+    async def count(db) -> int:
+        """Counts archived missions
+
+        Args:
+            db (_type_): Database to be used
+
+        Returns:
+            int: Number of archived missions
+        """
+        cursor = await db.conn.execute("SELECT COUNT(*) FROM missions_archive")
+        row = await cursor.fetchone()
+        return row[0]
+
+
+
+
+@instrument
 class Trainings:
     """
     id: INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -942,6 +1078,7 @@ class Trainings:
         
         
         
+@instrument
 class TrainingSigned:
     """
     id: INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -1010,6 +1147,7 @@ class TrainingSigned:
 
 
 
+@instrument
 class Tickets:
     """
     id: INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -1104,6 +1242,7 @@ class Tickets:
 
 
 
+@instrument
 class TicketTypes:
     """
     id: INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -1146,7 +1285,23 @@ class TicketTypes:
         row = await cursor.fetchone()
         return str(row[0]) if row else None
 
+    @staticmethod
+    async def list(db):
+        """Lists all ticket types
+
+        Args:
+            db (_type_): Database to be used
 
+        Returns:
+            fetchall: id, name
+        """
+        cursor = await db.conn.execute(
+            "SELECT id, name FROM ticket_types",
+        )
+        return await cursor.fetchall()
+
+
+@instrument
 class TicketCreateMessages:
     """
     id: INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -1186,6 +1341,23 @@ class TicketCreateMessages:
             "SELECT channel_id, message_id, categories FROM ticket_create_messages",
         )
         return await cursor.fetchall()
+
+    @staticmethod
+    async def get_by_message_id(db, message_id: int):
+        """Gets ticket create message by message id
+
+        Args:
+            db (_type_): Database to be used
+            message_id (int): Discord message id
+
+        Returns:
+            fetchone: channel_id, message_id, categories
+        """
+        cursor = await db.conn.execute(
+            "SELECT channel_id, message_id, categories FROM ticket_create_messages WHERE message_id = ?",
+            (message_id,)
+        )
+        return await cursor.fetchone()
     
     @staticmethod
     async def delete_by_message_id(db, message_id: int):
@@ -1199,4 +1371,135 @@ class TicketCreateMessages:
             "DELETE FROM ticket_create_messages WHERE message_id = ?",
             (message_id,)
         )
-        await db.conn.commit()
\ No newline at end of file
+        await db.conn.commit()
+
+@instrument
+class OutboxMessages:
+    """
+    id: INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id: INTEGER NOT NULL,
+    content: TEXT NOT NULL,
+    dedup_key: TEXT NOT NULL UNIQUE,
+    attempts: INTEGER DEFAULT 0,
+    created_at: TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """
+    @staticmethod
+    async def add(db, user_id: int, content: str, dedup_key: str) -> int | None:
+        """Queues a direct message
+
+        Args:
+            db (_type_): Database to be used
+            user_id (int): Discord user id
+            content (str): Message content
+            dedup_key (str): Key identifying duplicates of the message
+
+        Returns:
+            int | None: id of the queued message, None if a message with the same key is already queued
+        """
+        cursor = await db.conn.execute(
+            "INSERT OR IGNORE INTO dm_outbox (user_id, content, dedup_key) VALUES (?, ?, ?)",
+            (user_id, content, dedup_key)
+        )
+        await db.conn.commit()
+        return cursor.lastrowid if cursor.rowcount else None
+
+    @staticmethod
+    async def list(db, limit: int = 1000, after_id: int = 0):
+        """Lists queued direct messages in order
+
+        Args:
+            db (_type_): Database to be used
+            limit (int, optional): Number of messages to return. Defaults to 1000.
+            after_id (int, optional): Only messages with a greater id. Defaults to 0.
+
+        Returns:
+            fetchall: id, user_id, content, dedup_key, attempts
+        """
+        cursor = await db.conn.execute(
+            "SELECT id, user_id, content, dedup_key, attempts FROM dm_outbox WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+        return await cursor.fetchall()
+
+    @staticmethod
+    async def increment_attempts(db, message_id: int):
+        """Increments the delivery attempts of a queued message
+
+        Args:
+            db (_type_): Database to be used
+            message_id (int): Queued message id
+        """
+        await db.conn.execute(
+            "UPDATE dm_outbox SET attempts = attempts + 1 WHERE id = ?",
+            (message_id,)
+        )
+        await db.conn.commit()
+
+    @staticmethod
+    async def delete(db, message_id: int):
+        """Removes a message from the queue
+
+        Args:
+            db (_type_): Database to be used
+            message_id (int): Queued message id
+        """
+        await db.conn.execute(
+            "DELETE FROM dm_outbox WHERE id = ?",
+            (message_id,)
+        )
+        await db.conn.commit()
+
+
+@instrument
+class UndeliverableUsers:
+    """
+    user_id: INTEGER PRIMARY KEY UNIQUE,
+    reason: TEXT,
+    marked_at: TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """
+    @staticmethod
+    async def add(db, user_id: int, reason: str):
+        """Marks a user as not accepting direct messages
+
+        Args:
+            db (_type_): Database to be used
+            user_id (int): Discord user id
+            reason (str): Why delivery failed
+        """
+        await db.conn.execute(
+            "INSERT INTO dm_undeliverable (user_id, reason) VALUES (?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET reason = excluded.reason, marked_at = CURRENT_TIMESTAMP",
+            (user_id, reason)
+        )
+        await db.conn.commit()
+
+    @staticmethod
+    async def remove(db, user_id: int):
+        """Removes the undeliverable mark of a user
+
+        Args:
+            db (_type_): Database to be used
+            user_id (int): Discord user id
+        """
+        await db.conn.execute(
+            "DELETE FROM dm_undeliverable WHERE user_id = ?",
+            (user_id,)
+        )
+        await db.conn.commit()
+
+    @staticmethod
+    async def list_recent(db, days: int):
+        """Lists users marked as undeliverable in the last days
+
+        Args:
+            db (_type_): Database to be used
+            days (int): How many days a mark stays valid
+
+        Returns:
+            fetchall: user_id, marked_at
+        """
+        cursor = await db.conn.execute(
+            "SELECT user_id, marked_at FROM dm_undeliverable WHERE marked_at >= datetime('now', ?)",
+            (f"-{days} days",)
+        )
+        return await cursor.fetchall()
@@ -0,0 +1,38 @@
+import sqlite3
+from collections import namedtuple
+
+
+# Record classes per column list, shared by every query selecting the same columns
+_record_classes: dict[tuple[str, ...], type] = {}
+
+
+def record_class(columns: tuple[str, ...]) -> type:
+    """Named tuple class for a column list
+
+    Args:
+        columns (tuple[str, ...]): Column names as reported by cursor.description
+
+    Returns:
+        type: Tuple subclass without per-instance __dict__; columns that aren't identifiers (e.g. COUNT(*)) get positional names like _0
+    """
+    cls = _record_classes.get(columns)
+    if cls is None:
+        cls = _record_classes[columns] = namedtuple("Record", columns, rename=True)
+    return cls
+
+
+def record_factory(cursor: sqlite3.Cursor, row: tuple):
+    """sqlite3 row factory returning records with attribute access (row.user_id), they still index and unpack like tuples"""
+    global _last
+    description = cursor.description
+    # description is the same object for all rows of one statement, skip rebuilding the column tuple.
+    # Read and replaced as one tuple, factories of different connections run in different threads
+    last = _last
+    if last[0] is description:
+        return last[1]._make(row)
+    cls = record_class(tuple(column[0] for column in description))
+    _last = (description, cls)
+    return cls._make(row)
+
+
+_last: tuple = (None, None)
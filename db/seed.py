@@ -0,0 +1,265 @@
+"""Fills a database with a reproducible synthetic dataset resembling a large guild.
+
+Schema comes from db/migrations (applied by Database.connect), ranks and ticket types
+are read through db.models. Rows are generated in memory and written with executemany
+in one transaction.
+
+Usage:
+    python -m db.seed
+    python -m db.seed --path db/bench.db --users 50000 --missions 3000 --seed 7 --force
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from db.database import Database
+from db.models import Ranks, TicketTypes
+
+
+DISCORD_EPOCH_MS = 1420070400000
+SQUAD_NAMES = ("Alfa", "Bravo", "Charlie", "Delta", "Echo", "Foxtrot")
+SLOT_NAMES = ("Dowódca", "Zastępca", "Medyk", "Strzelec", "Strzelec", "Grenadier", "Strzelec wyborowy", "Zwiadowca", "Saper", "Radiooperator")
+
+
+@dataclass
+class SeedSizes:
+    users: int = 50000
+    missions: int = 3000
+    squads_per_mission: int = 3
+    slots_per_squad: int = 8
+    trainings: int = 500
+    signups_per_training: int = 10
+    tickets: int = 5000
+    blacklist: int = 200
+    years: int = 3
+    # Missions after now stay open for signups, the rest are history
+    future_missions: int = 20
+
+
+@dataclass
+class SeedResult:
+    user_ids: list[int] = field(default_factory=list)
+    mission_channel_ids: list[int] = field(default_factory=list)
+    # (channel_id, message_id, slot ids)
+    signup_messages: list[tuple[int, int, list[int]]] = field(default_factory=list)
+    # (channel_id, message_id, training_id)
+    training_messages: list[tuple[int, int, int]] = field(default_factory=list)
+    # channel_id -> open
+    ticket_channels: dict[int, bool] = field(default_factory=dict)
+
+
+class _Snowflakes:
+    """Increasing snowflakes for given moments, so ids sort like real Discord ids."""
+
+    def __init__(self):
+        self._increment = 0
+
+    def at(self, moment: datetime) -> int:
+        self._increment = (self._increment + 1) & 0xFFF
+        return ((int(moment.timestamp() * 1000) - DISCORD_EPOCH_MS) << 22) | self._increment
+
+
+def _level(experience: int) -> int:
+    # Same formula as Level._calculate_level
+    return max(1, min(100, int((-50 + (20 * experience + 500) ** 0.5) / 10)))
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+async def seed(db: Database, sizes: SeedSizes, seed: int = 0, now: datetime | None = None) -> SeedResult:
+    """Generates the dataset into an empty, migrated database
+
+    Args:
+        db (Database): Connected database
+        sizes (SeedSizes): Number of rows to generate
+        seed (int, optional): Random seed. Defaults to 0.
+        now (datetime | None, optional): Reference time, fixed for identical output. Defaults to current time.
+
+    Returns:
+        SeedResult: Ids of the generated objects
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now().replace(microsecond=0)
+    start = now - timedelta(days=365 * sizes.years)
+    span = (now - start).total_seconds()
+    snowflakes = _Snowflakes()
+    result = SeedResult()
+
+    ranks = sorted(await Ranks.list(db), key=lambda rank: rank.required_missions)
+    ticket_type_ids = [await TicketTypes.get_id_by_name(db, name) for name in ("mission", "proposal", "recruitment", "basic_training", "custom")]
+    ticket_type_ids = [type_id for type_id in ticket_type_ids if type_id is not None]
+
+    # Users, joined evenly over the whole period
+    users = []
+    for index in range(sizes.users):
+        joined_at = start + timedelta(seconds=rng.random() * span)
+        user_id = snowflakes.at(joined_at)
+        experience = int(rng.paretovariate(1.5) * 150)
+        on_guild = rng.random() < 0.7
+        last_message_at = joined_at + timedelta(seconds=rng.random() * (now - joined_at).total_seconds())
+        users.append((user_id, f"user{index}", _level(experience), experience, _timestamp(joined_at), _timestamp(last_message_at), int(on_guild)))
+        result.user_ids.append(user_id)
+    active_users = [user[0] for user in users if user[6]] or result.user_ids
+    # A small core of regulars fills most slots, like in a real unit
+    regulars = rng.sample(active_users, max(min(len(active_users), 50), len(active_users) // 35))
+
+    # Missions with squads and slots, attendance follows the filled slots of past missions
+    missions, squads, slots = [], [], []
+    attendance: dict[int, list] = {}
+    slot_id = 0
+    for mission_id in range(1, sizes.missions + 1):
+        if mission_id > sizes.missions - sizes.future_missions:
+            date = now + timedelta(days=rng.randint(1, 30), hours=rng.randint(0, 23))
+        else:
+            date = start + timedelta(seconds=rng.random() * span)
+        created_at = min(date - timedelta(days=rng.randint(1, 14)), now)
+        channel_id = snowflakes.at(created_at)
+        is_past = date < now
+        # Past missions had their attendance taken after they ended, so they qualify for archiving
+        attendance_recorded_at = _timestamp(min(date + timedelta(hours=2), now)) if is_past else None
+        missions.append((
+            mission_id, f"Misja {mission_id}", channel_id, _timestamp(date), _timestamp(created_at), rng.choice(active_users), None,
+            attendance_recorded_at,
+        ))
+        result.mission_channel_ids.append(channel_id)
+
+        for squad_index in range(sizes.squads_per_mission):
+            message_id = snowflakes.at(created_at)
+            squads.append((message_id, mission_id, SQUAD_NAMES[squad_index % len(SQUAD_NAMES)]))
+            pool = regulars if rng.random() < 0.7 else active_users
+            signed = rng.sample(pool, min(sizes.slots_per_squad, len(pool)))
+            fill = 0.9 if is_past else rng.random()
+            slot_ids = []
+            for slot_index in range(sizes.slots_per_squad):
+                slot_id += 1
+                user_id = signed[slot_index] if slot_index < len(signed) and rng.random() < fill else None
+                slots.append((slot_id, message_id, mission_id, SLOT_NAMES[slot_index % len(SLOT_NAMES)], user_id))
+                slot_ids.append(slot_id)
+                if is_past and user_id is not None:
+                    entry = attendance.setdefault(user_id, [user_id, date.date().isoformat(), 0])
+                    entry[1] = max(entry[1], date.date().isoformat())
+                    entry[2] += 1
+            result.signup_messages.append((channel_id, message_id, slot_ids))
+
+    # Ranks follow the number of attended missions
+    user_ranks = []
+    for user_id, _, missions_count in attendance.values():
+        rank_id = ranks[0].id if ranks else 1
+        for rank in ranks:
+            if missions_count >= rank.required_missions:
+                rank_id = rank.id
+        user_ranks.append((rank_id, user_id))
+
+    # Trainings and their signups
+    trainings, training_signed = [], []
+    for training_id in range(1, sizes.trainings + 1):
+        date = start + timedelta(seconds=rng.random() * span)
+        channel_id, message_id = snowflakes.at(date), snowflakes.at(date)
+        trainings.append((training_id, f"Szkolenie {training_id}", channel_id, message_id, _timestamp(date), _timestamp(date), rng.choice(active_users)))
+        for user_id in rng.sample(active_users, min(sizes.signups_per_training, len(active_users))):
+            training_signed.append((training_id, user_id))
+        result.training_messages.append((channel_id, message_id, training_id))
+
+    # Tickets, most of the old ones are closed
+    tickets = []
+    for index in range(sizes.tickets):
+        created_at = start + timedelta(seconds=rng.random() * span)
+        channel_id = snowflakes.at(created_at)
+        is_open = created_at > now - timedelta(days=30) or rng.random() < 0.05
+        type_id = rng.choice(ticket_type_ids) if ticket_type_ids else None
+        tickets.append((channel_id, rng.choice(result.user_ids), _timestamp(created_at), int(is_open), type_id, f"Ticket {index}"))
+        result.ticket_channels[channel_id] = is_open
+
+    blacklist = []
+    for user_id in rng.sample(result.user_ids, min(sizes.blacklist, len(result.user_ids))):
+        added_at = start + timedelta(seconds=rng.random() * span)
+        end_at = _timestamp(added_at + timedelta(days=rng.randint(7, 365))) if rng.random() < 0.6 else None
+        blacklist.append((user_id, "Naruszenie regulaminu", end_at, _timestamp(added_at)))
+
+    conn = db.conn
+    await conn.execute("BEGIN")
+    try:
+        await conn.executemany(
+            "INSERT INTO users (user_id, username, level, experience, joined_at, last_message_at, on_guild) VALUES (?, ?, ?, ?, ?, ?, ?)", users
+        )
+        await conn.executemany("UPDATE users SET rank_id = ? WHERE user_id = ?", user_ranks)
+        await conn.executemany(
+            "INSERT INTO attendance (user_id, last_mission_date, all_time_missions) VALUES (?, ?, ?)", list(attendance.values())
+        )
+        await conn.executemany(
+            "INSERT INTO missions (id, name, channel_id, date, created_at, creator_user_id, ping_role_id, attendance_recorded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", missions
+        )
+        await conn.executemany("INSERT INTO squads (message_id, mission_id, name) VALUES (?, ?, ?)", squads)
+        await conn.executemany("INSERT INTO slots (id, message_id, mission_id, name, user_id) VALUES (?, ?, ?, ?, ?)", slots)
+        await conn.executemany(
+            "INSERT INTO trainings (id, name, channel_id, message_id, date, created_at, creator_user_id) VALUES (?, ?, ?, ?, ?, ?, ?)", trainings
+        )
+        await conn.executemany("INSERT INTO training_signed (training_id, user_id) VALUES (?, ?)", training_signed)
+        await conn.executemany(
+            "INSERT INTO tickets (channel_id, user_id, created_at, status, type_id, title) VALUES (?, ?, ?, ?, ?, ?)", tickets
+        )
+        await conn.executemany("INSERT INTO blacklist (user_id, reason, end_at, added_at) VALUES (?, ?, ?, ?)", blacklist)
+        await conn.commit()
+    except BaseException:
+        await conn.rollback()
+        raise
+    return result
+
+
+async def seed_file(path: str, sizes: SeedSizes, seed_value: int = 0, now: datetime | None = None) -> SeedResult:
+    """Creates a new database file at path and seeds it
+
+    Args:
+        path (str): Database file, must not exist
+        sizes (SeedSizes): Number of rows to generate
+        seed_value (int, optional): Random seed. Defaults to 0.
+        now (datetime | None, optional): Reference time. Defaults to current time.
+
+    Returns:
+        SeedResult: Ids of the generated objects
+    """
+    db = Database(path, slow_query_ms=float("inf"))
+    await db.connect()
+    try:
+        # Durability isn't needed while generating a throwaway dataset
+        await db.conn.execute("PRAGMA synchronous = OFF")
+        return await seed(db, sizes, seed_value, now)
+    finally:
+        await db.close()
+
+
+def main():
+    defaults = SeedSizes()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="db/seed.db", help="Database file to create")
+    parser.add_argument("--force", action="store_true", help="Overwrite the database file if it exists")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--now", type=datetime.fromisoformat, help="Reference time (ISO format) for identical output between runs")
+    for name, value in vars(defaults).items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=value)
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        if not args.force:
+            parser.error(f"{args.path} already exists, use --force to overwrite it")
+        os.remove(args.path)
+
+    sizes = SeedSizes(**{name: getattr(args, name) for name in vars(defaults)})
+    started = time.perf_counter()
+    result = asyncio.run(seed_file(args.path, sizes, args.seed, args.now))
+    print(
+        f"Seeded {args.path} in {time.perf_counter() - started:.1f} s: {len(result.user_ids)} users, "
+        f"{len(result.mission_channel_ids)} missions, {len(result.signup_messages)} squads, "
+        f"{len(result.training_messages)} trainings, {len(result.ticket_channels)} tickets"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import ast
+import asyncio
+import inspect
+import logging
+import sqlite3
+from dataclasses import dataclass
+
+
+logger = logging.getLogger("fogbot")
+
+# sqlite3 keeps this many prepared statements per connection by default
+DEFAULT_CACHED_STATEMENTS = 128
+# Room in the statement cache for statements outside the registry (PRAGMA, savepoints, seed, tools)
+CACHE_HEADROOM = 64
+
+# Statements reading whole tables on purpose (full listings, the few rows of ranks)
+ALLOW_SCAN = {
+    "Users.list",
+    "Users.update_users_on_startup",
+    "Blacklist.list",
+    "Ranks.list",
+    "Ranks.get_by_role_id",
+    "Ranks.get_next_rank",
+    "Missions.list",
+    "Slots.list",
+    "Trainings.list",
+    "Tickets.list_basic",
+    "TicketTypes.list",
+    "TicketCreateMessages.list",
+    "UndeliverableUsers.list_recent",
+}
+
+
+@dataclass(frozen=True)
+class Statement:
+    name: str
+    sql: str
+    allow_scan: bool = False
+
+
+class StatementRegistry:
+    """Named SQL statements of the models, checked with EXPLAIN QUERY PLAN at startup.
+
+    Statements are collected from the model source, every literal passed to db.conn.execute
+    or executemany is one statement named "<Class>.<method>" ("<Class>.<method>#2" for the
+    second one in a method and so on). The SQL text stays next to the code using it, sqlite3
+    caches prepared statements by that text.
+    """
+
+    def __init__(self):
+        self.statements: dict[str, Statement] = {}
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+    def register(self, name: str, sql: str, allow_scan: bool = False) -> Statement:
+        statement = self.statements[name] = Statement(name, sql, allow_scan)
+        return statement
+
+    def collect(self, module) -> None:
+        """Registers the statements of every class in a module"""
+        tree = ast.parse(inspect.getsource(module))
+        for cls in tree.body:
+            if not isinstance(cls, ast.ClassDef):
+                continue
+            for method in cls.body:
+                if not isinstance(method, ast.AsyncFunctionDef):
+                    continue
+                method_name = f"{cls.name}.{method.name}"
+                allow_scan = method_name in ALLOW_SCAN
+                count = 0
+                for node in ast.walk(method):
+                    sql = _execute_literal(node)
+                    if sql is None:
+                        continue
+                    count += 1
+                    name = method_name if count == 1 else f"{method_name}#{count}"
+                    self.register(name, sql, allow_scan)
+
+    @property
+    def cache_size(self) -> int:
+        """Size of the sqlite3 statement cache keeping every registered statement prepared"""
+        return max(DEFAULT_CACHED_STATEMENTS, len(self.statements) + CACHE_HEADROOM)
+
+    async def check(self, path: str) -> list[str]:
+        """Runs EXPLAIN QUERY PLAN for every statement on a separate connection
+
+        Args:
+            path (str): Database file
+
+        Returns:
+            list[str]: Problems found, statements that fail to prepare or scan a whole table without being allowed to
+        """
+        # A separate connection so the EXPLAIN variants don't push the real statements out of the bot's cache
+        return await asyncio.to_thread(self._check, path)
+
+    def _check(self, path: str) -> list[str]:
+        problems = []
+        conn = sqlite3.connect(path)
+        try:
+            for statement in self.statements.values():
+                parameters = (None,) * statement.sql.count("?")
+                try:
+                    plan = conn.execute(f"EXPLAIN QUERY PLAN {statement.sql}", parameters).fetchall()
+                except sqlite3.Error as e:
+                    problems.append(f"{statement.name} fails to prepare: {e}")
+                    continue
+                if statement.allow_scan:
+                    continue
+                for row in plan:
+                    detail = row[-1]
+                    if _is_table_scan(detail):
+                        problems.append(f"{statement.name} does a full table scan ({detail}): {statement.sql}")
+        finally:
+            conn.close()
+        return problems
+
+
+def _is_table_scan(detail: str) -> bool:
+    # "SCAN users", not index scans, the constant row of INSERT ... VALUES, scans of subquery results
+    # or of table-valued functions over a parameter (json_each)
+    if not detail.startswith("SCAN ") or " USING " in detail or " VIRTUAL TABLE" in detail:
+        return False
+    return detail != "SCAN CONSTANT ROW" and not detail.startswith("SCAN (subquery")
+
+
+def _execute_literal(node: ast.AST) -> str | None:
+    # db.conn.execute("...") / db.conn.executemany("...") with a string literal as the first argument
+    if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Attribute):
+        return None
+    if node.func.attr not in ("execute", "executemany") or not node.args:
+        return None
+    first = node.args[0]
+    if isinstance(first, ast.Constant) and isinstance(first.value, str):
+        return first.value
+    return None
+
+
+STATEMENTS = StatementRegistry()
@@ -7,8 +7,29 @@ import logging
 from logging.handlers import RotatingFileHandler
 import json
 import os
+import sys
+import math
+import time
+import cProfile
+import pstats
+from contextlib import contextmanager
+from db.backup import BackupManager
 from db.database import Database
 from db.models import Users
+from utils.graph import run_graph
+from utils.intents import build_client_options
+from utils.config_store import ConfigStore
+from utils import metrics
+from utils.watchdog import LoopWatchdog
+from utils.dm_outbox import DMOutbox
+from utils.mission_cache import MissionChannelCache
+from utils.bulk import BulkExecutor
+from utils import tracing
+from utils.command_tree import VersionedCommandTree
+
+# Startup timing
+startup_started = time.perf_counter()
+profile_startup = "--profile-startup" in sys.argv
 
 # Create configuration file if it doesn't exist
 if not os.path.exists("configuration.json"):
@@ -23,7 +44,12 @@ if not os.path.exists("configuration.json"):
             "roles": {},
             "ticket_system": {},
             "message_triggers": [],
-            "messages": {}
+            "messages": {},
+            "gateway": {
+                "intents": "minimal",
+                "member_cache": "intents",
+                "chunk_guilds_at_startup": True
+            }
             }, config, indent=4)
         print("Created default configuration.json, please edit it and restart the bot.")
         exit()
@@ -31,28 +57,37 @@ if not os.path.exists("configuration.json"):
 # Create .env file if it doesn't exist
 if not os.path.exists(".env"):
     with open(".env", "w", encoding="utf-8") as env:
-        env.write("DISCORD_BOT_TOKEN=\nDEBUG=False\n")
+        env.write("DISCORD_BOT_TOKEN=\nDEBUG=False\nMETRICS_PORT=\nDB_SLOW_QUERY_MS=100\nLOOP_LAG_THRESHOLD_MS=250\nTRACE_SAMPLE_RATE=0\nBACKUP_INTERVAL_HOURS=24\nBACKUP_KEEP=7\nBACKUP_DIR=backups\n")
         print("Created default .env, please edit it and restart the bot.")
         exit()
 
-# Load configuration file
-with open("configuration.json", "r", encoding="utf-8") as config: 
-    data = json.load(config)
-    prefix = data["prefix"]
-    owner_id = data["owner_id"]
-    guild_id = data["guild_id"]
-    permissions = data.get("permissions", {})
-    technical_info = data.get("technical_info", {})
-    channels = data.get("channels", {})
-    roles = data.get("roles", {})
-    ticket_system = data.get("ticket_system", {})
-    message_triggers = data.get("message_triggers", [])
-    messages = data.get("messages", {})
+# Load configuration file (changes are saved through config_store.commit)
+config_store = ConfigStore("configuration.json")
+data = config_store.load()
+prefix = data["prefix"]
+owner_id = data["owner_id"]
+guild_id = data["guild_id"]
+permissions = config_store.section("permissions", {})
+technical_info = config_store.section("technical_info", {})
+channels = config_store.section("channels", {})
+roles = config_store.section("roles", {})
+ticket_system = config_store.section("ticket_system", {})
+message_triggers = config_store.section("message_triggers", [])
+messages = config_store.section("messages", {})
+gateway = config_store.section("gateway", {})
 
 # Load .env variables
 load_dotenv()
 token = os.getenv("DISCORD_BOT_TOKEN")
 debug = os.getenv("DEBUG") == "True"
+metrics_port = int(os.getenv("METRICS_PORT") or 0)
+metrics_host = os.getenv("METRICS_HOST") or "127.0.0.1"
+slow_query_ms = float(os.getenv("DB_SLOW_QUERY_MS") or 100)
+loop_lag_threshold_ms = float(os.getenv("LOOP_LAG_THRESHOLD_MS") or 250)
+trace_sample_rate = float(os.getenv("TRACE_SAMPLE_RATE") or 0)
+backup_interval_hours = float(os.getenv("BACKUP_INTERVAL_HOURS") or 24)
+backup_keep = int(os.getenv("BACKUP_KEEP") or 7)
+backup_dir = os.getenv("BACKUP_DIR") or "backups"
 
 
 # Logging
@@ -83,16 +118,35 @@ if not discord_logger.handlers:
     discord_logger.addHandler(stream_handler)
     discord_logger.addHandler(file_handler)
 
-# Intents
-intents = discord.Intents.all()
+# Intents and member cache (see utils/intents.py for profiles)
+client_options = build_client_options(gateway)
+if metrics_port:
+    client_options["http_trace"] = metrics.http_trace_config()
+
+# Interaction tracing (Chrome trace format, see utils/tracing.py), enabled with TRACE_SAMPLE_RATE in .env
+if trace_sample_rate > 0:
+    tracing.configure(trace_sample_rate, f"logs/trace-{datetime.now():%Y%m%d-%H%M%S}.json")
+    client_options["http_trace"] = tracing.http_trace_config(client_options.get("http_trace"))
+
+
+# Log how long a startup phase took
+@contextmanager
+def startup_phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info(f"Startup phase '{name}' finished in {(time.perf_counter() - started) * 1000:.1f} ms")
 
 
 # The bot
 class MyBot(commands.Bot):
-    def __init__(self, command_prefix, intents, owner_id, guild_id):
-        super().__init__(command_prefix=command_prefix, intents=intents, owner_id=owner_id, help_command=None)
+    def __init__(self, command_prefix, owner_id, guild_id, **options):
+        super().__init__(command_prefix=command_prefix, owner_id=owner_id, help_command=None, tree_cls=VersionedCommandTree, **options)
         self.guild_id = guild_id
-        self.db = Database("db/bot.db")
+        self.db = Database("db/bot.db", slow_query_ms)
+        self.backups = BackupManager(self.db.path, backup_dir, backup_interval_hours, backup_keep)
+        self.config = config_store
         self.permissions = permissions
         self.technical_info = technical_info
         self.technical_info["current_run_date"] = datetime.now().isoformat()
@@ -101,68 +155,164 @@ class MyBot(commands.Bot):
         self.ticket_system = ticket_system
         self.message_triggers = message_triggers
         self.messages = messages
+        self._cogs_restored = False
+        self._first_ready = True
+        self.metrics_server = None
+        self.dm_outbox = DMOutbox(self)
+        self.bulk = BulkExecutor(self)
+        self.mission_channels = MissionChannelCache(self)
+        self.watchdog = LoopWatchdog(loop_lag_threshold_ms / 1000) if loop_lag_threshold_ms > 0 else None
         
     
-    # Load cogs
+    # Load cogs (imports modules and registers cogs, restore hooks run later)
     async def _load_cogs(self):
-        for filename in os.listdir("Cogs"):
+        for filename in sorted(os.listdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), "Cogs"))):
             if filename.endswith(".py"):
+                extension = f"Cogs.{filename[:-3]}"
+                started = time.perf_counter()
                 try:
-                    await self.load_extension(f"Cogs.{filename[:-3]}")
-                    logger.info(f"Loaded extension: Cogs.{filename[:-3]}")
+                    await self.load_extension(extension)
+                    logger.info(f"Loaded extension: {extension} ({(time.perf_counter() - started) * 1000:.1f} ms)")
                 except Exception:
-                    logger.exception(f"Failed to load extension Cogs.{filename[:-3]}")
+                    logger.exception(f"Failed to load extension {extension}")
+
+    # Run cog restore hooks concurrently, cogs can declare restore_after to wait for other cogs
+    async def _restore_cogs(self):
+        nodes = {}
+        for name, cog in self.cogs.items():
+            restore = getattr(cog, "cog_restore", None)
+            if restore is None:
+                continue
+            nodes[name] = (getattr(cog, "restore_after", ()), restore)
+
+        results = await run_graph(nodes)
+        for name, result in results.items():
+            if result.skipped:
+                continue
+            if result.error is not None:
+                logger.error(f"Restore of {name} failed", exc_info=result.error)
+                continue
+            logger.info(f"Restored {name} in {result.duration * 1000:.1f} ms")
+        self._cogs_restored = True
+
+    # Cogs added after startup restore their state straight away
+    async def add_cog(self, cog, /, **kwargs):
+        await super().add_cog(cog, **kwargs)
+        if self._cogs_restored and hasattr(cog, "cog_restore"):
+            await cog.cog_restore()
 
     # Update users currently on guild in db
     async def _update_users_on_guild_status(self):
         if not hasattr(self, "db") or self.db is None:
             return
-        if not self.get_guild(self.guild_id):
+        guild = self.get_guild(self.guild_id)
+        if not guild:
             return
+        # Member list is incomplete when chunking at startup is disabled
+        if not guild.chunked and self.intents.members:
+            await guild.chunk()
         logger.info("Updating users on_guild status in database...")
         members = []
-        for member in self.get_guild(self.guild_id).members:
+        for member in guild.members:
             if member.bot:
                 continue
             members.append((member.id, member.name))
         if debug:
-            logger.debug(self.get_guild(self.guild_id))
+            logger.debug(guild)
             logger.debug(f"Guild members: {members}")
         await Users.update_users_on_startup(self.db, members)
         logger.info("Users on_guild status updated.")
 
     # Before startup
     async def setup_hook(self):
-        await self.db.connect()
-        await self._load_cogs()
-        guild = discord.Object(id=self.guild_id)
-        self.tree.copy_global_to(guild=guild)
-        await self.tree.sync(guild=guild)
+        profiler = None
+        if profile_startup:
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        if self.watchdog is not None:
+            self.watchdog.start()
+        if metrics_port:
+            await self._start_metrics()
+        with startup_phase("database"):
+            await self.db.connect()
+        with startup_phase("query plans"):
+            await self.db.check_statements()
+        await self.config.commit("technical_info")
+        await self.backups.start()
+        with startup_phase("dm outbox"):
+            await self.dm_outbox.start()
+        with startup_phase("load cogs"):
+            await self._load_cogs()
+        with startup_phase("restore cogs"):
+            await self._restore_cogs()
+        with startup_phase("sync commands"):
+            guild = discord.Object(id=self.guild_id)
+            self.tree.copy_global_to(guild=guild)
+            await self.tree.sync(guild=guild)
+
+        if profiler is not None:
+            profiler.disable()
+            self._write_startup_profile(profiler)
+
+    # Optional Prometheus endpoint, enabled with METRICS_PORT in .env
+    async def _start_metrics(self):
+        metrics.CACHE_SIZE.callback = self._cache_sizes
+        metrics.GATEWAY_LATENCY_SECONDS.callback = lambda: None if math.isnan(self.latency) else self.latency
+        self.metrics_server = metrics.MetricsServer(metrics_host, metrics_port)
+        await self.metrics_server.start()
+
+    def _cache_sizes(self) -> dict[str, int]:
+        sizes = {"dm_outbox": self.dm_outbox.size, "mission_channels": len(self.mission_channels)}
+        level = self.get_cog("Level")
+        if level is not None:
+            sizes["users_experience_cache"] = len(level.users_experience_cache)
+            sizes["cooldown_cache"] = len(level.cooldown_cache)
+        missions = self.get_cog("MissionsCog")
+        if missions is not None:
+            sizes["mission_locks"] = len(missions._mission_locks)
+        triggers = self.get_cog("Triggers")
+        if triggers is not None:
+            sizes["last_triggered_times"] = len(triggers.last_triggered_times)
+        return sizes
+
+    # Dump startup profile to logs/ (for import times run: python -X importtime main.py)
+    def _write_startup_profile(self, profiler: cProfile.Profile):
+        profiler.dump_stats("logs/startup.prof")
+        with open("logs/startup_profile.txt", "w", encoding="utf-8") as report:
+            stats = pstats.Stats(profiler, stream=report)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(60)
+        logger.info("Startup profile written to logs/startup.prof and logs/startup_profile.txt")
 
     # On startup
     async def on_ready(self):
         logger.info(f"We have logged in as {self.user}")
         logger.info(discord.__version__)
+        if self._first_ready:
+            self._first_ready = False
+            logger.info(f"Time to first ready: {time.perf_counter() - startup_started:.2f} s")
         await self._update_users_on_guild_status()
         
+    # Count messages before the regular command processing
+    async def on_message(self, message: discord.Message):
+        if message.guild is not None and not message.author.bot:
+            metrics.MESSAGES_PROCESSED.inc()
+        await self.process_commands(message)
+
     # On shutdown
     async def close(self):
-        # Save changes in configuration file
-        with open("configuration.json", "r", encoding="utf-8") as config:
-            data = json.load(config)
-            data["permissions"] = self.permissions
-            data["technical_info"]["current_run_date"] = self.technical_info["current_run_date"]
-            data["channels"] = self.channels
-            data["ticket_system"] = self.ticket_system
-            data["message_triggers"] = self.message_triggers
-            data["messages"] = self.messages
-            
-        with open("configuration.json", "w", encoding="utf-8") as config:
-            json.dump(data, config, indent=4)
-        
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
+        await self.dm_outbox.close()
+        await self.backups.close()
         await self.db.close()
+        if tracing.TRACER.writer is not None:
+            tracing.TRACER.writer.close()
         await super().close()
 
-# Run the bot
-bot = MyBot(command_prefix=prefix, intents=intents, owner_id=owner_id, guild_id=guild_id)
-bot.run(token)
\ No newline at end of file
+# Run the bot (tools/loadtest.py imports MyBot without running it)
+if __name__ == "__main__":
+    bot = MyBot(command_prefix=prefix, owner_id=owner_id, guild_id=guild_id, **client_options)
+    bot.run(token)
\ No newline at end of file
@@ -35,6 +35,44 @@ TYPE_HANDLERS = {
 }
 
 
+class TicketMetadata:
+    """Ticket types and configured categories kept in memory.
+
+    ticket_types is seeded by the migrations and never changes, so it's read once. Categories
+    are indexed by casefolded name, the index is rebuilt when the ticket_system section changes
+    (see TicketsCog, which subscribes rebuild_categories to it).
+    """
+
+    def __init__(self):
+        self.type_ids: dict[str, int] = {}
+        self.type_names: dict[int, str] = {}
+        self.types_loaded = False
+        self.categories: dict[str, TicketCategory] | None = None
+
+    async def load_types(self, db) -> None:
+        rows = await TicketTypes.list(db)
+        self.type_ids = {str(row.name): int(row.id) for row in rows}
+        self.type_names = {type_id: name for name, type_id in self.type_ids.items()}
+        self.types_loaded = True
+
+    def rebuild_categories(self, ticket_system: dict) -> None:
+        index = {}
+        for category in ticket_system.get("ticket_categories", []):
+            name = str(category.get("name", ""))
+            # First match wins, as in the linear lookup this replaced
+            index.setdefault(name.casefold(), TicketCategory(
+                name=name,
+                description=category.get("description", ""),
+                type_name=category.get("type", "custom"),
+                category_id=int(category.get("category_id", 0) or 0),
+                prompt_for_title=bool(category.get("prompt_title", True)),
+            ))
+        self.categories = index
+
+
+METADATA = TicketMetadata()
+
+
 def normalize_channel_name(title: str) -> str:
     base = title.strip().lower()
     base = base.replace(" ", "-")
@@ -46,18 +84,9 @@ def normalize_channel_name(title: str) -> str:
 
 
 def get_category_from_config(bot: discord.Client, category_name: str) -> TicketCategory | None:
-    categories = getattr(bot, "ticket_system", {}).get("ticket_categories", [])
-    for category in categories:
-        if str(category.get("name", "")).casefold() == category_name.casefold():
-            prompt_for_title = bool(category.get("prompt_title", True))
-            return TicketCategory(
-                name=category.get("name", category_name),
-                description=category.get("description", ""),
-                type_name=category.get("type", "custom"),
-                category_id=int(category.get("category_id", 0) or 0),
-                prompt_for_title=prompt_for_title,
-            )
-    return None
+    if METADATA.categories is None:
+        METADATA.rebuild_categories(getattr(bot, "ticket_system", {}))
+    return METADATA.categories.get(category_name.casefold())
 
 
 def build_generic_title(category: TicketCategory, user: discord.abc.User) -> str:
@@ -76,6 +105,15 @@ def get_type_handler(type_name: str):
     return TYPE_HANDLERS.get(type_name, TYPE_HANDLERS["custom"])
 
 
+def get_type_dynamic_items() -> tuple:
+    """Dynamic items added to ticket messages by the type handlers"""
+    items = []
+    for handler in TYPE_HANDLERS.values():
+        if hasattr(handler, "get_dynamic_items"):
+            items.extend(handler.get_dynamic_items())
+    return tuple(items)
+
+
 def serialize_categories_payload(mode: str, categories: list[str]) -> str:
     return json.dumps({"mode": mode, "categories": categories}, ensure_ascii=False)
 
@@ -100,9 +138,11 @@ async def get_ticket_type_id(db, type_name: str) -> int | None:
         type_name (str): Ticket type name
 
     Returns:
-        fetchone: id
+        int | None: id
     """
-    return await TicketTypes.get_id_by_name(db, type_name)
+    if not METADATA.types_loaded:
+        await METADATA.load_types(db)
+    return METADATA.type_ids.get(type_name)
 
 
 async def get_ticket_type_name(db, type_id: int) -> str | None:
@@ -113,9 +153,11 @@ async def get_ticket_type_name(db, type_id: int) -> str | None:
         type_id (int): Ticket type id
 
     Returns:
-        fetchone: name
+        str | None: name
     """
-    return await TicketTypes.get_name_by_id(db, type_id)
+    if not METADATA.types_loaded:
+        await METADATA.load_types(db)
+    return METADATA.type_names.get(type_id)
 
 
 async def create_ticket_record(db, channel_id: int, user_id: int, type_id: int, title: str):
@@ -200,6 +242,18 @@ async def list_ticket_create_messages(db) -> list[tuple[Any, ...]]:
     """
     return await TicketCreateMessages.list(db)
 
+async def get_ticket_create_message(db, message_id: int) -> tuple[Any, ...] | None:
+    """Gets ticket create message by message id
+
+    Args:
+        db (_type_): Database to be used
+        message_id (int): Discord message id
+
+    Returns:
+        fetchone: channel_id, message_id, categories
+    """
+    return await TicketCreateMessages.get_by_message_id(db, message_id)
+
 async def delete_ticket_create_message(db, message_id: int):
     """Deletes ticket create message by message id
 
@@ -215,7 +269,20 @@ async def create_ticket_channel(
     user: discord.Member,
     title: str,
     category_id: int,
+    ticket_manager_ids: list[int] | None = None,
 ) -> discord.TextChannel:
+    """Creates a ticket channel with all permission overwrites set in the create call
+
+    Args:
+        guild (discord.Guild): Guild of the ticket
+        user (discord.Member): Ticket creator
+        title (str): Ticket title, the channel is named after it
+        category_id (int): Discord category for the channel, 0 for none
+        ticket_manager_ids (list[int] | None, optional): Roles managing this ticket type. Defaults to None.
+
+    Returns:
+        discord.TextChannel: Created channel
+    """
     channel_name = normalize_channel_name(title)
 
     overwrites: dict[discord.abc.Snowflake, discord.PermissionOverwrite] = {
@@ -243,6 +310,12 @@ async def create_ticket_channel(
             manage_messages=True,
         )
 
+    for ticket_manager_role_id in ticket_manager_ids or ():
+        ticket_manager_role = guild.get_role(ticket_manager_role_id)
+        if ticket_manager_role:
+            overwrite = overwrites.setdefault(ticket_manager_role, discord.PermissionOverwrite())
+            overwrite.update(view_channel=True, send_messages=True, manage_messages=True)
+
     category = guild.get_channel(category_id) if category_id else None
 
     channel = await guild.create_text_channel(
@@ -266,17 +339,3 @@ async def set_ticket_user_send_permission(
     overwrite.send_messages = can_send
     overwrite.view_channel = True
     await channel.set_permissions(member, overwrite=overwrite)
-
-
-async def set_permissions_for_ticket_managers(channel, guild, ticket_manager_ids):
-    if ticket_manager_ids:
-        for ticket_manager_role_id in ticket_manager_ids:
-            ticket_manager_role = guild.get_role(ticket_manager_role_id)
-            if ticket_manager_role:
-                await channel.set_permissions(
-                    ticket_manager_role,
-                    read_messages=True,
-                    send_messages=True,
-                    view_channel=True,
-                    manage_messages=True,
-                )
\ No newline at end of file
@@ -1,5 +1,7 @@
 import discord
 
+from db.models import Tickets
+
 
 class ProposalTicketType:
     type_name = "proposal"
@@ -24,21 +26,33 @@ class ProposalTicketType:
     async def customize_open_view(self, view, bot, interaction, channel, category, title):
         view.add_item(ProposalForwardButton(bot, channel.id, title))
 
+    def get_dynamic_items(self):
+        return (ProposalForwardButton,)
+
 
 
 
-class ProposalForwardButton(discord.ui.Button):
+class ProposalForwardButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket_proposal_forward_(?P<channel_id>\d+)"):
         def __init__(self, bot, channel_id, title):
             super().__init__(
-                label="Przekaż propozycję do głosowania",
-                style=discord.ButtonStyle.primary,
-                custom_id=f"ticket_proposal_forward_{channel_id}",
+                discord.ui.Button(
+                    label="Przekaż propozycję do głosowania",
+                    style=discord.ButtonStyle.primary,
+                    custom_id=f"ticket_proposal_forward_{channel_id}",
+                )
             )
             self.bot = bot
             self.channel_id = channel_id
             self.title = title
             self.proposal_channel_id = bot.channels.get("proposals_channel_id")
 
+        # Built when clicked, the title comes from the ticket record
+        @classmethod
+        async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+            channel_id = int(match["channel_id"])
+            row = await Tickets.get_by_channel(interaction.client.db, channel_id)
+            return cls(interaction.client, channel_id, row.title if row else "")
+
         async def callback(self, interaction: discord.Interaction):
             if not interaction.user.guild_permissions.administrator or interaction.channel.permissions_for(interaction.user).manage_messages is False:
                 await interaction.response.send_message("Nie masz uprawnień do przekazywania propozycji.", ephemeral=True)
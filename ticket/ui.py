@@ -1,6 +1,8 @@
 import logging
 import discord
 
+from ticket import core
+
 
 logger = logging.getLogger("fogbot")
 
@@ -28,16 +30,29 @@ class TicketTitleModal(discord.ui.Modal):
         )
 
 
-class TicketCreateButton(discord.ui.Button):
-    def __init__(self, category_name: str, custom_id: str):
+class TicketCreateButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket_create_button_(?P<message_id>\d+)"):
+    def __init__(self, category_name: str | None, message_id: int):
         super().__init__(
-            label=f"Utwórz ticket: {category_name}",
-            style=discord.ButtonStyle.primary,
-            custom_id=custom_id,
+            discord.ui.Button(
+                label=f"Utwórz ticket: {category_name}",
+                style=discord.ButtonStyle.primary,
+                custom_id=f"ticket_create_button_{message_id}",
+            )
         )
         self.category_name = category_name
 
+    # Built when clicked, the category is read from the saved create message
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        message_id = int(match["message_id"])
+        row = await core.get_ticket_create_message(interaction.client.db, message_id)
+        categories = core.parse_categories_payload(row.categories or "")[1] if row else []
+        return cls(category_name=categories[0] if categories else None, message_id=message_id)
+
     async def callback(self, interaction: discord.Interaction):
+        if self.category_name is None:
+            await interaction.response.send_message("Ta wiadomość nie tworzy już ticketów.", ephemeral=True)
+            return
         cog = interaction.client.get_cog("TicketsCog")
         if cog is None:
             await interaction.response.send_message("Moduł ticketów nie jest dostępny.", ephemeral=True)
@@ -45,21 +60,29 @@ class TicketCreateButton(discord.ui.Button):
         await cog._start_ticket_creation(interaction=interaction, category_name=self.category_name)
 
 
-class TicketCreateSelect(discord.ui.Select):
-    def __init__(self, categories: list[str], custom_id: str):
+class TicketCreateSelect(discord.ui.DynamicItem[discord.ui.Select], template=r"ticket_create_select_(?P<message_id>\d+)"):
+    def __init__(self, categories: list[str], message_id: int):
         options = [discord.SelectOption(label="Odznacz", value="__none__")]
         options += [discord.SelectOption(label=cat, value=cat) for cat in categories]
         super().__init__(
-            placeholder="Wybierz kategorię ticketu",
-            min_values=1,
-            max_values=1,
-            options=options,
-            custom_id=custom_id,
+            discord.ui.Select(
+                placeholder="Wybierz kategorię ticketu",
+                min_values=1,
+                max_values=1,
+                options=options,
+                custom_id=f"ticket_create_select_{message_id}",
+            )
         )
         self.categories = categories
 
+    # Built when used, the categories are the options of the message's select
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        categories = [option.value for option in item.options if option.value != "__none__"]
+        return cls(categories=categories, message_id=int(match["message_id"]))
+
     async def callback(self, interaction: discord.Interaction):
-        selected = self.values[0]
+        selected = self.item.values[0]
         if selected == "__none__":
             await interaction.response.defer()
             return
@@ -72,26 +95,32 @@ class TicketCreateSelect(discord.ui.Select):
 
 
 class TicketCreateButtonView(discord.ui.View):
-    def __init__(self, category_name: str, custom_id: str):
+    def __init__(self, category_name: str, message_id: int):
         super().__init__(timeout=None)
-        self.add_item(TicketCreateButton(category_name=category_name, custom_id=custom_id))
+        self.add_item(TicketCreateButton(category_name=category_name, message_id=message_id))
 
 
 class TicketCreateSelectView(discord.ui.View):
-    def __init__(self, categories: list[str], custom_id: str):
+    def __init__(self, categories: list[str], message_id: int):
         super().__init__(timeout=None)
-        self.add_item(TicketCreateSelect(categories=categories, custom_id=custom_id))
+        self.add_item(TicketCreateSelect(categories=categories, message_id=message_id))
 
 
-class TicketCloseButton(discord.ui.Button):
+class TicketCloseButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket_close_(?P<channel_id>\d+)"):
     def __init__(self, channel_id: int):
         super().__init__(
-            label="Zamknij ticket",
-            style=discord.ButtonStyle.danger,
-            custom_id=f"ticket_close_{channel_id}",
+            discord.ui.Button(
+                label="Zamknij ticket",
+                style=discord.ButtonStyle.danger,
+                custom_id=f"ticket_close_{channel_id}",
+            )
         )
         self.channel_id = channel_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(channel_id=int(match["channel_id"]))
+
     async def callback(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("TicketsCog")
         if cog is None:
@@ -100,15 +129,21 @@ class TicketCloseButton(discord.ui.Button):
         await cog._handle_ticket_close(interaction=interaction, channel_id=self.channel_id)
 
 
-class TicketReopenButton(discord.ui.Button):
+class TicketReopenButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket_reopen_(?P<channel_id>\d+)"):
     def __init__(self, channel_id: int):
         super().__init__(
-            label="Otwórz ponownie",
-            style=discord.ButtonStyle.success,
-            custom_id=f"ticket_reopen_{channel_id}",
+            discord.ui.Button(
+                label="Otwórz ponownie",
+                style=discord.ButtonStyle.success,
+                custom_id=f"ticket_reopen_{channel_id}",
+            )
         )
         self.channel_id = channel_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(channel_id=int(match["channel_id"]))
+
     async def callback(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("TicketsCog")
         if cog is None:
@@ -117,15 +152,21 @@ class TicketReopenButton(discord.ui.Button):
         await cog._handle_ticket_reopen(interaction=interaction, channel_id=self.channel_id)
 
 
-class TicketTranscriptButton(discord.ui.Button):
+class TicketTranscriptButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket_transcript_(?P<channel_id>\d+)"):
     def __init__(self, channel_id: int):
         super().__init__(
-            label="Transkrypt",
-            style=discord.ButtonStyle.secondary,
-            custom_id=f"ticket_transcript_{channel_id}",
+            discord.ui.Button(
+                label="Transkrypt",
+                style=discord.ButtonStyle.secondary,
+                custom_id=f"ticket_transcript_{channel_id}",
+            )
         )
         self.channel_id = channel_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(channel_id=int(match["channel_id"]))
+
     async def callback(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("TicketsCog")
         if cog is None:
@@ -134,15 +175,21 @@ class TicketTranscriptButton(discord.ui.Button):
         await cog._handle_ticket_transcript(interaction=interaction, channel_id=self.channel_id)
 
 
-class TicketDeleteButton(discord.ui.Button):
+class TicketDeleteButton(discord.ui.DynamicItem[discord.ui.Button], template=r"ticket_delete_(?P<channel_id>\d+)"):
     def __init__(self, channel_id: int):
         super().__init__(
-            label="Usuń ticket",
-            style=discord.ButtonStyle.danger,
-            custom_id=f"ticket_delete_{channel_id}",
+            discord.ui.Button(
+                label="Usuń ticket",
+                style=discord.ButtonStyle.danger,
+                custom_id=f"ticket_delete_{channel_id}",
+            )
         )
         self.channel_id = channel_id
 
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(channel_id=int(match["channel_id"]))
+
     async def callback(self, interaction: discord.Interaction):
         cog = interaction.client.get_cog("TicketsCog")
         if cog is None:
@@ -162,4 +209,15 @@ class TicketClosedView(discord.ui.View):
         super().__init__(timeout=None)
         self.add_item(TicketReopenButton(channel_id=channel_id))
         self.add_item(TicketTranscriptButton(channel_id=channel_id))
-        self.add_item(TicketDeleteButton(channel_id=channel_id))
\ No newline at end of file
+        self.add_item(TicketDeleteButton(channel_id=channel_id))
+
+
+# Registered by TicketsCog, components of every ticket message are built from their custom_id when used
+DYNAMIC_ITEMS = (
+    TicketCreateButton,
+    TicketCreateSelect,
+    TicketCloseButton,
+    TicketReopenButton,
+    TicketTranscriptButton,
+    TicketDeleteButton,
+)
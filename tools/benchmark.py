@@ -0,0 +1,278 @@
+"""Benchmarks of the message hot path and the main db.models queries.
+
+Cogs run against lightweight fake bot / message objects, models against a temporary
+database filled by db.seed. Results are written as JSON so runs from different commits can
+be compared.
+
+Usage:
+    python -m tools.benchmark
+    python -m tools.benchmark --output logs/benchmark.json --filter triggers
+    python -m tools.benchmark --compare logs/benchmark-old.json logs/benchmark.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+from db.database import Database
+from db.seed import SeedResult, SeedSizes, seed_file
+from db.models import Attendance, Missions, Slots, Tickets, Users
+
+
+GUILD_ID = 1
+
+
+# ===== Fakes =====
+class FakeChannel:
+    async def send(self, *args, **kwargs):
+        return None
+
+
+class FakeUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.name = f"user{user_id}"
+        self.bot = False
+
+    async def send(self, *args, **kwargs):
+        return None
+
+
+def fake_bot(**attributes) -> SimpleNamespace:
+    async def fetch_user(user_id: int):
+        return FakeUser(user_id)
+
+    async def send_dm(*args, **kwargs):
+        return None
+
+    defaults = {
+        "guild_id": GUILD_ID,
+        "message_triggers": [],
+        "get_user": lambda user_id: None,
+        "fetch_user": fetch_user,
+        "dm_outbox": SimpleNamespace(send=send_dm),
+    }
+    return SimpleNamespace(**{**defaults, **attributes})
+
+
+def fake_message(user_id: int, content: str, created_at: datetime | None = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        guild=SimpleNamespace(id=GUILD_ID),
+        author=FakeUser(user_id),
+        content=content,
+        channel=FakeChannel(),
+        created_at=created_at or datetime.now(timezone.utc),
+    )
+
+
+# ===== Runner =====
+class Benchmarks:
+    def __init__(self, name_filter: str | None, min_time: float):
+        self.name_filter = name_filter
+        self.min_time = min_time
+        self.results: dict[str, dict] = {}
+
+    async def run(self, name: str, func, setup=None, rounds: int | None = None) -> None:
+        """Times an async callable, repeating it until min_time passed (or for a fixed number of rounds)
+
+        Args:
+            name (str): Benchmark name
+            func: Async callable taking the value returned by setup
+            setup (optional): Callable (sync or async) run before every round, not timed
+            rounds (int | None, optional): Fixed number of rounds. Defaults to None.
+        """
+        if self.name_filter and self.name_filter not in name:
+            return
+        timings = []
+        started = time.perf_counter()
+        while (rounds is None and time.perf_counter() - started < self.min_time) or (rounds is not None and len(timings) < rounds):
+            argument = setup() if setup is not None else None
+            if asyncio.iscoroutine(argument):
+                argument = await argument
+            round_started = time.perf_counter()
+            await func(argument)
+            timings.append(time.perf_counter() - round_started)
+            if rounds is None and len(timings) >= 100000:
+                break
+
+        self.results[name] = {
+            "rounds": len(timings),
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.fmean(timings),
+            "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        }
+        print(f"{name:<48}{len(timings):>8}{self.results[name]['median'] * 1e6:>14.1f} us", file=sys.stderr)
+
+
+# ===== Benchmarks =====
+async def bench_triggers(bench: Benchmarks) -> None:
+    from Cogs.Triggers import Triggers
+
+    for count in (10, 100, 1000):
+        bot = fake_bot(message_triggers=[
+            {"keyword": f"slowo{index}", "response": "odpowiedz", "enabled": True, "whole_word": index % 2 == 0, "cooldown_seconds": 60}
+            for index in range(count)
+        ])
+        cog = Triggers(bot)
+        miss = fake_message(1, "zwykła wiadomość bez żadnego słowa kluczowego, trochę dłuższa niż zwykle")
+        hit = fake_message(1, f"wiadomość ze słowem slowo{count - 1} na końcu")
+        await bench.run(f"triggers.on_message[{count}] miss", lambda _: cog.on_message(miss))
+        await bench.run(f"triggers.on_message[{count}] hit", lambda _: cog.on_message(hit))
+
+
+async def bench_level(bench: Benchmarks, db: Database, data: SeedResult) -> None:
+    from Cogs.Level import Level
+
+    user_ids = data.user_ids[:5000]
+
+    def new_cog():
+        return Level(fake_bot(db=db))
+
+    async def messages_cold(cog):
+        # One message per user, every user is a cache miss
+        for user_id in user_ids:
+            await cog.on_message(fake_message(user_id, "hej"))
+
+    await bench.run(f"level.on_message x{len(user_ids)} cold cache", messages_cold, setup=new_cog, rounds=3)
+
+    warm = new_cog()
+    await messages_cold(warm)
+
+    def reset_cooldowns():
+        warm.cooldown_cache.clear()
+        return warm
+
+    await bench.run(f"level.on_message x{len(user_ids)} warm cache", messages_cold, setup=reset_cooldowns, rounds=5)
+
+    async def dirty_cog():
+        cog = new_cog()
+        for user_id in user_ids:
+            cog.users_experience_cache[user_id] = random.randint(0, 50000)
+        return cog
+
+    async def flush(cog):
+        await cog._flush_experience_cache.coro(cog)
+
+    await bench.run(f"level._flush_experience_cache x{len(user_ids)}", flush, setup=dirty_cog, rounds=3)
+
+
+async def bench_message_content(bench: Benchmarks) -> None:
+    from Cogs.Missions import _message_content
+
+    for size in (10, 50, 200):
+        slots = {slot_id: (slot_id, f"Slot {slot_id}", 10**17 + slot_id if slot_id % 2 else None) for slot_id in range(size)}
+
+        async def render(_, slots=slots):
+            _message_content(slots_dict=slots, squad="Alfa")
+
+        await bench.run(f"missions._message_content[{size}]", render)
+
+
+async def bench_models(bench: Benchmarks, db: Database, data: SeedResult, rng: random.Random) -> None:
+    user_ids, channel_ids, ticket_channel_ids = data.user_ids, data.mission_channel_ids, list(data.ticket_channels)
+
+    await bench.run("models.Users.get_user", lambda _: Users.get_user(db, rng.choice(user_ids)))
+    await bench.run("models.Users.get_leaderboard", lambda _: Users.get_leaderboard(db, 10))
+    await bench.run("models.Attendance.get_leaderboard", lambda _: Attendance.get_leaderboard(db, 10))
+    await bench.run("models.Missions.get_channel", lambda _: Missions.get_channel(db, rng.choice(channel_ids)))
+    await bench.run("models.Slots.list", lambda _: Slots.list(db), rounds=20)
+    await bench.run("models.Slots.get_by_mission_and_user", lambda _: Slots.get_by_mission_and_user(db, rng.randint(1, len(channel_ids)), rng.choice(user_ids)))
+    await bench.run("models.Tickets.get_by_channel", lambda _: Tickets.get_by_channel(db, rng.choice(ticket_channel_ids)))
+    await bench.run("models.Users.update_experience", lambda _: Users.update_experience(db, rng.choice(user_ids), rng.randint(0, 50000)))
+    members = [(user_id, f"user{index}") for index, user_id in enumerate(user_ids)]
+    await bench.run(f"models.Users.update_users_on_startup x{len(members)}", lambda _: Users.update_users_on_startup(db, members), rounds=3)
+
+
+async def run(args) -> dict:
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    bench = Benchmarks(args.filter, args.min_time)
+
+    with tempfile.TemporaryDirectory(prefix="fogbot-bench-") as workdir:
+        path = os.path.join(workdir, "bench.db")
+        # Fixed reference time so the dataset is identical between runs
+        data = await seed_file(path, SeedSizes(users=args.users, missions=args.missions), args.seed, datetime(2026, 1, 1))
+        db = Database(path, slow_query_ms=float("inf"))
+        await db.connect()
+        try:
+            await bench_triggers(bench)
+            await bench_message_content(bench)
+            await bench_level(bench, db, data)
+            await bench_models(bench, db, data, rng)
+        finally:
+            # The connection's worker thread would keep the process alive after a failed benchmark
+            await db.close()
+
+    return {
+        "commit": _git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "parameters": {"users": args.users, "missions": args.missions, "seed": args.seed},
+        "results": bench.results,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    with open(old_path, encoding="utf-8") as old_file, open(new_path, encoding="utf-8") as new_file:
+        old, new = json.load(old_file), json.load(new_file)
+
+    print(f"{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'benchmark':<48}{'old us':>12}{'new us':>12}{'change':>10}")
+    regressions = 0
+    for name, result in new["results"].items():
+        previous = old["results"].get(name)
+        if previous is None:
+            print(f"{name:<48}{'-':>12}{result['median'] * 1e6:>12.1f}{'new':>10}")
+            continue
+        change = (result["median"] - previous["median"]) / previous["median"] * 100
+        flag = ""
+        if change > threshold:
+            flag = "  <-- slower"
+            regressions += 1
+        print(f"{name:<48}{previous['median'] * 1e6:>12.1f}{result['median'] * 1e6:>12.1f}{change:>+9.1f}%{flag}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="JSON file for the results (default logs/benchmark-<commit>.json)")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this text")
+    parser.add_argument("--min-time", type=float, default=0.5, help="Seconds to repeat each benchmark for")
+    parser.add_argument("--users", type=int, default=SeedSizes.users)
+    parser.add_argument("--missions", type=int, default=SeedSizes.missions)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Median slowdown in percent reported as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.threshold))
+
+    report = asyncio.run(run(args))
+    output = args.output or os.path.join("logs", f"benchmark-{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as results:
+        json.dump(report, results, indent=4)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
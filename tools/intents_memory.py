@@ -0,0 +1,121 @@
+"""Compares memory usage and gateway traffic of intents / member cache profiles.
+
+Each profile is started in a separate process that logs in with the bot token from .env,
+waits until the guild is ready (and chunked), listens to gateway events for a while
+and reports its RSS.
+
+Usage:
+    python -m tools.intents_memory
+    python -m tools.intents_memory --duration 120 --profiles all minimal minimal-nochunk
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+import discord
+from dotenv import load_dotenv
+
+from utils.intents import build_client_options
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# Profiles to compare, in the same shape as the "gateway" configuration section
+PROFILES = {
+    "all": {"intents": "all", "member_cache": "intents", "chunk_guilds_at_startup": True},
+    "minimal": {"intents": "minimal", "member_cache": "intents", "chunk_guilds_at_startup": True},
+    "minimal-nochunk": {"intents": "minimal", "member_cache": "joined", "chunk_guilds_at_startup": False},
+}
+
+
+def _rss_mb() -> float | None:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open("/proc/self/status", encoding="utf-8") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+async def _measure(profile: str, duration: int) -> dict:
+    load_dotenv()
+    token = os.getenv("DISCORD_BOT_TOKEN")
+    with open("configuration.json", "r", encoding="utf-8") as config:
+        guild_id = json.load(config)["guild_id"]
+
+    client = discord.Client(**build_client_options(PROFILES[profile]))
+    events = Counter()
+    ready = asyncio.Event()
+
+    @client.event
+    async def on_ready():
+        ready.set()
+
+    @client.event
+    async def on_socket_event_type(event_type: str):
+        events[event_type] += 1
+
+    async with client:
+        runner = asyncio.create_task(client.start(token))
+        await ready.wait()
+        baseline_rss = _rss_mb()
+        events.clear()
+        await asyncio.sleep(duration)
+        gc.collect()
+        guild = client.get_guild(guild_id)
+        result = {
+            "profile": profile,
+            "rss_ready_mb": baseline_rss,
+            "rss_end_mb": _rss_mb(),
+            "members_cached": len(guild.members) if guild else 0,
+            "member_count": guild.member_count if guild else 0,
+            "events": sum(events.values()),
+            "events_by_type": dict(events.most_common(10)),
+        }
+        await client.close()
+        runner.cancel()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    parser.add_argument("--duration", type=int, default=60, help="Seconds to listen to gateway events after ready")
+    parser.add_argument("--child", choices=list(PROFILES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_measure(args.child, args.duration))))
+        return
+
+    results = []
+    for profile in args.profiles:
+        print(f"Measuring profile '{profile}' ({args.duration}s)...", file=sys.stderr)
+        output = subprocess.run(
+            [sys.executable, "-m", "tools.intents_memory", "--child", profile, "--duration", str(args.duration)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    print(f"{'profile':<18}{'rss ready MB':>14}{'rss end MB':>12}{'members':>10}{'events':>10}")
+    for result in results:
+        rss_ready = f"{result['rss_ready_mb']:.1f}" if result["rss_ready_mb"] is not None else "n/a"
+        rss_end = f"{result['rss_end_mb']:.1f}" if result["rss_end_mb"] is not None else "n/a"
+        print(f"{result['profile']:<18}{rss_ready:>14}{rss_end:>12}{result['members_cached']:>10}{result['events']:>10}")
+        print(f"    top events: {result['events_by_type']}")
+
+
+if __name__ == "__main__":
+    main()
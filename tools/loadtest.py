@@ -0,0 +1,555 @@
+"""Offline load test of the bot with a fake Discord gateway and REST API.
+
+Starts MyBot in a temporary directory (own configuration.json, .env and a database
+filled by db.seed), replaces the REST and webhook layers with in-memory stubs and
+feeds synthetic gateway events into the connection state at a configurable rate per
+scenario. No network access or bot token is needed.
+
+Scenarios:
+    messages          MESSAGE_CREATE from random members (Level, Triggers)
+    joins             GUILD_MEMBER_ADD of new members (Arrival)
+    slot_select       SlotSelect on mission signup messages
+    training_toggle   TrainingToggleButton on training signup messages
+    ticket_buttons    Close / reopen buttons in ticket channels
+
+Usage:
+    python -m tools.loadtest
+    python -m tools.loadtest --duration 30 --rate messages=200 --rate slot_select=20
+    python -m tools.loadtest --scenarios messages joins --users 2000
+    python -m tools.loadtest --slow-query-ms 0   # slow query logging on every statement, inside transactions too
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import discord
+from discord.http import HTTPClient
+from discord.webhook.async_ import AsyncWebhookAdapter
+
+from db.seed import SeedSizes, seed_file
+from db.instrumentation import STATS
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+GUILD_ID = 900000000000000001
+BOT_ID = 900000000000000002
+APPLICATION_ID = BOT_ID
+OWNER_ID = 900000000000000003
+MEMBER_ROLE_ID = 900000000000000004
+TICKET_CATEGORY_ID = 900000000000000005
+GENERAL_CHANNEL_ID = 900000000000000010
+LOG_CHANNEL_ID = 900000000000000011
+TICKET_PANEL_CHANNEL_ID = 900000000000000012
+
+DEFAULT_RATES = {
+    "messages": 100.0,
+    "joins": 2.0,
+    "slot_select": 10.0,
+    "training_toggle": 10.0,
+    "ticket_buttons": 5.0,
+}
+
+
+class Snowflakes:
+    def __init__(self, start: int = 910000000000000000):
+        self._next = start
+
+    def __call__(self) -> int:
+        self._next += 1
+        return self._next
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+# ===== Payloads =====
+def user_payload(user_id: int, bot: bool = False) -> dict:
+    return {
+        "id": str(user_id),
+        "username": f"user{user_id % 1000000}",
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": None,
+        "bot": bot,
+    }
+
+
+def member_payload(user_id: int, roles: tuple[int, ...] = (), bot: bool = False) -> dict:
+    return {
+        "user": user_payload(user_id, bot=bot),
+        "roles": [str(role) for role in roles],
+        "joined_at": _now(),
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+        "nick": None,
+    }
+
+
+def channel_payload(channel_id: int, name: str, parent_id: int | None = None, channel_type: int = 0) -> dict:
+    return {
+        "id": str(channel_id),
+        "type": channel_type,
+        "guild_id": str(GUILD_ID),
+        "name": name,
+        "position": 0,
+        "permission_overwrites": [],
+        "nsfw": False,
+        "parent_id": str(parent_id) if parent_id else None,
+        "topic": None,
+        "last_message_id": None,
+        "rate_limit_per_user": 0,
+    }
+
+
+def message_payload(message_id: int, channel_id: int, author_id: int, content: str, guild: bool = True) -> dict:
+    data = {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "author": user_payload(author_id, bot=author_id == BOT_ID),
+        "content": content,
+        "timestamp": _now(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "components": [],
+        "pinned": False,
+        "type": 0,
+        "flags": 0,
+    }
+    if guild:
+        data["guild_id"] = str(GUILD_ID)
+    return data
+
+
+# ===== Fake Discord =====
+class FakeDiscord:
+    """Answers REST and webhook requests from memory and counts them per route."""
+
+    def __init__(self, snowflake: Snowflakes):
+        self.snowflake = snowflake
+        self.calls: Counter[str] = Counter()
+
+    async def http_request(self, route, *, files=None, form=None, **kwargs):
+        self.calls[f"{route.method} {route.path}"] += 1
+        await asyncio.sleep(0)
+        return self._respond(route, kwargs.get("json"))
+
+    async def webhook_request(self, route, session=None, *, payload=None, **kwargs):
+        self.calls[f"{route.method} {route.path}"] += 1
+        await asyncio.sleep(0)
+        if route.path.endswith("/callback"):
+            return {
+                "interaction": {"id": str(route.webhook_id), "type": 3},
+                "resource": {"type": (payload or {}).get("type", 4)},
+            }
+        return message_payload(self.snowflake(), GENERAL_CHANNEL_ID, BOT_ID, (payload or {}).get("content") or "")
+
+    def _respond(self, route, body: dict | None):
+        method, path = route.method, route.path
+        body = body or {}
+        params = _route_params(route)
+        if path == "/channels/{channel_id}/messages" and method == "POST":
+            return message_payload(self.snowflake(), int(params.get("channel_id", GENERAL_CHANNEL_ID)), BOT_ID, body.get("content") or "")
+        if path == "/channels/{channel_id}/messages/{message_id}" and method == "PATCH":
+            return message_payload(int(params["message_id"]), int(params["channel_id"]), BOT_ID, body.get("content") or "")
+        if path == "/channels/{channel_id}/messages" and method == "GET":
+            return []
+        if path == "/users/@me/channels" and method == "POST":
+            recipient = int(body.get("recipient_id", 0))
+            return {"id": str(self.snowflake()), "type": 1, "recipients": [user_payload(recipient)], "last_message_id": None}
+        if path == "/guilds/{guild_id}/channels" and method == "POST":
+            return channel_payload(self.snowflake(), body.get("name", "channel"), body.get("parent_id"))
+        if path == "/users/{user_id}" and method == "GET":
+            return user_payload(int(params["user_id"]))
+        if path == "/guilds/{guild_id}/invites":
+            return []
+        if path.startswith("/applications/") and path.endswith("/commands"):
+            return []
+        return None
+
+
+def _route_params(route) -> dict[str, str]:
+    # Route only keeps a few major parameters, read the rest back from the formatted URL
+    template = route.path.strip("/").split("/")
+    actual = route.url.split("?")[0].rstrip("/").split("/")[-len(template):]
+    return {part[1:-1]: value for part, value in zip(template, actual) if part.startswith("{")}
+
+
+# ===== World =====
+class World:
+    """Guild members, channels and seeded database rows the scenarios pick from."""
+
+    def __init__(self, snowflake: Snowflakes, sizes: SeedSizes, seed_value: int):
+        self.snowflake = snowflake
+        self.sizes = sizes
+        self.seed_value = seed_value
+        self.user_ids: list[int] = []
+        self.channels: dict[int, str] = {
+            GENERAL_CHANNEL_ID: "general",
+            LOG_CHANNEL_ID: "logs",
+            TICKET_PANEL_CHANNEL_ID: "tickets",
+        }
+        self.signup_messages: list[tuple[int, int, list[int]]] = []
+        self.training_messages: list[tuple[int, int, int]] = []
+        self.ticket_channels: dict[int, bool] = {}
+
+    def guild_payload(self) -> dict:
+        permissions = str(discord.Permissions.all().value)
+        channels = [channel_payload(TICKET_CATEGORY_ID, "Tickets", channel_type=4)]
+        channels += [
+            channel_payload(channel_id, name, parent_id=TICKET_CATEGORY_ID if name.startswith("ticket-") else None)
+            for channel_id, name in self.channels.items()
+        ]
+        members = [member_payload(BOT_ID, (MEMBER_ROLE_ID,), bot=True)]
+        members += [member_payload(user_id, (MEMBER_ROLE_ID,)) for user_id in self.user_ids]
+        return {
+            "id": str(GUILD_ID),
+            "name": "Loadtest",
+            "owner_id": str(OWNER_ID),
+            "icon": None,
+            "roles": [
+                {"id": str(GUILD_ID), "name": "@everyone", "permissions": "0", "position": 0, "color": 0, "hoist": False, "managed": False, "mentionable": False},
+                {"id": str(MEMBER_ROLE_ID), "name": "Member", "permissions": permissions, "position": 1, "color": 0, "hoist": False, "managed": False, "mentionable": False},
+            ],
+            "channels": channels,
+            "members": members,
+            "member_count": len(members),
+            "threads": [],
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "voice_states": [],
+            "presences": [],
+            "stage_instances": [],
+            "guild_scheduled_events": [],
+            "large": False,
+            "unavailable": False,
+            "preferred_locale": "pl",
+            "afk_timeout": 300,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "premium_tier": 0,
+            "nsfw_level": 0,
+            "system_channel_flags": 0,
+        }
+
+    async def seed(self, path: str) -> None:
+        result = await seed_file(path, self.sizes, self.seed_value)
+        self.user_ids = result.user_ids
+        self.signup_messages = result.signup_messages
+        self.training_messages = result.training_messages
+        self.ticket_channels = result.ticket_channels
+        for index, channel_id in enumerate(result.mission_channel_ids):
+            self.channels[channel_id] = f"misja-{index}"
+        for index, (channel_id, _, _) in enumerate(result.training_messages):
+            self.channels[channel_id] = f"szkolenie-{index}"
+        for index, channel_id in enumerate(result.ticket_channels):
+            self.channels[channel_id] = f"ticket-{index}"
+
+
+def configuration() -> dict:
+    return {
+        "prefix": "!",
+        "owner_id": OWNER_ID,
+        "guild_id": GUILD_ID,
+        "permissions": {"mission_makers": [], "trainers": [], "recruiters": []},
+        "technical_info": {},
+        "channels": {"log_channel_id": LOG_CHANNEL_ID, "attendance_channel_id": LOG_CHANNEL_ID},
+        "roles": {"categories_roles_ids": [MEMBER_ROLE_ID]},
+        "ticket_system": {
+            "ticket_categories": [
+                {"name": "Pomoc", "description": "Pomoc", "type": "custom", "category_id": TICKET_CATEGORY_ID, "prompt_title": False},
+            ],
+        },
+        "message_triggers": [
+            {"keyword": f"trigger{index}", "response": f"Odpowiedź {index}", "enabled": True, "cooldown_seconds": 30}
+            for index in range(20)
+        ],
+        "messages": {},
+        "gateway": {"intents": "minimal", "member_cache": "intents", "chunk_guilds_at_startup": False},
+    }
+
+
+# ===== Scenarios =====
+class Harness:
+    def __init__(self, bot, world: World, fake: FakeDiscord):
+        self.bot = bot
+        self.world = world
+        self.fake = fake
+        self.state = bot._connection
+        self.snowflake = world.snowflake
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: Counter[str] = Counter()
+        self.sent: Counter[str] = Counter()
+        self._pending: set[asyncio.Task] = set()
+
+    def _interaction(self, channel_id: int, message_id: int, user_id: int, custom_id: str, component_type: int, values: list[str] | None = None) -> dict:
+        data = {"custom_id": custom_id, "component_type": component_type}
+        if values is not None:
+            data["values"] = values
+        # Components are built from the custom_id against the one in the message, so the message carries it
+        component = {"type": component_type, "custom_id": custom_id}
+        if component_type == 3:
+            component["options"] = [{"label": value, "value": value} for value in values or ()]
+        else:
+            component.update(style=1, label="button")
+        message = message_payload(message_id, channel_id, BOT_ID, "signup")
+        message["components"] = [{"type": 1, "components": [component]}]
+        interaction_id = self.snowflake()
+        return {
+            "id": str(interaction_id),
+            "application_id": str(APPLICATION_ID),
+            "type": 3,
+            "token": f"token-{interaction_id}",
+            "version": 1,
+            "guild_id": str(GUILD_ID),
+            "channel_id": str(channel_id),
+            "channel": {"id": str(channel_id), "type": 0, "guild_id": str(GUILD_ID), "name": self.world.channels.get(channel_id, "channel")},
+            "member": {**member_payload(user_id, (MEMBER_ROLE_ID,)), "permissions": "0"},
+            "data": data,
+            "message": message,
+            "app_permissions": str(discord.Permissions.all().value),
+            "locale": "pl",
+            "guild_locale": "pl",
+            "entitlements": [],
+            "authorizing_integration_owners": {},
+            "context": 0,
+            "attachment_size_limit": 10 * 1024 * 1024,
+        }
+
+    def event_messages(self) -> tuple[str, dict]:
+        content = random.choice(["hej", "siema wszystkim", "kiedy misja?", f"trigger{random.randrange(40)} test", "gg"])
+        return "MESSAGE_CREATE", message_payload(self.snowflake(), GENERAL_CHANNEL_ID, random.choice(self.world.user_ids), content)
+
+    def event_joins(self) -> tuple[str, dict]:
+        return "GUILD_MEMBER_ADD", {**member_payload(self.snowflake()), "guild_id": str(GUILD_ID)}
+
+    def event_slot_select(self) -> tuple[str, dict]:
+        channel_id, message_id, slot_ids = random.choice(self.world.signup_messages)
+        return "INTERACTION_CREATE", self._interaction(
+            channel_id, message_id, random.choice(self.world.user_ids), f"mission_select_{message_id}", 3, [str(random.choice(slot_ids))]
+        )
+
+    def event_training_toggle(self) -> tuple[str, dict]:
+        channel_id, message_id, training_id = random.choice(self.world.training_messages)
+        return "INTERACTION_CREATE", self._interaction(
+            channel_id, message_id, random.choice(self.world.user_ids), f"training_toggle_{training_id}", 2
+        )
+
+    def event_ticket_buttons(self) -> tuple[str, dict]:
+        channel_id = random.choice(list(self.world.ticket_channels))
+        is_open = self.world.ticket_channels[channel_id]
+        self.world.ticket_channels[channel_id] = not is_open
+        action = "close" if is_open else "reopen"
+        return "INTERACTION_CREATE", self._interaction(
+            channel_id, self.snowflake(), random.choice(self.world.user_ids), f"ticket_{action}_{channel_id}", 2
+        )
+
+    def dispatch(self, scenario: str, event: str, payload: dict) -> None:
+        """Parses one gateway event and tracks every task it spawned until they finish."""
+        before = asyncio.all_tasks()
+        started = time.perf_counter()
+        self.state.parsers[event](payload)
+        spawned = asyncio.all_tasks() - before
+        self.sent[scenario] += 1
+        task = asyncio.create_task(self._wait(scenario, started, spawned))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _wait(self, scenario: str, started: float, spawned: set[asyncio.Task]) -> None:
+        results = await asyncio.gather(*spawned, return_exceptions=True)
+        self.latencies.setdefault(scenario, []).append(time.perf_counter() - started)
+        for result in results:
+            if isinstance(result, BaseException):
+                self.errors[f"{scenario}: {type(result).__name__}"] += 1
+
+    async def run_scenario(self, scenario: str, rate: float, duration: float) -> None:
+        generator = getattr(self, f"event_{scenario}")
+        interval = 1 / rate
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sent = 0
+        while loop.time() - started < duration:
+            # Catch up when the loop falls behind instead of silently lowering the rate
+            due = int((loop.time() - started) / interval) + 1
+            for _ in range(due - sent):
+                event, payload = generator()
+                self.dispatch(scenario, event, payload)
+            sent = due
+            await asyncio.sleep(interval)
+
+    async def drain(self, timeout: float) -> None:
+        if self._pending:
+            await asyncio.wait(set(self._pending), timeout=timeout)
+
+
+def _install_stubs(fake: FakeDiscord) -> None:
+    async def http_request(self, route, **kwargs):
+        return await fake.http_request(route, **kwargs)
+
+    async def webhook_request(self, route, session=None, **kwargs):
+        return await fake.webhook_request(route, session, **kwargs)
+
+    HTTPClient.request = http_request
+    AsyncWebhookAdapter.request = webhook_request
+
+
+async def _start_bot(args, workdir: str):
+    sys.path.insert(0, REPO_ROOT)
+    os.chdir(workdir)
+    import main
+
+    if not args.verbose:
+        main.stream_handler.setLevel(logging.WARNING)
+        logging.getLogger("discord").setLevel(logging.WARNING)
+
+    snowflake = Snowflakes()
+    fake = FakeDiscord(snowflake)
+    _install_stubs(fake)
+
+    bot = main.MyBot(command_prefix="!", owner_id=OWNER_ID, guild_id=GUILD_ID, **main.client_options)
+    sizes = SeedSizes(
+        users=args.users, missions=args.missions, trainings=args.trainings, tickets=args.tickets,
+        blacklist=args.users // 100, future_missions=args.missions,
+    )
+    world = World(snowflake, sizes, args.seed)
+
+    # Login without the gateway: set the bot user, then run setup_hook against the seeded database
+    await world.seed(bot.db.path)
+
+    if args.slow_query_ms is not None:
+        bot.db.slow_query_ms = args.slow_query_ms
+
+    await bot._async_setup_hook()
+    bot._connection.user = discord.ClientUser(state=bot._connection, data=user_payload(BOT_ID, bot=True))
+    bot._connection.application_id = APPLICATION_ID
+    await bot.setup_hook()
+
+    bot._connection._add_guild_from_data(world.guild_payload())
+    bot._ready.set()
+    await bot._update_users_on_guild_status()
+    return bot, world, fake
+
+
+async def run(args) -> dict:
+    with tempfile.TemporaryDirectory(prefix="fogbot-loadtest-") as workdir:
+        os.makedirs(os.path.join(workdir, "db"))
+        with open(os.path.join(workdir, "configuration.json"), "w", encoding="utf-8") as config:
+            json.dump(configuration(), config, indent=4)
+        with open(os.path.join(workdir, ".env"), "w", encoding="utf-8") as env:
+            env.write("DISCORD_BOT_TOKEN=loadtest\nDEBUG=False\nMETRICS_PORT=\nLOOP_LAG_THRESHOLD_MS=0\n")
+
+        bot, world, fake = await _start_bot(args, workdir)
+        harness = Harness(bot, world, fake)
+        fake.calls.clear()
+        STATS.reset()
+
+        rates = {scenario: DEFAULT_RATES[scenario] for scenario in args.scenarios}
+        rates.update({scenario: rate for scenario, rate in args.rate if scenario in rates})
+
+        print(f"Running {', '.join(f'{s}@{r:g}/s' for s, r in rates.items())} for {args.duration}s...", file=sys.stderr)
+        started = time.perf_counter()
+        await asyncio.gather(*(harness.run_scenario(scenario, rate, args.duration) for scenario, rate in rates.items()))
+        await harness.drain(timeout=30)
+        elapsed = time.perf_counter() - started
+
+        report = {
+            "elapsed": elapsed,
+            "scenarios": {},
+            "db_statements": sum(stats.statements for stats in STATS.methods.values()),
+            "db_methods": {method: stats.count for method, stats in STATS.top(10)},
+            "rest_calls": dict(fake.calls.most_common()),
+            "errors": dict(harness.errors),
+        }
+        for scenario in rates:
+            latencies = harness.latencies.get(scenario, [])
+            report["scenarios"][scenario] = {
+                "sent": harness.sent[scenario],
+                "completed": len(latencies),
+                "throughput": len(latencies) / elapsed,
+                "p50_ms": _percentile(latencies, 0.5) * 1000,
+                "p95_ms": _percentile(latencies, 0.95) * 1000,
+                "p99_ms": _percentile(latencies, 0.99) * 1000,
+                "max_ms": max(latencies, default=0) * 1000,
+            }
+        await bot.close()
+    return report
+
+
+def _print_report(report: dict) -> None:
+    print(f"\n{'scenario':<18}{'sent':>8}{'done':>8}{'ev/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for scenario, result in report["scenarios"].items():
+        print(
+            f"{scenario:<18}{result['sent']:>8}{result['completed']:>8}{result['throughput']:>9.1f}"
+            f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['p99_ms']:>9.1f}{result['max_ms']:>9.1f}"
+        )
+    print(f"\nDB statements: {report['db_statements']}")
+    for method, count in report["db_methods"].items():
+        print(f"    {method:<40}{count:>8}")
+    print(f"REST calls: {sum(report['rest_calls'].values())}")
+    for route, count in report["rest_calls"].items():
+        print(f"    {route:<60}{count:>8}")
+    if report["errors"]:
+        print("Errors:")
+        for error, count in report["errors"].items():
+            print(f"    {error:<60}{count:>8}")
+
+
+def _rate(value: str) -> tuple[str, float]:
+    scenario, _, rate = value.partition("=")
+    if scenario not in DEFAULT_RATES or not rate:
+        raise argparse.ArgumentTypeError(f"expected <scenario>=<events per second>, scenarios: {', '.join(DEFAULT_RATES)}")
+    return scenario, float(rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(DEFAULT_RATES), choices=list(DEFAULT_RATES))
+    parser.add_argument("--rate", type=_rate, action="append", default=[], help="Events per second, e.g. messages=200")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds to generate events for")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--missions", type=int, default=5)
+    parser.add_argument("--trainings", type=int, default=5)
+    parser.add_argument("--tickets", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for reproducible runs")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--slow-query-ms", type=float, help="Slow query log threshold, 0 logs (and EXPLAINs) every statement")
+    parser.add_argument("--verbose", action="store_true", help="Show bot logs on the console")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    report = asyncio.run(run(args))
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(report, output, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Iterable
+
+import discord
+
+
+logger = logging.getLogger("fogbot")
+
+# Used until discord.py has seen the rate limit headers of a route
+DEFAULT_CONCURRENCY = 3
+MAX_CONCURRENCY = 10
+
+# Routes (method, path template as in discord.http.Route) used by bulk jobs
+ADD_ROLE = ("PUT", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+REMOVE_ROLE = ("DELETE", "/guilds/{guild_id}/members/{user_id}/roles/{role_id}")
+DELETE_MESSAGE = ("DELETE", "/channels/{channel_id}/messages/{message_id}")
+
+# Discord bulk deletes at most 100 messages per call, none of them older than 14 days
+BULK_DELETE_SIZE = 100
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=5)
+# Old messages are deleted one by one through run(), this many are kept in memory at once
+OLD_MESSAGES_CHUNK = 200
+
+
+@dataclass
+class BulkResult:
+    name: str
+    total: int
+    succeeded: int = 0
+    failed: list[tuple[Any, Exception]] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        """Short summary in Polish for command responses"""
+        text = f"Wykonano {self.succeeded}/{self.total} operacji w {self.elapsed:.1f} s."
+        if self.failed:
+            text += f" Nieudane: {len(self.failed)}."
+        return text
+
+
+class BulkExecutor:
+    """Runs many Discord REST calls of one route concurrently, within the route's rate limit bucket.
+
+    Concurrency per route follows the bucket limit discord.py learned from the
+    X-RateLimit-Limit headers (capped at MAX_CONCURRENCY), and is shared by all bulk jobs
+    on the same route so two jobs don't double it. discord.py still waits for the bucket
+    reset itself, the executor only avoids queueing far more requests than the bucket allows.
+    """
+
+    def __init__(self, bot: discord.Client):
+        self.bot = bot
+        self._semaphores: dict[str, tuple[int, asyncio.Semaphore]] = {}
+
+    def route_limit(self, method: str, path: str) -> int | None:
+        """Bucket limit discord.py reported for a route
+
+        Args:
+            method (str): HTTP method, e.g. "PUT"
+            path (str): Route path template, e.g. "/guilds/{guild_id}/members/{user_id}/roles/{role_id}"
+
+        Returns:
+            int | None: Requests allowed per bucket window, None if the route wasn't used yet
+        """
+        http = self.bot.http
+        route_key = f"{method} {path}"
+        # Once Discord sent a bucket hash, discord.py keys the bucket by that hash
+        prefix = getattr(http, "_bucket_hashes", {}).get(route_key, route_key) + ":"
+        limits = [bucket.limit for key, bucket in getattr(http, "_buckets", {}).items() if key.startswith(prefix)]
+        return max(limits) if limits else None
+
+    def _semaphore(self, method: str, path: str) -> asyncio.Semaphore:
+        limit = min(self.route_limit(method, path) or DEFAULT_CONCURRENCY, MAX_CONCURRENCY)
+        route_key = f"{method} {path}"
+        current = self._semaphores.get(route_key)
+        if current is None or current[0] != limit:
+            current = (limit, asyncio.Semaphore(limit))
+            self._semaphores[route_key] = current
+        return current[1]
+
+    async def run(
+        self,
+        name: str,
+        items: Iterable,
+        operation: Callable[[Any], Awaitable],
+        route: tuple[str, str],
+        progress: Callable[[int, int], Awaitable] | None = None,
+        progress_interval: float = 3.0,
+    ) -> BulkResult:
+        """Calls operation for every item, concurrently up to the route limit
+
+        Args:
+            name (str): Job name for logs
+            items (Iterable): Items passed to operation
+            operation (Callable[[Any], Awaitable]): Makes one REST call for an item
+            route (tuple[str, str]): (method, path template) of the REST call
+            progress (Callable[[int, int], Awaitable] | None, optional): Called with (done, total) at most every progress_interval seconds. Defaults to None.
+            progress_interval (float, optional): Seconds between progress calls. Defaults to 3.0.
+
+        Returns:
+            BulkResult: Number of successful calls and failed items with their errors
+        """
+        items = list(items)
+        result = BulkResult(name, len(items))
+        started = time.perf_counter()
+        last_progress = started
+        done = 0
+
+        async def call(item):
+            nonlocal done, last_progress
+            # Looked up per call, the limit is only known after the first response
+            async with self._semaphore(*route):
+                try:
+                    await operation(item)
+                    result.succeeded += 1
+                except discord.HTTPException as e:
+                    result.failed.append((item, e))
+            done += 1
+            if progress is not None and time.perf_counter() - last_progress >= progress_interval:
+                last_progress = time.perf_counter()
+                try:
+                    await progress(done, result.total)
+                except discord.HTTPException as e:
+                    logger.debug(f"Progress update of bulk job {name} failed: {e}")
+
+        await asyncio.gather(*(call(item) for item in items))
+        result.elapsed = time.perf_counter() - started
+
+        logger.info(f"Bulk job {name}: {result.succeeded}/{result.total} succeeded in {result.elapsed:.1f} s")
+        for item, error in result.failed[:10]:
+            logger.warning(f"Bulk job {name} failed for {item}: {error}")
+        return result
+
+    async def purge(
+        self,
+        channel: discord.abc.Messageable,
+        limit: int,
+        check: Callable[[discord.Message], bool] | None = None,
+        before: discord.abc.Snowflake | datetime | None = None,
+        after: discord.abc.Snowflake | datetime | None = None,
+        progress: Callable[[int, int], Awaitable] | None = None,
+        progress_interval: float = 3.0,
+    ) -> BulkResult:
+        """Deletes up to limit messages matching check, streaming the channel history from the newest
+
+        Messages younger than 14 days go out in bulk deletes of 100 while the history is still
+        being read. Older ones can't be bulk deleted, they are deleted one by one within the
+        rate limit of the delete route.
+
+        Args:
+            channel (discord.abc.Messageable): Channel to clean up
+            limit (int): Maximum number of messages to delete
+            check (Callable[[discord.Message], bool] | None, optional): Filter of messages to delete. Defaults to None.
+            before (discord.abc.Snowflake | datetime | None, optional): Only messages before this message or time. Defaults to None.
+            after (discord.abc.Snowflake | datetime | None, optional): Only messages after this message or time. Defaults to None.
+            progress (Callable[[int, int], Awaitable] | None, optional): Called with (deleted, scanned) at most every progress_interval seconds. Defaults to None.
+            progress_interval (float, optional): Seconds between progress calls. Defaults to 3.0.
+
+        Returns:
+            BulkResult: total is the number of matched messages
+        """
+        name = f"purge {getattr(channel, 'id', channel)}"
+        result = BulkResult(name, 0)
+        started = time.perf_counter()
+        last_progress = started
+        scanned = 0
+        recent: list[discord.Message] = []
+        old: list[discord.Message] = []
+        pending: asyncio.Task | None = None
+
+        async def bulk_delete(messages: list[discord.Message]):
+            try:
+                await channel.delete_messages(messages, reason="Bulk cleanup")
+                result.succeeded += len(messages)
+            except discord.HTTPException as e:
+                result.failed.extend((message, e) for message in messages)
+
+        async def delete_old(messages: list[discord.Message]):
+            chunk = await self.run(name, messages, lambda message: message.delete(), DELETE_MESSAGE)
+            result.succeeded += chunk.succeeded
+            result.failed.extend(chunk.failed)
+
+        async def report():
+            nonlocal last_progress
+            if progress is None or time.perf_counter() - last_progress < progress_interval:
+                return
+            last_progress = time.perf_counter()
+            try:
+                await progress(result.succeeded, scanned)
+            except discord.HTTPException as e:
+                logger.debug(f"Progress update of bulk job {name} failed: {e}")
+
+        # History is newest first (discord.py reads oldest first when `after` is set unless told otherwise),
+        # once a message is too old for bulk delete all following ones are too
+        bulk_cutoff = datetime.now(timezone.utc) - BULK_DELETE_MAX_AGE
+        async for message in channel.history(limit=None, before=before, after=after, oldest_first=False):
+            if result.total >= limit:
+                break
+            scanned += 1
+            if check is not None and not check(message):
+                await report()
+                continue
+            result.total += 1
+
+            if message.created_at > bulk_cutoff:
+                recent.append(message)
+                if len(recent) == BULK_DELETE_SIZE:
+                    # One bulk delete in flight while the next batch is read
+                    if pending is not None:
+                        await pending
+                    pending = asyncio.create_task(bulk_delete(recent))
+                    recent = []
+            else:
+                if recent or pending is not None:
+                    # The last recent batch goes now, after the slow single deletes its oldest
+                    # messages could be past the bulk delete age and Discord would reject the batch
+                    if pending is not None:
+                        await pending
+                        pending = None
+                    if recent:
+                        await bulk_delete(recent)
+                        recent = []
+                old.append(message)
+                if len(old) == OLD_MESSAGES_CHUNK:
+                    await delete_old(old)
+                    old = []
+            await report()
+
+        if pending is not None:
+            await pending
+        if recent:
+            await bulk_delete(recent)
+        if old:
+            await delete_old(old)
+
+        result.elapsed = time.perf_counter() - started
+        logger.info(f"Bulk job {name}: deleted {result.succeeded}/{result.total} messages ({scanned} scanned) in {result.elapsed:.1f} s")
+        for item, error in result.failed[:10]:
+            logger.warning(f"Bulk job {name} failed for {item}: {error}")
+        return result
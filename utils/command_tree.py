@@ -0,0 +1,35 @@
+from discord import app_commands
+
+
+class VersionedCommandTree(app_commands.CommandTree):
+    """CommandTree with a version number that changes whenever its commands may have changed.
+
+    Adding or removing commands (which is what loading, unloading and reloading extensions
+    does), clearing and syncing all bump the version, so anything derived from the command
+    list can be cached per version.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.version = 0
+        super().__init__(*args, **kwargs)
+
+    def add_command(self, *args, **kwargs):
+        self.version += 1
+        return super().add_command(*args, **kwargs)
+
+    def remove_command(self, *args, **kwargs):
+        self.version += 1
+        return super().remove_command(*args, **kwargs)
+
+    def clear_commands(self, *args, **kwargs):
+        self.version += 1
+        return super().clear_commands(*args, **kwargs)
+
+    def copy_global_to(self, *args, **kwargs):
+        self.version += 1
+        return super().copy_global_to(*args, **kwargs)
+
+    async def sync(self, *args, **kwargs):
+        result = await super().sync(*args, **kwargs)
+        self.version += 1
+        return result
@@ -0,0 +1,145 @@
+import asyncio
+import copy
+import inspect
+import json
+import logging
+import os
+import stat
+import tempfile
+from typing import Any, Callable
+
+
+logger = logging.getLogger("fogbot")
+
+
+class ConfigStore:
+    """configuration.json backed store, every committed change is written to disk atomically.
+
+    Sections handed out by section() are live objects, reloads update them in place
+    so references kept by the bot and cogs stay valid.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data: dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+        self._listeners: dict[str, list[Callable]] = {}
+
+    def load(self) -> dict[str, Any]:
+        """Loads the whole configuration file (blocking, used on startup)
+
+        Returns:
+            dict[str, Any]: Configuration data
+        """
+        with open(self.path, "r", encoding="utf-8") as config:
+            self.data = json.load(config)
+        return self.data
+
+    def section(self, name: str, default: Any = None) -> Any:
+        """Gets a live configuration section, creating it from default if missing
+
+        Args:
+            name (str): Section name
+            default (Any, optional): Value used when the section doesn't exist. Defaults to None.
+
+        Returns:
+            Any: Section value
+        """
+        if name not in self.data:
+            self.data[name] = default
+        return self.data[name]
+
+    def subscribe(self, name: str, callback: Callable) -> None:
+        """Registers a callback called with the section name after it changes
+
+        Args:
+            name (str): Section name
+            callback (Callable): Sync or async callback
+        """
+        self._listeners.setdefault(name, []).append(callback)
+
+    def unsubscribe(self, name: str, callback: Callable) -> None:
+        """Removes a callback registered with subscribe
+
+        Args:
+            name (str): Section name
+            callback (Callable): Registered callback
+        """
+        listeners = self._listeners.get(name, [])
+        if callback in listeners:
+            listeners.remove(callback)
+
+    async def commit(self, *names: str) -> None:
+        """Writes the given sections to disk and notifies their listeners
+
+        Args:
+            *names (str): Names of the changed sections
+        """
+        # Snapshot on the event loop so later in-memory changes don't race the writer thread
+        snapshot = {name: copy.deepcopy(self.data.get(name)) for name in names}
+        async with self._lock:
+            await asyncio.to_thread(self._write_sections, snapshot)
+        logger.debug(f"Configuration sections saved: {', '.join(names)}")
+        for name in names:
+            await self._notify(name)
+
+    async def reload(self) -> list[str]:
+        """Rereads the configuration file and applies only the sections that changed
+
+        Returns:
+            list[str]: Names of the changed sections
+        """
+        async with self._lock:
+            fresh = await asyncio.to_thread(self._read_file)
+
+        changed = [name for name in fresh if fresh[name] != self.data.get(name)]
+        for name in changed:
+            current = self.data.get(name)
+            if isinstance(current, dict) and isinstance(fresh[name], dict):
+                current.clear()
+                current.update(fresh[name])
+            elif isinstance(current, list) and isinstance(fresh[name], list):
+                current[:] = fresh[name]
+            else:
+                self.data[name] = fresh[name]
+
+        for name in changed:
+            await self._notify(name)
+        if changed:
+            logger.info(f"Configuration reloaded, changed sections: {', '.join(changed)}")
+        return changed
+
+    async def _notify(self, name: str) -> None:
+        for callback in list(self._listeners.get(name, [])):
+            try:
+                result = callback(name)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.exception(f"Configuration listener for '{name}' failed", exc_info=e)
+
+    def _read_file(self) -> dict[str, Any]:
+        with open(self.path, "r", encoding="utf-8") as config:
+            return json.load(config)
+
+    def _write_sections(self, sections: dict[str, Any]) -> None:
+        # Merge into the file contents so manual edits of other sections are kept
+        data = self._read_file()
+        data.update(sections)
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".configuration.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+                json.dump(data, tmp, indent=4)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            # mkstemp creates the file as 0600, keep the permissions of the current file
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(self.path).st_mode))
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
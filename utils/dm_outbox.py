@@ -0,0 +1,276 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timezone
+from typing import NamedTuple
+
+import discord
+
+from db.models import OutboxMessages, UndeliverableUsers
+
+
+logger = logging.getLogger("fogbot")
+
+# Discord error code for "Cannot send messages to this user"
+CANNOT_MESSAGE_USER = 50007
+
+
+class _OutboxItem(NamedTuple):
+    id: int
+    user_id: int
+    content: str
+    dedup_key: str
+    attempts: int
+
+
+class TokenBucket:
+    """Allows rate calls per second on average with bursts up to capacity."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class DMOutbox:
+    """Queue of outgoing direct messages delivered by a small worker pool.
+
+    Messages are stored in the dm_outbox table until delivered, so they survive restarts.
+    Opening DM channels and sending are rate limited separately, users who don't accept
+    DMs are remembered and skipped for undeliverable_days, then delivery is tried again.
+    """
+
+    def __init__(
+        self,
+        bot: discord.Client,
+        workers: int = 2,
+        max_queue: int = 500,
+        max_attempts: int = 5,
+        open_rate: float = 0.5,
+        send_rate: float = 2.0,
+        undeliverable_days: int = 30,
+    ):
+        self.bot = bot
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.undeliverable_days = undeliverable_days
+        self.buckets = {
+            "dm_open": TokenBucket(open_rate, 2),
+            "dm_send": TokenBucket(send_rate, 5),
+        }
+        # user_id -> time.time() when the mark expires
+        self.undeliverable: dict[int, float] = {}
+        self._queue: asyncio.Queue[_OutboxItem] = asyncio.Queue(maxsize=max_queue)
+        self._futures: dict[str, asyncio.Future] = {}
+        self._queued_ids: set[int] = set()
+        # Set when messages stayed only in the database because the queue was full
+        self._overflow = False
+        self._tasks: list[asyncio.Task] = []
+        self._retry_tasks: set[asyncio.Task] = set()
+
+    @property
+    def size(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self) -> None:
+        """Loads undeliverable users and messages left from the previous run, starts the workers"""
+        rows = await UndeliverableUsers.list_recent(self.bot.db, self.undeliverable_days)
+        ttl = self.undeliverable_days * 86400
+        self.undeliverable = {
+            # marked_at is CURRENT_TIMESTAMP, UTC
+            int(row.user_id): datetime.strptime(row.marked_at, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp() + ttl
+            for row in rows
+        }
+        restored = await self._refill()
+        if restored:
+            logger.info(f"Restored {restored} queued direct messages")
+        self._tasks = [asyncio.create_task(self._worker(), name=f"dm-outbox-{index}") for index in range(self.workers)]
+
+    async def close(self) -> None:
+        """Stops the workers, undelivered messages stay in the database"""
+        for task in self._tasks + list(self._retry_tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for future in self._futures.values():
+            if not future.done():
+                future.cancel()
+        self._futures.clear()
+
+    async def send(self, user_id: int, content: str, dedup_key: str | None = None) -> asyncio.Future:
+        """Queues a direct message
+
+        Args:
+            user_id (int): Discord user id
+            content (str): Message content
+            dedup_key (str | None, optional): Messages with the same key are queued once. Defaults to user id + content.
+
+        Returns:
+            asyncio.Future: Resolves to True when delivered, False when the user can't receive it
+        """
+        loop = asyncio.get_running_loop()
+        dedup_key = dedup_key or f"{user_id}:{hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]}"
+        if dedup_key in self._futures:
+            return self._futures[dedup_key]
+
+        future = loop.create_future()
+        if await self._is_undeliverable(user_id):
+            future.set_result(False)
+            return future
+
+        message_id = await OutboxMessages.add(self.bot.db, user_id, content, dedup_key)
+        self._futures[dedup_key] = future
+        if message_id is None:
+            # Already stored (queue overflow or previous run) but not loaded yet
+            self._overflow = True
+            return future
+
+        self._enqueue(_OutboxItem(message_id, user_id, content, dedup_key, 0))
+        return future
+
+    async def deliver(self, user_id: int, content: str, timeout: float = 15, dedup_key: str | None = None) -> bool:
+        """Queues a direct message and waits until it's delivered, for messages that must arrive before a following action
+
+        Args:
+            user_id (int): Discord user id
+            content (str): Message content
+            timeout (float, optional): Seconds to wait for delivery. Defaults to 15.
+            dedup_key (str | None, optional): See send. Defaults to None.
+
+        Returns:
+            bool: Whether the message was delivered in time
+        """
+        future = await self.send(user_id, content, dedup_key)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    def _enqueue(self, item: _OutboxItem) -> None:
+        try:
+            self._queue.put_nowait(item)
+            self._queued_ids.add(item.id)
+        except asyncio.QueueFull:
+            # The row is already stored, it's picked up by _refill once the queue drains
+            self._queued_ids.discard(item.id)
+            self._overflow = True
+            logger.warning(f"DM outbox queue is full, message {item.id} will be sent later")
+
+    async def _refill(self) -> int:
+        self._overflow = False
+        after_id = 0
+        added = 0
+        while not self._queue.full():
+            rows = await OutboxMessages.list(self.bot.db, limit=self._queue.maxsize, after_id=after_id)
+            if not rows:
+                break
+            for row in rows:
+                item = _OutboxItem(*row)
+                after_id = item.id
+                if item.id in self._queued_ids:
+                    continue
+                if self._queue.full():
+                    self._overflow = True
+                    break
+                self._futures.setdefault(item.dedup_key, asyncio.get_running_loop().create_future())
+                self._enqueue(item)
+                added += 1
+        return added
+
+    async def _worker(self) -> None:
+        while True:
+            if self._queue.empty() and self._overflow:
+                await self._refill()
+            # The id stays in _queued_ids until _finish so _refill can't load it twice
+            item = await self._queue.get()
+            try:
+                await self._process(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Unexpected error while sending direct message {item.id}", exc_info=e)
+                await self._finish(item, False)
+            finally:
+                self._queue.task_done()
+
+    async def _is_undeliverable(self, user_id: int) -> bool:
+        expires = self.undeliverable.get(user_id)
+        if expires is None:
+            return False
+        if expires > time.time():
+            return True
+        # The user may have opened their DMs since, the next message is tried again
+        del self.undeliverable[user_id]
+        await UndeliverableUsers.remove(self.bot.db, user_id)
+        return False
+
+    async def _process(self, item: _OutboxItem) -> None:
+        if await self._is_undeliverable(item.user_id):
+            await self._finish(item, False)
+            return
+
+        try:
+            user = self.bot.get_user(item.user_id) or await self.bot.fetch_user(item.user_id)
+            channel = user.dm_channel
+            if channel is None:
+                await self.buckets["dm_open"].acquire()
+                channel = await user.create_dm()
+            await self.buckets["dm_send"].acquire()
+            await channel.send(item.content)
+        except discord.NotFound:
+            await self._mark_undeliverable(item, "unknown user")
+        except discord.Forbidden as e:
+            if e.code == CANNOT_MESSAGE_USER:
+                await self._mark_undeliverable(item, "direct messages closed")
+            else:
+                await self._retry_or_drop(item, e)
+        except discord.HTTPException as e:
+            await self._retry_or_drop(item, e)
+        else:
+            await self._finish(item, True)
+
+    async def _mark_undeliverable(self, item: _OutboxItem, reason: str) -> None:
+        logger.info(f"User {item.user_id} can't receive direct messages ({reason}), skipping them from now on")
+        self.undeliverable[item.user_id] = time.time() + self.undeliverable_days * 86400
+        await UndeliverableUsers.add(self.bot.db, item.user_id, reason)
+        await self._finish(item, False)
+
+    async def _retry_or_drop(self, item: _OutboxItem, error: Exception) -> None:
+        attempts = item.attempts + 1
+        if attempts >= self.max_attempts:
+            logger.warning(f"Giving up on direct message {item.id} to {item.user_id} after {attempts} attempts: {error}")
+            await self._finish(item, False)
+            return
+
+        await OutboxMessages.increment_attempts(self.bot.db, item.id)
+        delay = min(2 ** attempts, 300)
+        logger.warning(f"Direct message {item.id} to {item.user_id} failed ({error}), retrying in {delay} s")
+
+        async def retry():
+            await asyncio.sleep(delay)
+            self._enqueue(item._replace(attempts=attempts))
+
+        task = asyncio.create_task(retry())
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+
+    async def _finish(self, item: _OutboxItem, delivered: bool) -> None:
+        await OutboxMessages.delete(self.bot.db, item.id)
+        self._queued_ids.discard(item.id)
+        future = self._futures.pop(item.dedup_key, None)
+        if future is not None and not future.done():
+            future.set_result(delivered)
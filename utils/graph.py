@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable
+
+
+logger = logging.getLogger("fogbot")
+
+
+@dataclass
+class NodeResult:
+    name: str
+    duration: float = 0.0
+    result: Any = None
+    error: BaseException | None = None
+    skipped: bool = False
+
+
+async def run_graph(nodes: dict[str, tuple[Iterable[str], Callable[[], Awaitable[Any]]]]) -> dict[str, NodeResult]:
+    """Runs coroutines concurrently, each one starting once its dependencies have finished
+
+    Args:
+        nodes (dict): Mapping of node name to (dependency names, coroutine function)
+
+    Returns:
+        dict[str, NodeResult]: Result, error and duration of every node
+    """
+    # Dependencies on nodes that are not part of the graph are ignored
+    graph = {name: [dep for dep in deps if dep in nodes and dep != name] for name, (deps, _) in nodes.items()}
+    _check_cycles(graph)
+
+    done: dict[str, asyncio.Event] = {name: asyncio.Event() for name in nodes}
+    results: dict[str, NodeResult] = {name: NodeResult(name) for name in nodes}
+
+    async def run_node(name: str, deps: list[str], func: Callable[[], Awaitable[Any]]):
+        try:
+            for dep in deps:
+                await done[dep].wait()
+            failed = [dep for dep in deps if results[dep].error is not None or results[dep].skipped]
+            if failed:
+                results[name].skipped = True
+                logger.warning(f"Skipping '{name}', dependencies failed: {', '.join(failed)}")
+                return
+            started = time.perf_counter()
+            try:
+                results[name].result = await func()
+            except Exception as e:
+                results[name].error = e
+            results[name].duration = time.perf_counter() - started
+        finally:
+            done[name].set()
+
+    await asyncio.gather(*(run_node(name, graph[name], func) for name, (_, func) in nodes.items()))
+    return results
+
+
+def _check_cycles(graph: dict[str, list[str]]) -> None:
+    visiting: set[str] = set()
+    visited: set[str] = set()
+
+    def visit(name: str, path: list[str]):
+        if name in visited:
+            return
+        if name in visiting:
+            raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dep in graph[name]:
+            visit(dep, path + [name])
+        visiting.discard(name)
+        visited.add(name)
+
+    for name in graph:
+        visit(name, [])
@@ -0,0 +1,83 @@
+import logging
+import discord
+
+
+logger = logging.getLogger("fogbot")
+
+# Intents the cogs actually rely on:
+# guilds - guild, channel and role cache
+# members - joins/leaves/updates (Arrival, Departure, Security, Update) and the member cache
+# guild_messages + message_content - Level, Triggers and Update listeners
+PROFILES: dict[str, list[str]] = {
+    "minimal": ["guilds", "members", "guild_messages", "message_content"],
+    "all": list(discord.Intents.VALID_FLAGS),
+}
+
+
+def build_intents(gateway: dict) -> discord.Intents:
+    """Builds gateway intents from the configuration
+
+    Args:
+        gateway (dict): "gateway" section of the configuration, "intents" is a profile name or a list of intent names
+
+    Returns:
+        discord.Intents: Intents to connect with
+    """
+    selected = gateway.get("intents", "minimal")
+    if isinstance(selected, str):
+        if selected not in PROFILES:
+            logger.warning(f"Unknown intents profile '{selected}', falling back to 'minimal'")
+            selected = "minimal"
+        names = PROFILES[selected]
+    else:
+        names = list(selected)
+
+    intents = discord.Intents.none()
+    for name in names:
+        if name not in discord.Intents.VALID_FLAGS:
+            logger.warning(f"Unknown intent '{name}' in configuration, skipping")
+            continue
+        setattr(intents, name, True)
+    return intents
+
+
+def build_member_cache_flags(gateway: dict, intents: discord.Intents) -> discord.MemberCacheFlags:
+    """Builds the member cache policy from the configuration
+
+    Args:
+        gateway (dict): "gateway" section of the configuration
+        intents (discord.Intents): Intents the bot connects with
+
+    Returns:
+        discord.MemberCacheFlags: Member cache policy
+    """
+    policy = gateway.get("member_cache", "intents")
+    if policy == "joined":
+        flags = discord.MemberCacheFlags.none()
+        flags.joined = intents.members
+        return flags
+    if policy == "none":
+        return discord.MemberCacheFlags.none()
+    if policy != "intents":
+        logger.warning(f"Unknown member cache policy '{policy}', falling back to 'intents'")
+    return discord.MemberCacheFlags.from_intents(intents)
+
+
+def build_client_options(gateway: dict) -> dict:
+    """Builds intents, member cache and chunking options for the bot constructor
+
+    Args:
+        gateway (dict): "gateway" section of the configuration
+
+    Returns:
+        dict: Keyword arguments for discord.Client
+    """
+    intents = build_intents(gateway)
+    options = {
+        "intents": intents,
+        "member_cache_flags": build_member_cache_flags(gateway, intents),
+        "chunk_guilds_at_startup": bool(gateway.get("chunk_guilds_at_startup", True)),
+    }
+    if "max_messages" in gateway:
+        options["max_messages"] = gateway["max_messages"]
+    return options
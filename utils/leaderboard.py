@@ -0,0 +1,116 @@
+import bisect
+from typing import Any, Awaitable, Callable
+
+import discord
+
+
+class Leaderboard:
+    """Top-K entries of a ranking kept in memory and updated as scores change.
+
+    Entries are (score, user_id, data) where data is whatever the caller needs to render a
+    row. Only the first `size` positions are kept; positions past them are served from the
+    database by the caller. A score update can only move a user up, except for explicit
+    decreases, which mark the window stale so it's reloaded on the next read.
+    """
+
+    def __init__(self, size: int = 100):
+        self.size = size
+        self.loaded = False
+        # Sorted ascending by (-score, user_id), so position 0 is the best
+        self._keys: list[tuple[int, int]] = []
+        self._entries: dict[int, tuple[int, Any]] = {}
+
+    def load(self, rows: list[tuple[int, int, Any]]) -> None:
+        """Replaces the window
+
+        Args:
+            rows (list[tuple[int, int, Any]]): (user_id, score, data) of the best users
+        """
+        self._entries = {user_id: (score, data) for user_id, score, data in rows}
+        self._keys = sorted((-score, user_id) for user_id, (score, _) in self._entries.items())
+        self._trim()
+        self.loaded = True
+
+    def invalidate(self) -> None:
+        self.loaded = False
+
+    @property
+    def full(self) -> bool:
+        return len(self._keys) >= self.size
+
+    def update(self, user_id: int, score: int, data: Any) -> None:
+        """Applies a new score of a user, cheap when the user is outside the window and stays there"""
+        if not self.loaded:
+            return
+        current = self._entries.get(user_id)
+        if current is None:
+            if self.full and (-score, user_id) >= self._keys[-1]:
+                return
+        else:
+            if score < current[0] and self.full and (-score, user_id) > self._keys[-1]:
+                # Dropped below the window, someone outside might now belong in it
+                self.invalidate()
+                return
+            self._keys.pop(bisect.bisect_left(self._keys, (-current[0], user_id)))
+
+        bisect.insort(self._keys, (-score, user_id))
+        self._entries[user_id] = (score, data)
+        self._trim()
+
+    def _trim(self) -> None:
+        while len(self._keys) > self.size:
+            _, user_id = self._keys.pop()
+            self._entries.pop(user_id, None)
+
+    def page(self, offset: int, limit: int) -> list[tuple[int, int, Any]] | None:
+        """Entries at positions offset..offset+limit
+
+        Returns:
+            list[tuple[int, int, Any]] | None: (user_id, score, data), None when the positions aren't all in the window
+        """
+        if not self.loaded:
+            return None
+        if offset + limit > len(self._keys) and self.full:
+            return None
+        return [(user_id, -negative_score, self._entries[user_id][1]) for negative_score, user_id in self._keys[offset:offset + limit]]
+
+    def rank(self, user_id: int) -> int | None:
+        """1-based position of a user, None when not in the window"""
+        if not self.loaded:
+            return None
+        current = self._entries.get(user_id)
+        if current is None:
+            return None
+        return bisect.bisect_left(self._keys, (-current[0], user_id)) + 1
+
+
+class LeaderboardPages(discord.ui.View):
+    """Previous / next buttons for a ranking embed, only usable by the user who opened it."""
+
+    def __init__(self, render: Callable[[int], Awaitable[tuple[discord.Embed, bool]]], user_id: int, page: int = 1):
+        super().__init__(timeout=180)
+        self.render = render
+        self.user_id = user_id
+        self.page = page
+
+    def set_buttons(self, has_next: bool) -> None:
+        self.previous.disabled = self.page <= 1
+        self.next.disabled = not has_next
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return interaction.user.id == self.user_id
+
+    async def _show(self, interaction: discord.Interaction) -> None:
+        embed, has_next = await self.render(self.page)
+        self.set_buttons(has_next)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page = max(1, self.page - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.page += 1
+        await self._show(interaction)
@@ -0,0 +1,252 @@
+import asyncio
+import bisect
+import logging
+import math
+import re
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Callable
+
+import aiohttp
+
+
+logger = logging.getLogger("fogbot")
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple) -> str:
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append(f"{name}=\"{escaped}\"")
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class Metric(ABC):
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> list[str]:
+        ...
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """Gauge set directly or read from a callback at scrape time.
+
+    Callback returns a number, or a dict of label value -> number for a gauge with one label.
+    """
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), callback: Callable | None = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple, float] = {}
+        self.callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> list[str]:
+        values = dict(self._values)
+        if self.callback is not None:
+            try:
+                result = self.callback()
+            except Exception as e:
+                logger.debug(f"Gauge callback for {self.name} failed: {e}")
+                result = None
+            if isinstance(result, dict):
+                values.update({(key,): value for key, value in result.items()})
+            elif result is not None:
+                values[()] = result
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values.items()]
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: dict[tuple, list[int]] = {}
+        self._sums: dict[tuple, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(self._sums[key])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), callback: Callable | None = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+MESSAGES_PROCESSED = REGISTRY.counter("fogbot_messages_processed_total", "Guild messages received by the bot")
+XP_FLUSH_SECONDS = REGISTRY.histogram("fogbot_xp_flush_seconds", "Time spent flushing the experience cache")
+XP_FLUSH_USERS = REGISTRY.histogram("fogbot_xp_flush_users", "Users written per experience cache flush", buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000))
+DB_QUERY_SECONDS = REGISTRY.histogram("fogbot_db_query_seconds", "Duration of db.models methods", ("method",))
+DISCORD_HTTP_SECONDS = REGISTRY.histogram("fogbot_discord_http_seconds", "Discord REST request latency", ("method", "route"))
+DISCORD_RATE_LIMITS = REGISTRY.counter("fogbot_discord_rate_limits_total", "Discord REST responses with status 429", ("route",))
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram("fogbot_event_loop_lag_seconds", "Event loop scheduling delay", buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+CACHE_SIZE = REGISTRY.gauge("fogbot_cache_size", "Number of entries in in-memory caches", ("cache",))
+GATEWAY_LATENCY_SECONDS = REGISTRY.gauge("fogbot_gateway_latency_seconds", "Discord gateway heartbeat latency")
+
+
+_SNOWFLAKE = re.compile(r"/\d{15,21}")
+_TOKEN = re.compile(r"/(interactions/:id|webhooks/:id)/[^/]+")
+
+
+def route_template(path: str) -> str:
+    """Replaces ids and tokens in a Discord API path so routes can be used as labels
+
+    Args:
+        path (str): URL path
+
+    Returns:
+        str: Path with ":id" and ":token" placeholders
+    """
+    path = _SNOWFLAKE.sub("/:id", path)
+    return _TOKEN.sub(r"/\1/:token", path)
+
+
+def http_trace_config() -> aiohttp.TraceConfig:
+    """Creates an aiohttp trace config recording Discord REST latency and rate limits
+
+    Returns:
+        aiohttp.TraceConfig: Trace config to pass as http_trace to the bot
+    """
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        route = route_template(params.url.path)
+        DISCORD_HTTP_SECONDS.observe(time.perf_counter() - context.started, method=params.method, route=route)
+        if params.response.status == 429:
+            DISCORD_RATE_LIMITS.inc(route=route)
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+class MetricsServer:
+    """Minimal HTTP server exposing REGISTRY in the Prometheus text format on /metrics."""
+
+    def __init__(self, host: str, port: int, registry: Registry = REGISTRY):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Metrics available on http://{self.host}:{self.port}/metrics")
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # Drain headers, the request body is never used
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, content_type, body = "200 OK", "text/plain; version=0.0.4; charset=utf-8", self.registry.render().encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1")
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,77 @@
+import logging
+
+from db.models import Missions
+
+
+logger = logging.getLogger("fogbot")
+
+# Channels remembered as not being mission channels before the cache is loaded
+MAX_NEGATIVE = 10_000
+
+
+class MissionChannelCache:
+    """channel_id -> mission record, the records Missions.get_channel returns.
+
+    Loaded with every mission at startup, after that a channel missing from it isn't a mission
+    channel and lookups never reach the database. Before loading, lookups go to the database
+    and remember both hits and misses. Commands creating, editing, cancelling or archiving
+    missions keep it current with refresh and forget.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.loaded = False
+        self._records: dict = {}
+        self._missing: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def records(self) -> list:
+        return list(self._records.values())
+
+    async def load(self) -> None:
+        rows = await Missions.list(self.bot.db)
+        self._records = {int(row.channel_id): row for row in rows}
+        self._missing.clear()
+        self.loaded = True
+        logger.info(f"Cached {len(self._records)} mission channels")
+
+    async def get(self, channel_id: int):
+        """Mission of a channel
+
+        Args:
+            channel_id (int): Discord channel id
+
+        Returns:
+            Record | None: id, name, channel_id, created_at, creator_user_id, date, ping_role_id
+        """
+        record = self._records.get(channel_id)
+        if record is not None or self.loaded or channel_id in self._missing:
+            return record
+        record = await Missions.get_channel(self.bot.db, channel_id)
+        self._store(channel_id, record)
+        return record
+
+    async def refresh(self, channel_id: int):
+        """Reads a channel's mission again after it was created or changed"""
+        record = await Missions.get_channel(self.bot.db, channel_id)
+        self._store(channel_id, record)
+        return record
+
+    def forget(self, channel_id: int) -> None:
+        """Drops a cancelled or archived mission"""
+        self._records.pop(channel_id, None)
+        if not self.loaded:
+            self._missing.add(channel_id)
+
+    def _store(self, channel_id: int, record) -> None:
+        if record is not None:
+            self._records[channel_id] = record
+            self._missing.discard(channel_id)
+        elif not self.loaded:
+            if len(self._missing) >= MAX_NEGATIVE:
+                self._missing.clear()
+            self._missing.add(channel_id)
+        else:
+            self._records.pop(channel_id, None)
@@ -0,0 +1,186 @@
+import functools
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+import aiohttp
+
+from utils.metrics import route_template
+
+
+logger = logging.getLogger("fogbot")
+
+
+@dataclass
+class Trace:
+    id: int
+    name: str
+    # Chrome trace "complete" events, see _event
+    events: list[dict] = field(default_factory=list)
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("fogbot_trace", default=None)
+_trace_ids = itertools.count(1)
+
+
+class TraceWriter:
+    """Appends finished traces to a file in the Chrome trace event format.
+
+    The file is a JSON array whose closing bracket is optional in that format, so events
+    can be appended without rewriting it. Open it in chrome://tracing or ui.perfetto.dev.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def write(self, trace: Trace) -> None:
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+            if self._file.tell() == 0:
+                self._file.write("[\n")
+        # Events are small and written once per sampled trace, like a log line
+        self._file.write("".join(json.dumps(event) + ",\n" for event in trace.events))
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.0, writer: TraceWriter | None = None):
+        self.sample_rate = sample_rate
+        self.writer = writer
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 and self.writer is not None
+
+
+TRACER = Tracer()
+
+
+def configure(sample_rate: float, path: str) -> None:
+    """Enables tracing of a fraction of interactions
+
+    Args:
+        sample_rate (float): Fraction of traces recorded, 0 disables tracing
+        path (str): File the traces are appended to
+    """
+    TRACER.sample_rate = max(0.0, min(sample_rate, 1.0))
+    TRACER.writer = TraceWriter(path) if TRACER.sample_rate > 0 else None
+    if TRACER.enabled:
+        logger.info(f"Tracing {TRACER.sample_rate:.0%} of interactions to {path}")
+
+
+def _event(trace: Trace, name: str, category: str, started: float, duration: float, args: dict) -> dict:
+    return {
+        "name": name,
+        "cat": category,
+        "ph": "X",
+        "ts": started * 1e6,
+        "dur": duration * 1e6,
+        "pid": os.getpid(),
+        # One row per trace in the viewer
+        "tid": trace.id,
+        "args": args,
+    }
+
+
+@contextmanager
+def trace(name: str, **args):
+    """Starts a sampled trace, spans recorded in the same task (and tasks created from it) belong to it
+
+    Args:
+        name (str): Root span name, e.g. "SlotSelect.callback"
+    """
+    if not TRACER.enabled or _current_trace.get() is not None or random.random() >= TRACER.sample_rate:
+        yield None
+        return
+
+    current = Trace(next(_trace_ids), name)
+    token = _current_trace.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        current.events.append(_event(current, name, "interaction", started, time.perf_counter() - started, args))
+        try:
+            TRACER.writer.write(current)
+        except OSError as e:
+            logger.warning(f"Could not write trace {name}: {e}")
+
+
+@contextmanager
+def span(name: str, category: str = "app", **args):
+    """Records a span in the current trace, does nothing when the current task isn't traced
+
+    Args:
+        name (str): Span name
+        category (str, optional): Span category shown by the viewer. Defaults to "app".
+    """
+    current = _current_trace.get()
+    if current is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.events.append(_event(current, name, category, started, time.perf_counter() - started, args))
+
+
+def record_span(name: str, category: str, started: float, duration: float, **args) -> None:
+    """Adds an already measured span (time.perf_counter based) to the current trace"""
+    current = _current_trace.get()
+    if current is not None:
+        current.events.append(_event(current, name, category, started, duration, args))
+
+
+def traced(name: str):
+    """Decorator tracing every call of an async function (subject to sampling)"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with trace(name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def http_trace_config(trace_config: aiohttp.TraceConfig | None = None) -> aiohttp.TraceConfig:
+    """Adds Discord REST spans (defer, edits, followups...) to traces
+
+    Args:
+        trace_config (aiohttp.TraceConfig | None, optional): Existing trace config to extend. Defaults to a new one.
+
+    Returns:
+        aiohttp.TraceConfig: Trace config to pass as http_trace to the bot
+    """
+    trace_config = trace_config or aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.trace_started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        record_span(
+            f"{params.method} {route_template(params.url.path)}",
+            "discord",
+            context.trace_started,
+            time.perf_counter() - context.trace_started,
+            status=params.response.status,
+        )
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+
+from utils.metrics import EVENT_LOOP_LAG_SECONDS
+
+
+logger = logging.getLogger("fogbot")
+
+
+@dataclass
+class LagEvent:
+    timestamp: datetime
+    lag: float
+    task: str | None
+    stack: list[str]
+
+
+class LoopWatchdog:
+    """Measures event loop scheduling delay and captures what blocked it.
+
+    A heartbeat task runs on the loop, a daemon thread watches the heartbeat and when it
+    is late by more than threshold it snapshots the loop thread's stack and running task.
+    The snapshot is reported once the loop wakes up again.
+    """
+
+    def __init__(self, threshold: float = 0.25, interval: float = 0.1, history: int = 50):
+        self.threshold = threshold
+        self.interval = interval
+        self.events: deque[LagEvent] = deque(maxlen=history)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._last_beat = 0.0
+        self._capture: tuple[str | None, list[str]] | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Starts the heartbeat and the monitor thread, must be called from the event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"Event loop watchdog started (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            started = time.monotonic()
+            self._last_beat = started
+            await asyncio.sleep(self.interval)
+            lag = max(time.monotonic() - started - self.interval, 0.0)
+            EVENT_LOOP_LAG_SECONDS.observe(lag)
+            if lag >= self.threshold:
+                self._report(lag)
+
+    def _report(self, lag: float) -> None:
+        capture, self._capture = self._capture, None
+        task_name, stack = capture if capture is not None else (None, [])
+        event = LagEvent(datetime.now(), lag, task_name, stack)
+        self.events.append(event)
+        location = stack[-1].strip() if stack else "stack not captured"
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms (task: {task_name or 'unknown'})\n{location}")
+        if stack:
+            logger.debug("Blocking stack:\n" + "".join(stack))
+
+    def _monitor(self) -> None:
+        while not self._stopped.wait(self.interval / 2):
+            if self._capture is not None:
+                continue
+            if time.monotonic() - self._last_beat < self.interval + self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            # current_task is only read here, it's set by the loop thread while a task step runs
+            task = asyncio.current_task(self._loop)
+            task_name = f"{task.get_name()} ({task.get_coro().__qualname__})" if task is not None else None
+            self._capture = (task_name, traceback.format_stack(frame))